@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.finance import price_history, technicals, rolling_volatility
+
+DB_PATH = os.environ.get(
+    "FINANCE_DASHBOARD_ALERTS_DB",
+    os.path.join(os.path.expanduser("~/.finance-dashboard"), "alerts.sqlite"),
+)
+EVERY_S = float(os.environ.get("FINANCE_DASHBOARD_ALERTS_EVERY_S", "300"))
+ENABLED = os.environ.get("FINANCE_DASHBOARD_ALERTS", "on").strip().lower() not in ("", "0", "off")
+
+# Nombres aceptados en las reglas → columna del DF de technicals (+ Vol21)
+FIELDS = {
+    "close": "Close", "precio": "Close", "return": "Return",
+    "sma20": "SMA20", "sma50": "SMA50", "ema12": "EMA12", "ema26": "EMA26",
+    "bb_up": "BB_Up", "bb_mid": "BB_Mid", "bb_lo": "BB_Lo",
+    "rsi": "RSI14", "rsi14": "RSI14", "vol21": "Vol21", "volatilidad": "Vol21",
+}
+# Operadores → comparación base; "cruza" es la misma comparación (el disparo ya es por flanco)
+OPS = {
+    "<": "lt", "<=": "le", ">": "gt", ">=": "ge",
+    "crosses above": "gt", "crosses below": "lt",
+    "cruza por encima de": "gt", "cruza por debajo de": "lt",
+}
+_RULE_RE = re.compile(
+    r"^\s*([A-Za-z_]\w*)\s*(<=|>=|<|>|crosses above|crosses below|cruza por encima de|cruza por debajo de)"
+    r"\s*([A-Za-z_]\w*|[-+]?\d+(?:\.\d+)?%?)\s*$",
+    re.IGNORECASE,
+)
+
+
+# =========================
+# Reglas
+# =========================
+
+def parse_rule(expr: str) -> tuple[str, str, str | float]:
+    """
+    'RSI14 < 30', 'Close crosses above SMA50', 'Vol21 > 40%' → (campo, op, campo|número).
+    Lanza ValueError con un mensaje legible si no se entiende.
+    """
+    m = _RULE_RE.match(expr or "")
+    if not m:
+        raise ValueError("Formato: <campo> <op> <campo|número>, p. ej. 'RSI14 < 30' o 'Close crosses above SMA50'.")
+    left, op, right = m.groups()
+    if left.lower() not in FIELDS:
+        raise ValueError(f"Campo desconocido: {left}. Disponibles: {', '.join(sorted(set(FIELDS.values())))}.")
+    if right.lower() in FIELDS:
+        rhs: str | float = FIELDS[right.lower()]
+    elif re.fullmatch(r"[-+]?\d+(?:\.\d+)?%?", right):
+        rhs = float(right.rstrip("%")) / (100.0 if right.endswith("%") else 1.0)
+    else:
+        raise ValueError(f"Campo desconocido: {right}.")
+    return FIELDS[left.lower()], OPS[op.lower()], rhs
+
+
+def evaluate(frame: pd.DataFrame, rules: list[tuple], start: int) -> list[tuple[int, int, float]]:
+    """
+    Evalúa todas las reglas de un ticker a la vez sobre las barras [start, fin).
+    'rules' = [(id, campo, op, campo|número), ...]. Cada regla se dispara en
+    la barra en que su condición pasa de no cumplirse a cumplirse (flanco),
+    así 'RSI14 < 30' avisa una vez al entrar en sobreventa y no cada día.
+    Devuelve [(id, índice de barra, valor del campo), ...].
+    """
+    start = max(start, 1)
+    if not rules or start >= len(frame):
+        return []
+    cols = sorted({r[1] for r in rules} | {r[3] for r in rules if isinstance(r[3], str)})
+    cols = [c for c in cols if c in frame.columns]
+    pos = {c: i for i, c in enumerate(cols)}
+    data = frame[cols].to_numpy(dtype="float64")[start - 1:].T  # campos × barras (con la anterior)
+
+    valid = [r for r in rules if r[1] in pos and (not isinstance(r[3], str) or r[3] in pos)]
+    if not valid:
+        return []
+    ids = np.array([r[0] for r in valid])
+    left = data[[pos[r[1]] for r in valid]]
+    is_col = np.array([isinstance(r[3], str) for r in valid])
+    right = np.where(
+        is_col[:, None],
+        data[[pos[r[3]] if isinstance(r[3], str) else 0 for r in valid]],
+        np.array([0.0 if isinstance(r[3], str) else r[3] for r in valid])[:, None],
+    )
+    op = np.array([r[2] for r in valid])[:, None]
+    with np.errstate(invalid="ignore"):
+        cond = np.select(
+            [op == "lt", op == "le", op == "gt", op == "ge"],
+            [left < right, left <= right, left > right, left >= right],
+            default=False,
+        )
+    fired = cond[:, 1:] & ~cond[:, :-1]
+    r_idx, b_idx = np.nonzero(fired)
+    return [(int(ids[r]), start + int(b), float(left[r, b + 1])) for r, b in zip(r_idx, b_idx)]
+
+
+# =========================
+# Almacén (SQLite)
+# =========================
+
+_DB_LOCK = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    con = sqlite3.connect(DB_PATH, timeout=10)
+    con.executescript("""
+        CREATE TABLE IF NOT EXISTS rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ticker TEXT NOT NULL, expr TEXT NOT NULL,
+            enabled INTEGER NOT NULL DEFAULT 1, created_at TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS fired (
+            rule_id INTEGER NOT NULL, ticker TEXT NOT NULL, bar TEXT NOT NULL, value REAL,
+            expr TEXT NOT NULL, fired_at TEXT NOT NULL, PRIMARY KEY (rule_id, bar));
+        CREATE TABLE IF NOT EXISTS progress (ticker TEXT PRIMARY KEY, last_bar TEXT NOT NULL);
+    """)
+    return con
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def add_rule(ticker: str, expr: str) -> int:
+    """Valida y guarda una regla; devuelve su id."""
+    parse_rule(expr)
+    with _DB_LOCK, closing(_connect()) as con, con:
+        cur = con.execute("INSERT INTO rules (ticker, expr, created_at) VALUES (?, ?, ?)",
+                          (ticker.upper().strip(), expr.strip(), _now()))
+        return int(cur.lastrowid)
+
+
+def delete_rules(ids: list[int]) -> None:
+    with _DB_LOCK, closing(_connect()) as con, con:
+        con.executemany("DELETE FROM rules WHERE id = ?", [(int(i),) for i in ids])
+
+
+def list_rules() -> pd.DataFrame:
+    with closing(_connect()) as con:
+        return pd.read_sql_query("SELECT id, ticker, expr, enabled, created_at FROM rules ORDER BY ticker, id", con)
+
+
+def recent_alerts(limit: int = 100) -> pd.DataFrame:
+    with closing(_connect()) as con:
+        return pd.read_sql_query(
+            "SELECT fired_at, ticker, expr, bar, value FROM fired ORDER BY fired_at DESC, bar DESC LIMIT ?",
+            con, params=(limit,))
+
+
+# =========================
+# Ciclo de evaluación
+# =========================
+
+def _frame(ticker: str) -> pd.DataFrame:
+    """Precios + indicadores con las mismas definiciones que la pestaña Técnicos."""
+    df = price_history(ticker, period="1y", interval="1d", source="auto")
+    if df.empty or df.attrs.get("__demo__"):
+        return pd.DataFrame()
+    out = technicals(df)
+    out = out.assign(Vol21=rolling_volatility(df, 21))
+    return out
+
+
+def run_cycle() -> int:
+    """
+    Una pasada: por ticker con reglas activas, solo las barras posteriores a
+    la última ya evaluada (tabla progress); la primera vez, solo la última
+    barra (no se disparan alertas históricas). Devuelve cuántas se dispararon.
+    """
+    with closing(_connect()) as con:
+        rows = con.execute("SELECT id, ticker, expr FROM rules WHERE enabled = 1").fetchall()
+        progress = dict(con.execute("SELECT ticker, last_bar FROM progress").fetchall())
+
+    by_ticker: dict[str, list[tuple]] = {}
+    exprs = {}
+    for rid, tk, expr in rows:
+        try:
+            by_ticker.setdefault(tk, []).append((rid, *parse_rule(expr)))
+            exprs[rid] = expr
+        except ValueError:
+            continue
+
+    fired_rows, done = [], []
+    for tk, rules in by_ticker.items():
+        try:
+            frame = _frame(tk)
+        except Exception:
+            continue
+        if frame.empty:
+            continue
+        last = progress.get(tk)
+        start = len(frame) - 1 if last is None else int(frame.index.searchsorted(pd.Timestamp(last), side="right"))
+        for rid, b, value in evaluate(frame, rules, start):
+            fired_rows.append((rid, tk, frame.index[b].isoformat(), value, exprs[rid], _now()))
+        done.append((tk, frame.index[-1].isoformat()))
+
+    with _DB_LOCK, closing(_connect()) as con, con:
+        con.executemany("INSERT OR IGNORE INTO fired (rule_id, ticker, bar, value, expr, fired_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", fired_rows)
+        con.executemany("INSERT OR REPLACE INTO progress (ticker, last_bar) VALUES (?, ?)", done)
+    return len(fired_rows)
+
+
+class _AlertWorker:
+    """Hilo único por proceso que evalúa las reglas cada EVERY_S, con o sin la página abierta."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="alerts", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                run_cycle()
+            except Exception:
+                pass
+            self._stop.wait(EVERY_S)
+
+
+_WORKER: _AlertWorker | None = None
+_WORKER_LOCK = threading.Lock()
+
+
+def start_alerts() -> None:
+    """Arranca el evaluador de alertas una vez por proceso."""
+    global _WORKER
+    if not ENABLED:
+        return
+    with _WORKER_LOCK:
+        if _WORKER is None:
+            _WORKER = _AlertWorker()
+            _WORKER.start()
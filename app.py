@@ -1,23 +1,46 @@
-import io
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 from src.finance import (
     price_history,
+    price_history_many,
+    source_health,
+    cache_stats,
+    refresh_ticker,
     annual_returns,
     rolling_volatility,
     compute_ratios,
     get_financials,
-    fundamentals_available,
     technicals,
+    custom_technicals,
+    DEFAULT_WINDOWS,
+    screen_universe,
+    backtest_grid,
+    monte_carlo,
+    correlation_stats,
+    optimize_portfolio,
+    PERIODS_PER_YEAR,
 )
-from src.ui import metric_card  # seguimos usando las tarjetas
+from src.ui import metric_card, deferred_download, streamlit_cache  # seguimos usando las tarjetas
+from src.cache import set_backend as set_cache_backend
 from src.watchlist import load_watchlist, save_watchlist
+from src.screener import apply_filters, parse_universe
+from src.backtest import Strategy, grid, equity_curve
+from src.downsample import CHART_PX
+from src.charts import style_fig, line_figure, line_figure_png, png_download
+from src.export import export_bundle, formats as export_formats, FORMATS as EXPORT_FORMATS
+from src.warmer import start_warmer
+from src.lazy import prewarm, module as lazy_module
+from src.alerts import start_alerts, add_rule, delete_rules, list_rules, recent_alerts, run_cycle
 
 # =========================
 # Config & helpers sesión
 # =========================
 st.set_page_config(page_title="Finance Dashboard", page_icon="📈", layout="wide")
+# Importa en segundo plano proveedores y plotly.express mientras se pinta la barra lateral
+prewarm()
+# El núcleo (src/finance.py) no depende de Streamlit: aquí su caché pasa a st.cache_data
+set_cache_backend(streamlit_cache)
 
 def sget(key, default):
     if key not in st.session_state:
@@ -193,29 +216,6 @@ def apply_theme(dark: bool):
         unsafe_allow_html=True,
     )
 
-def style_fig(fig, dark: bool):
-    """Ajustes de contraste para todas las figuras Plotly."""
-    if dark:
-        paper_bg = "#0f1115"; plot_bg = "#0f1115"
-        grid = "#2a2f3a"; axis = "#cbd5e1"; font = "#e6e6e6"; template = "plotly_dark"
-    else:
-        paper_bg = "#ffffff"; plot_bg = "#ffffff"
-        grid = "#d1d5db"; axis = "#111827"; font = "#0b1220"; template = "plotly_white"
-
-    fig.update_layout(
-        template=template,
-        paper_bgcolor=paper_bg,
-        plot_bgcolor=plot_bg,
-        font=dict(color=font),
-        xaxis=dict(gridcolor=grid, zerolinecolor=grid, linecolor=axis,
-                   tickfont=dict(color=axis), titlefont=dict(color=axis)),
-        yaxis=dict(gridcolor=grid, zerolinecolor=grid, linecolor=axis,
-                   tickfont=dict(color=axis), titlefont=dict(color=axis)),
-        margin=dict(l=10, r=10, t=50, b=10),
-        height=420
-    )
-    return fig
-
 def ticker_emoji(tk: str) -> str:
     tk = tk.upper()
     mapping = {
@@ -227,13 +227,32 @@ def ticker_emoji(tk: str) -> str:
     }
     return mapping.get(tk, "📈")
 
+def source_status():
+    """Una línea con el estado del circuit breaker de cada fuente."""
+    icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴", "unavailable": "⚪"}
+    parts = []
+    for name, h in source_health().items():
+        txt = f"{icons.get(h['state'], '⚪')} {name.title()}"
+        if h["state"] == "open":
+            txt += f" (reintento en {h['retry_in_s']:.0f}s)"
+        parts.append(txt)
+    st.caption(" · ".join(parts))
+
+MARKET_TICKERS = ["SPY", "QQQ", "BTC-USD"]
+
+@st.fragment(run_every="5m")
 def market_summary(source_key: str):
-    tickers = ["SPY", "QQQ", "BTC-USD"]
+    """Fragmento propio: se refresca solo cada 5 min sin relanzar la página."""
+    tickers = MARKET_TICKERS
     names = {"SPY": "S&P 500 (SPY)", "QQQ": "Nasdaq 100 (QQQ)", "BTC-USD": "Bitcoin"}
     cols = st.columns(3)
+    try:
+        frames = price_history_many(tickers, period="1y", interval="1d", source=source_key)
+    except Exception:
+        frames = {}
     for i, tk in enumerate(tickers):
         try:
-            df = price_history(tk, period="1y", interval="1d", source=source_key)
+            df = frames.get(tk, pd.DataFrame())
             if df.empty or len(df) < 2:
                 cols[i].metric(names[tk], "—", "—")
                 continue
@@ -244,6 +263,29 @@ def market_summary(source_key: str):
         except Exception:
             cols[i].metric(names[tk], "—", "—")
 
+@st.fragment
+def export_panel(ticker: str, peers: list[str], period: str, interval: str, source_key: str):
+    """Exportación de varios tickers en un fichero (Parquet/CSV); se genera al pulsar y se reutiliza si no cambia."""
+    sets = {"Watchlist": load_watchlist(), "Ticker + comparables": list(dict.fromkeys([ticker] + peers))}
+    which = st.radio("Conjunto", list(sets), horizontal=True, key="exp_set")
+    fmt = st.radio("Formato", export_formats(), horizontal=True, key="exp_fmt", format_func=str.upper)
+    tickers = tuple(sets[which])
+    if not tickers:
+        st.caption("Tu watchlist está vacía.")
+        return
+    st.caption(f"{len(tickers)} tickers · {period}/{interval} · precios, técnicos y rentabilidad relativa.")
+
+    def render() -> bytes:
+        # El fichero se escribe por trozos en disco, pero la descarga no va en
+        # streaming: Streamlit guarda en memoria (MediaFileStorage) lo que sirve,
+        # aunque se le pase un fichero abierto. El fichero queda en EXPORT_DIR.
+        with open(export_bundle(tickers, period=period, interval=interval, source=source_key, fmt=fmt), "rb") as f:
+            return f.read()
+
+    ext, mime = EXPORT_FORMATS[fmt]
+    name = "watchlist" if which == "Watchlist" else ticker
+    deferred_download("📦 Exportar", render, f"{name}_{period}_{interval}{ext}", mime, "exp_dl")
+
 # =========================
 # Sidebar
 # =========================
@@ -261,6 +303,7 @@ with st.sidebar:
     source_label = st.selectbox("Fuente de datos", source_options, index=source_index)
     sset("source_index", source_options.index(source_label))
     source_key = "auto" if source_label.startswith("Auto") else "stooq"
+    source_status()
 
     # Lista de empresas frecuentes
     options = {
@@ -329,11 +372,12 @@ with st.sidebar:
     st.subheader("📰 Resumen de mercado")
     market_summary(source_key)
 
-    # Recargar datos (limpia caché)
+    # Recargar datos (solo el ticker actual y sus peers; el resto de la caché se conserva)
     st.markdown("---")
     if st.button("🔄 Recargar datos", use_container_width=True):
-        st.cache_data.clear()
-        st.experimental_rerun()
+        with st.spinner(f"Actualizando {ticker}..."):
+            refresh_ticker(ticker, peers=peers, source=source_key)
+        st.rerun()
 
     # Watchlist
     st.subheader("⭐ Watchlist")
@@ -341,7 +385,7 @@ with st.sidebar:
     if st.button("➕ Añadir ticker a watchlist", use_container_width=True) and ticker:
         wl = sorted(set(wl + [ticker]))
         save_watchlist(wl)
-        st.experimental_rerun()
+        st.rerun()
 
     if wl:
         chosen = st.selectbox(
@@ -353,16 +397,40 @@ with st.sidebar:
         if st.button("➡️ Ir al seleccionado", use_container_width=True):
             sset("custom", "")
             sset("label", next((k for k, v in options.items() if v == chosen), "Apple (AAPL)"))
-            st.experimental_rerun()
+            st.rerun()
 
         remove = st.multiselect("Quitar de watchlist", wl, [])
         if st.button("🗑️ Quitar seleccionados", use_container_width=True) and remove:
             wl = [t for t in wl if t not in remove]
             save_watchlist(wl)
-            st.experimental_rerun()
+            st.rerun()
     else:
         st.caption("Tu watchlist está vacía.")
 
+    # Exportación masiva para notebooks
+    with st.expander("📦 Exportar datos"):
+        export_panel(ticker, peers, period, interval, source_key)
+
+    # Estado de la caché en memoria
+    with st.expander("🧠 Caché"):
+        cs = cache_stats()
+        d = cs["memory"]
+        st.caption(
+            f"Entradas: **{d['entries']}** · "
+            f"{d['bytes'] / 2**20:,.1f} / {d['budget_bytes'] / 2**20:,.0f} MB · "
+            f"aciertos {d['hit_rate'] * 100 if d['hits'] + d['misses'] else 0:.0f}% · "
+            f"expulsadas {d['evictions']}"
+        )
+        for group, g in sorted(cs["groups"].items()):
+            st.caption(f"{group.rsplit('.', 1)[-1]}: {g['entries']} · {g['bytes'] / 2**20:,.1f} MB")
+        for kind, f in cs["singleflight"].items():
+            st.caption(f"Coalescidas ({kind}): {f.get('coalesced', 0)} de {f.get('calls', 0)}")
+
+# Precalentado en segundo plano (un hilo por proceso de servidor)
+start_warmer(list(options.values()), MARKET_TICKERS)
+# Evaluación de alertas en segundo plano (aunque nadie tenga la página abierta)
+start_alerts()
+
 # =========================
 # Header
 # =========================
@@ -370,38 +438,25 @@ st.title("📊 Finance Dashboard")
 st.caption("Precios, indicadores técnicos y (si están disponibles) fundamentales.")
 st.write(f"**Ticker actual:** `{ticker}`")
 
-# =========================
-# Tabs dinámicas
-# =========================
-has_fund = fundamentals_available(ticker)
-tab_names = ["Visión general", "Técnicos", "Comparativa"]
-if has_fund:
-    tab_names.insert(1, "Ratios")
-    tab_names.insert(2, "Estados financieros")
-tabs = st.tabs(tab_names)
-
-def style_fig(fig, dark: bool):
-    """Ajustes de contraste para todas las figuras Plotly."""
-    if dark:
-        paper_bg = "#0f1115"; plot_bg = "#0f1115"
-        grid = "#2a2f3a"; axis = "#cbd5e1"; font = "#e6e6e6"; template = "plotly_dark"
-    else:
-        paper_bg = "#ffffff"; plot_bg = "#ffffff"
-        grid = "#d1d5db"; axis = "#111827"; font = "#0b1220"; template = "plotly_white"
-    fig.update_layout(
-        template=template, paper_bgcolor=paper_bg, plot_bgcolor=plot_bg,
-        font=dict(color=font),
-        xaxis=dict(gridcolor=grid, zerolinecolor=grid, linecolor=axis,
-                   tickfont=dict(color=axis), titlefont=dict(color=axis)),
-        yaxis=dict(gridcolor=grid, zerolinecolor=grid, linecolor=axis,
-                   tickfont=dict(color=axis), titlefont=dict(color=axis)),
-        margin=dict(l=10, r=10, t=50, b=10), height=420
-    ); return fig
+def zoom_range(frame: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Si la serie tiene más barras que píxeles tiene el gráfico, muestra un
+    rango de fechas y devuelve solo ese tramo: al estrecharlo lo bastante
+    se dibuja a resolución completa.
+    """
+    if len(frame) <= CHART_PX or not isinstance(frame.index, pd.DatetimeIndex):
+        return frame
+    first, last = frame.index[0].date(), frame.index[-1].date()
+    start, end = st.slider("Rango visible", first, last, (first, last), format="YYYY-MM-DD",
+                           key=f"{key}_{first}_{last}")
+    days = frame.index.normalize()
+    return frame[(days >= pd.Timestamp(start)) & (days <= pd.Timestamp(end))]
 
 # =========================
 # Visión general
 # =========================
-with tabs[0]:
+@st.fragment
+def view_overview():
     with st.spinner("Cargando datos de precios..."):
         df = price_history(ticker, period=period, interval=interval, source=source_key)
 
@@ -419,7 +474,7 @@ with tabs[0]:
 
         c1, c2, c3, c4 = st.columns(4)
         last_price = df["Close"].iloc[-1]
-        y_last = df["Close"].resample("Y").last().pct_change().dropna()
+        y_last = df["Close"].resample("YE").last().pct_change().dropna()
         ytd_val = y_last.iloc[-1] if len(y_last) > 0 else df["Close"].pct_change().iloc[-252:].sum()
         vol21 = rolling_volatility(df, 21).dropna()
         vol21_val = vol21.iloc[-1] if len(vol21) else 0.0
@@ -432,109 +487,202 @@ with tabs[0]:
         with c4: metric_card("Rentabilidad anual media", f"{(avg_ann * 100):.2f}%")
 
         st.markdown("### Evolución del precio")
-        df_reset = df.reset_index()
-        if "Date" not in df_reset.columns:
-            df_reset = df_reset.rename(columns={df_reset.columns[0]: "Date"})
-        fig = px.line(df_reset, x="Date", y="Close", title=f"{ticker} – Precio de Cierre")
-        fig = style_fig(fig, sget("dark_mode", True))
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Descargas (CSV/PNG)
-        csv_bytes = df_reset.to_csv(index=False).encode("utf-8")
+        price_args = (zoom_range(df[["Close"]], "zoom_price"), ("Close",), f"{ticker} – Precio de Cierre",
+                      sget("dark_mode", True))
+        st.plotly_chart(line_figure(*price_args), use_container_width=True)
+
+        # Proyección Monte Carlo (solo si se pide; cacheada por última barra + parámetros)
+        if st.toggle("🔮 Proyección Monte Carlo", value=False, key="mc_on"):
+            m1, m2, m3 = st.columns(3)
+            with m1:
+                mc_mode = st.radio("Modelo", ["gbm", "bootstrap"], horizontal=True, key="mc_mode",
+                                   format_func=lambda m: "GBM" if m == "gbm" else "Bootstrap de rendimientos")
+            with m2:
+                mc_years = st.select_slider("Horizonte", [0.25, 0.5, 1.0, 2.0], value=1.0, key="mc_h",
+                                            format_func=lambda y: f"{int(y * 12)} meses")
+            with m3:
+                mc_paths = st.select_slider("Caminos", [5_000, 20_000, 50_000, 100_000], value=20_000, key="mc_n")
+            horizon = max(2, int(round(mc_years * PERIODS_PER_YEAR.get(interval, 252))))
+            with st.spinner("Simulando caminos..."):
+                proj = monte_carlo(df, horizon=horizon, n_paths=mc_paths, mode=mc_mode)
+            if proj.empty:
+                st.info("No hay histórico suficiente para proyectar.")
+            else:
+                hist_tail = df["Close"].iloc[-min(len(df), horizon):]
+                fig_mc = go.Figure()
+                fig_mc.add_trace(go.Scatter(x=hist_tail.index, y=hist_tail, name="Histórico", mode="lines"))
+                for lo_c, hi_c, alpha in (("P5", "P95", 0.15), ("P25", "P75", 0.3)):
+                    fig_mc.add_trace(go.Scatter(x=proj.index, y=proj[hi_c], mode="lines", line=dict(width=0),
+                                                showlegend=False, hoverinfo="skip"))
+                    fig_mc.add_trace(go.Scatter(x=proj.index, y=proj[lo_c], mode="lines", line=dict(width=0),
+                                                fill="tonexty", fillcolor=f"rgba(124,58,237,{alpha})",
+                                                name=f"{lo_c}–{hi_c}"))
+                fig_mc.add_trace(go.Scatter(x=proj.index, y=proj["P50"], name="Mediana", mode="lines",
+                                            line=dict(dash="dash")))
+                fig_mc.update_layout(title=f"{ticker} – Proyección Monte Carlo ({mc_mode.upper()})")
+                fig_mc = style_fig(fig_mc, sget("dark_mode", True))
+                st.plotly_chart(fig_mc, use_container_width=True)
+                end = proj.iloc[-1]
+                st.caption(
+                    f"{proj.attrs['__paths__']:,} caminos en {proj.attrs['__elapsed_s__']:.2f}s · "
+                    f"al final del horizonte: P5 ${end['P5']:,.2f} · mediana ${end['P50']:,.2f} · P95 ${end['P95']:,.2f}"
+                )
+
+        # Descargas (CSV/PNG): se generan al pulsar, no en cada rerun
         col_dl1, col_dl2 = st.columns(2)
         with col_dl1:
-            st.download_button("⬇️ Descargar precios (CSV)", data=csv_bytes,
-                               file_name=f"{ticker}_price_history.csv", mime="text/csv")
+            deferred_download("⬇️ Descargar precios (CSV)",
+                              lambda: df.rename_axis("Date").reset_index().to_csv(index=False).encode("utf-8"),
+                              f"{ticker}_price_history.csv", "text/csv", "csv_price")
         with col_dl2:
-            try:
-                png_bytes = io.BytesIO()
-                fig.write_image(png_bytes, format="png")
-                st.download_button("🖼️ Descargar gráfico (PNG)", data=png_bytes.getvalue(),
-                                   file_name=f"{ticker}_price.png", mime="image/png")
-            except Exception:
-                st.caption("Para exportar a PNG instala `kaleido`.")
+            png_download("🖼️ Descargar gráfico (PNG)", f"{ticker}_price.png", "png_price",
+                         lambda: line_figure_png(*price_args))
 
 # =========================
 # Ratios
 # =========================
-if has_fund:
-    with tabs[1]:
-        r = compute_ratios(ticker)
-        if all([pd.isna(v) for v in r.values()]):
-            st.info("No hay ratios disponibles para este ticker en yfinance.")
-        else:
-            c1, c2, c3 = st.columns(3)
-            c4, c5, c6 = st.columns(3)
-
-            def fmt(val, percent=False):
-                if val is None or (isinstance(val, float) and pd.isna(val)):
-                    return "—"
-                return f"{val * 100:.2f}%" if percent else f"{val:.2f}"
-
-            c1.metric("P/E", fmt(r.get("P/E")))
-            c2.metric("P/S", fmt(r.get("P/S")))
-            c3.metric("Current Ratio", fmt(r.get("Current Ratio")))
-            c4.metric("ROE", fmt(r.get("ROE"), percent=True))
-            c5.metric("ROA", fmt(r.get("ROA"), percent=True))
-            c6.write("")
-            st.caption("Fuente: yfinance (si está disponible para el ticker).")
+@st.fragment
+def view_ratios():
+    r = compute_ratios(ticker)
+    if all([pd.isna(v) for v in r.values()]):
+        st.info("No hay ratios disponibles para este ticker en yfinance.")
+    else:
+        c1, c2, c3 = st.columns(3)
+        c4, c5, c6 = st.columns(3)
+
+        def fmt(val, percent=False):
+            if val is None or (isinstance(val, float) and pd.isna(val)):
+                return "—"
+            return f"{val * 100:.2f}%" if percent else f"{val:.2f}"
+
+        c1.metric("P/E", fmt(r.get("P/E")))
+        c2.metric("P/S", fmt(r.get("P/S")))
+        c3.metric("Current Ratio", fmt(r.get("Current Ratio")))
+        c4.metric("ROE", fmt(r.get("ROE"), percent=True))
+        c5.metric("ROA", fmt(r.get("ROA"), percent=True))
+        c6.write("")
+        st.caption("Fuente: yfinance (si está disponible para el ticker).")
 
 # =========================
 # Estados financieros
 # =========================
-if has_fund:
-    with tabs[2]:
-        fin = get_financials(ticker)
-        if not any([not df.empty for df in fin.values()]):
-            st.info("No hay estados financieros disponibles para este ticker en yfinance.")
-        else:
-            colA, colB, colC = st.columns(3)
-            with colA:
-                st.subheader("Income Statement")
-                st.dataframe(fin.get("income"))
-            with colB:
-                st.subheader("Balance Sheet")
-                st.dataframe(fin.get("balance"))
-            with colC:
-                st.subheader("Cash Flow")
-                st.dataframe(fin.get("cashflow"))
+@st.fragment
+def view_statements():
+    fin = get_financials(ticker)
+    if not any([not df.empty for df in fin.values()]):
+        st.info("No hay estados financieros disponibles para este ticker en yfinance.")
+    else:
+        colA, colB, colC = st.columns(3)
+        with colA:
+            st.subheader("Income Statement")
+            st.dataframe(fin.get("income"))
+        with colB:
+            st.subheader("Balance Sheet")
+            st.dataframe(fin.get("balance"))
+        with colC:
+            st.subheader("Cash Flow")
+            st.dataframe(fin.get("cashflow"))
 
 # =========================
 # Técnicos
 # =========================
-with tabs[-2 if has_fund else 1]:
+@st.fragment
+def view_technicals():
+    c1, c2, c3, c4 = st.columns([3, 2, 2, 2])
+    with c1:
+        sma_w = st.multiselect("SMA", [5, 10, 20, 50, 100, 200], default=list(DEFAULT_WINDOWS["sma"]), key="win_sma")
+    with c2:
+        ema_w = st.multiselect("EMA", [9, 12, 26, 50, 100], default=list(DEFAULT_WINDOWS["ema"]), key="win_ema")
+    with c3:
+        rsi_w = st.multiselect("RSI", [7, 14, 21, 28], default=list(DEFAULT_WINDOWS["rsi"]), key="win_rsi")
+    with c4:
+        bb_w = st.number_input("Bollinger (ventana)", 5, 200, DEFAULT_WINDOWS["bb"][0], step=1, key="win_bb")
+    windows = {"sma": tuple(sorted(sma_w)), "ema": tuple(sorted(ema_w)),
+               "bb": (int(bb_w), 2.0), "rsi": tuple(sorted(rsi_w))}
+
     with st.spinner("Calculando indicadores técnicos..."):
         df = price_history(ticker, period=period, interval=interval, source=source_key)
-        tech = technicals(df)
+        if windows == DEFAULT_WINDOWS:
+            tech = technicals(df)  # motor incremental para las ventanas por defecto
+        else:
+            tech = custom_technicals(df, **windows)
 
     if tech.empty:
         st.warning("No se pudieron calcular técnicos (no hay precios).")
     else:
         st.markdown("### SMA/EMA y Bandas de Bollinger")
-        dfr = tech.reset_index()
-        if "Date" not in dfr.columns:
-            dfr = dfr.rename(columns={dfr.columns[0]: "Date"})
-        fig_t = px.line(
-            dfr,
-            x="Date",
-            y=["Close", "SMA20", "SMA50", "EMA12", "EMA26", "BB_Up", "BB_Mid", "BB_Lo"],
-            title=f"{ticker} – Técnicos (SMA/EMA/Bollinger)"
-        )
-        fig_t = style_fig(fig_t, sget("dark_mode", True))
+        tech_view = zoom_range(tech, "zoom_tech")
+        lines = (["Close"] + [f"SMA{w}" for w in windows["sma"]] + [f"EMA{w}" for w in windows["ema"]]
+                 + ["BB_Up", "BB_Mid", "BB_Lo"])
+        # Las medias y bandas son suaves: basta con los puntos elegidos sobre el cierre
+        fig_t = line_figure(tech_view, tuple(lines), f"{ticker} – Técnicos (SMA/EMA/Bollinger)",
+                            sget("dark_mode", True), by="Close")
         st.plotly_chart(fig_t, use_container_width=True)
 
-        st.markdown("### RSI(14)")
-        fig_rsi = px.line(dfr, x="Date", y="RSI14", title="RSI(14)")
-        fig_rsi.add_hline(y=70, line_dash="dash")
-        fig_rsi.add_hline(y=30, line_dash="dash")
-        fig_rsi = style_fig(fig_rsi, sget("dark_mode", True))
-        fig_rsi.update_layout(height=260)
-        st.plotly_chart(fig_rsi, use_container_width=True)
+        rsi_cols = [f"RSI{w}" for w in windows["rsi"]]
+        if rsi_cols:
+            label = "RSI(" + ", ".join(str(w) for w in windows["rsi"]) + ")"
+            st.markdown(f"### {label}")
+            fig_rsi = line_figure(tech_view, tuple(rsi_cols), label, sget("dark_mode", True),
+                                  height=260, hlines=(70.0, 30.0))
+            st.plotly_chart(fig_rsi, use_container_width=True)
+
+# =========================
+# Backtest
+# =========================
+@st.fragment
+def view_backtest():
+    st.caption("Largo mientras la media rápida supera a la lenta; el filtro RSI entra tras sobreventa y sale en sobrecompra.")
+    b1, b2, b3, b4, b5 = st.columns([2, 3, 3, 3, 2])
+    with b1:
+        bt_ma = st.multiselect("Media", ["sma", "ema"], default=["sma", "ema"], key="bt_ma")
+    with b2:
+        bt_fast = st.multiselect("Rápida", [5, 10, 20, 50], default=[10, 20, 50], key="bt_fast")
+    with b3:
+        bt_slow = st.multiselect("Lenta", [50, 100, 150, 200], default=[50, 100, 200], key="bt_slow")
+    with b4:
+        band_opts = {"Sin filtro": (0, 100), "30/70": (30, 70), "20/80": (20, 80), "40/60": (40, 60)}
+        bt_bands = st.multiselect("Bandas RSI(14)", list(band_opts), default=["Sin filtro", "30/70"], key="bt_bands")
+    with b5:
+        bt_cost = st.number_input("Coste (pb)", 0.0, 100.0, 5.0, step=1.0, key="bt_cost")
+
+    strategies = grid(ma=bt_ma, fast=bt_fast, slow=bt_slow, rsi_bands=[band_opts[b] for b in bt_bands])
+    bt_tickers = list(dict.fromkeys([ticker] + peers))
+    st.write(f"{len(strategies)} combinaciones × {len(bt_tickers)} tickers ({', '.join(bt_tickers)}), periodo {period}/{interval}.")
+
+    if st.button("▶️ Ejecutar backtest", key="bt_run") and strategies:
+        with st.spinner("Evaluando combinaciones..."):
+            sset("bt_result", backtest_grid(tuple(bt_tickers), tuple(strategies), period=period,
+                                            interval=interval, source=source_key, cost_bps=bt_cost))
+
+    bt = sget("bt_result", None)
+    if bt is not None and not bt.empty:
+        bt = bt.sort_values("Sharpe", ascending=False, na_position="last")
+        pct = ["Rentabilidad", "CAGR", "Máx. drawdown", "Exposición", "Comprar y mantener"]
+        st.dataframe(
+            bt.style.format({"Sharpe": "{:.2f}", "Operaciones": "{:.0f}", **{c: "{:+.2%}" for c in pct}}, na_rep="—"),
+            use_container_width=True, hide_index=True,
+        )
+        best = bt.iloc[0]
+        best_df = price_history(best["Ticker"], period=period, interval=interval, source=source_key)
+        if not best_df.empty:
+            strat = Strategy(*(best[f] for f in Strategy._fields))
+            curve = pd.concat([equity_curve(best_df["Close"], strat, cost_bps=bt_cost),
+                               (best_df["Close"] / best_df["Close"].iloc[0]).rename("Comprar y mantener")], axis=1)
+            fig_bt = line_figure(curve, tuple(curve.columns),
+                                 f"Mejor Sharpe: {best['Ticker']} {strat.ma.upper()} {strat.fast}/{strat.slow} RSI {strat.rsi_low:.0f}/{strat.rsi_high:.0f}",
+                                 sget("dark_mode", True))
+            st.plotly_chart(fig_bt, use_container_width=True)
+        deferred_download("⬇️ Descargar resultados (CSV)", lambda: bt.to_csv(index=False).encode("utf-8"),
+                          "backtest.csv", "text/csv", "csv_bt")
+    elif bt is not None:
+        st.warning("No hay precios reales para los tickers elegidos.")
 
 # =========================
 # Comparativa (con descargas)
 # =========================
-with tabs[-1]:
+@st.fragment
+def view_comparison():
     peer_list = [ticker] + [p for p in peers if p != ticker]
     dedup = []
     for tk in peer_list:
@@ -546,8 +694,9 @@ with tabs[-1]:
         st.info("Elige al menos un ticker en 'Comparar con' para construir la comparativa.")
     else:
         combined = []
+        frames = price_history_many(peer_list, period=period, interval=interval, source=source_key)
         for tk in peer_list:
-            dfi = price_history(tk, period=period, interval=interval, source=source_key)
+            dfi = frames.get(tk, pd.DataFrame())
             if dfi.empty:
                 continue
             tmp = dfi[["Close"]].rename(columns={"Close": tk})
@@ -558,27 +707,221 @@ with tabs[-1]:
             merged = merged.loc[:, ~merged.columns.duplicated()]
             rel = merged / merged.iloc[0] - 1.0
 
-            rel_reset = rel.reset_index()
-            if "Date" not in rel_reset.columns:
-                rel_reset = rel_reset.rename(columns={rel_reset.columns[0]: "Date"})
-
             st.markdown("### Rentabilidad relativa (desde el inicio del periodo)")
-            fig3 = px.line(rel_reset, x="Date", y=list(rel.columns), title="Comparativa de rentabilidades")
-            fig3 = style_fig(fig3, sget("dark_mode", True))
-            st.plotly_chart(fig3, use_container_width=True)
+            rel_args = (rel, tuple(rel.columns), "Comparativa de rentabilidades", sget("dark_mode", True))
+            st.plotly_chart(line_figure(*rel_args), use_container_width=True)
 
             colc1, colc2 = st.columns(2)
             with colc1:
-                comp_csv = rel_reset.to_csv(index=False).encode("utf-8")
-                st.download_button("⬇️ Descargar comparativa (CSV)", data=comp_csv,
-                                   file_name=f"comparativa_{'_'.join(rel.columns)}.csv", mime="text/csv")
+                deferred_download("⬇️ Descargar comparativa (CSV)",
+                                  lambda: rel.rename_axis("Date").reset_index().to_csv(index=False).encode("utf-8"),
+                                  f"comparativa_{'_'.join(rel.columns)}.csv", "text/csv", "csv_cmp")
             with colc2:
-                try:
-                    png_bytes3 = io.BytesIO()
-                    fig3.write_image(png_bytes3, format="png")
-                    st.download_button("🖼️ Descargar comparativa (PNG)", data=png_bytes3.getvalue(),
-                                       file_name=f"comparativa_{'_'.join(rel.columns)}.png", mime="image/png")
-                except Exception:
-                    st.caption("Para exportar la imagen instala el paquete `kaleido`.")
+                png_download("🖼️ Descargar comparativa (PNG)", f"comparativa_{'_'.join(rel.columns)}.png",
+                             "png_cmp", lambda: line_figure_png(*rel_args))
+
+            # Correlaciones y beta frente a un benchmark
+            st.markdown("### Correlaciones y beta")
+            k1, k2 = st.columns(2)
+            with k1:
+                benchmark = st.text_input("Benchmark", value=sget("benchmark", "SPY"), key="cmp_bench").upper().strip() or "SPY"
+                sset("benchmark", benchmark)
+            with k2:
+                corr_window = st.select_slider("Ventana móvil (barras)", [21, 63, 126, 252], value=63, key="cmp_win")
+            stats = correlation_stats(tuple(peer_list), benchmark=benchmark, period=period,
+                                      interval=interval, source=source_key, window=corr_window)
+            if stats["matrix"].empty:
+                st.info(stats["message"] or "No hay fechas comunes suficientes para calcular correlaciones.")
+            else:
+                h1, h2 = st.columns([3, 2])
+                with h1:
+                    fig_corr = lazy_module("plotly.express").imshow(stats["matrix"], text_auto=".2f", zmin=-1, zmax=1,
+                                         color_continuous_scale="RdBu_r", title="Matriz de correlaciones")
+                    fig_corr = style_fig(fig_corr, sget("dark_mode", True))
+                    st.plotly_chart(fig_corr, use_container_width=True)
+                with h2:
+                    st.markdown(f"**Frente a {benchmark} (todo el periodo)**")
+                    st.dataframe(stats["betas"].style.format("{:.2f}", na_rep="—"), use_container_width=True)
+
+                for key, title in (("corr", f"Correlación móvil con {ticker} ({corr_window} barras)"),
+                                   ("beta", f"Beta móvil frente a {benchmark} ({corr_window} barras)")):
+                    roll = stats[key]
+                    if roll.empty or roll.shape[1] == 0:
+                        continue
+                    fig_roll = line_figure(roll, tuple(roll.columns), title, sget("dark_mode", True), height=320)
+                    st.plotly_chart(fig_roll, use_container_width=True)
+                    if key == "corr":
+                        st.caption(f"Solo los pares con {ticker}; el resto, de todo el periodo, en la matriz.")
         else:
             st.warning("No se pudo construir la comparativa con los tickers dados.")
+
+# =========================
+# Cartera
+# =========================
+@st.fragment
+def view_portfolio():
+    wl_now = load_watchlist()
+    p1, p2, p3 = st.columns([3, 2, 2])
+    with p1:
+        pf_universe = st.radio("Activos", ["Watchlist", "Watchlist + lista de empresas"], horizontal=True, key="pf_src")
+    with p2:
+        pf_rf = st.number_input("Tipo sin riesgo (%)", 0.0, 20.0, 2.0, step=0.25, key="pf_rf")
+    with p3:
+        pf_shrink = st.slider("Encogimiento de Σ", 0.0, 1.0, 0.1, step=0.05, key="pf_shrink")
+    pf_tickers = wl_now if pf_universe == "Watchlist" else list(dict.fromkeys(wl_now + list(options.values())))
+
+    if len(pf_tickers) < 2:
+        st.info("Añade al menos dos tickers a la watchlist (o usa también la lista de empresas).")
+    elif st.button(f"⚖️ Optimizar {len(pf_tickers)} activos", key="pf_run"):
+        with st.spinner("Estimando covarianzas y resolviendo la frontera..."):
+            sset("pf_result", optimize_portfolio(tuple(pf_tickers), period=period, interval=interval,
+                                                 source=source_key, rf=pf_rf / 100, shrink=pf_shrink))
+
+    pf = sget("pf_result", None)
+    if pf == {}:
+        st.warning("Hacen falta al menos dos tickers con precios reales.")
+    elif pf:
+        fig_pf = lazy_module("plotly.express").scatter(pf["random"], x="Volatilidad", y="Rentabilidad", color="Sharpe", opacity=0.35,
+                            title="Frontera eficiente (largo-solo)")
+        fig_pf.add_scatter(x=pf["frontier"]["Volatilidad"], y=pf["frontier"]["Rentabilidad"],
+                           mode="lines", name="Frontera")
+        for name, row in pf["summary"].iterrows():
+            fig_pf.add_scatter(x=[row["Volatilidad"]], y=[row["Rentabilidad"]], mode="markers",
+                               marker=dict(size=14, symbol="star"), name=name)
+        fig_pf.update_layout(xaxis_tickformat=".0%", yaxis_tickformat=".0%")
+        fig_pf = style_fig(fig_pf, sget("dark_mode", True))
+        st.plotly_chart(fig_pf, use_container_width=True)
+
+        w1, w2 = st.columns([3, 2])
+        with w1:
+            w = pf["weights"]
+            w = w[(w["Mín. varianza"] > 1e-4) | (w["Máx. Sharpe"] > 1e-4)].sort_values("Máx. Sharpe", ascending=False)
+            st.dataframe(w.style.format("{:.2%}"), use_container_width=True)
+        with w2:
+            st.dataframe(pf["summary"].style.format({"Rentabilidad": "{:.2%}", "Volatilidad": "{:.2%}",
+                                                     "Sharpe": "{:.2f}"}), use_container_width=True)
+            deferred_download("⬇️ Descargar pesos (CSV)", lambda: pf["weights"].to_csv().encode("utf-8"),
+                              "cartera_pesos.csv", "text/csv", "csv_pf")
+
+# =========================
+# Screener
+# =========================
+@st.fragment
+def view_screener():
+    c1, c2 = st.columns([2, 3])
+    with c1:
+        universe_src = st.radio("Universo", ["Watchlist + lista de empresas", "Fichero (CSV/TXT)"], key="scr_src")
+    with c2:
+        upload = st.file_uploader("Tickers (columna 'ticker'/'symbol' o separados por comas)",
+                                  type=["csv", "txt"], key="scr_file")
+    if universe_src.startswith("Fichero"):
+        universe = parse_universe(upload.getvalue()) if upload is not None else []
+    else:
+        universe = list(dict.fromkeys(load_watchlist() + list(options.values())))
+
+    f1, f2, f3, f4 = st.columns(4)
+    with f1:
+        rsi_range = st.slider("RSI", 0, 100, (0, 100), key="scr_rsi")
+    with f2:
+        min_mom = st.number_input("Momentum 6m mínimo (%)", value=-100.0, step=5.0, key="scr_mom")
+    with f3:
+        max_vol = st.number_input("Volatilidad máxima (%)", value=200.0, step=5.0, key="scr_vol")
+    with f4:
+        sort_by = st.selectbox("Ordenar por", ["Momentum", "RSI", "Volatilidad", "Dist. SMA", "Drawdown"], key="scr_sort")
+
+    if not universe:
+        st.info("Sube un fichero con tickers o añade tickers a la watchlist.")
+    else:
+        with st.spinner(f"Analizando {len(universe)} tickers..."):
+            table = screen_universe(tuple(universe), period="1y", source=source_key)
+        shown = apply_filters(
+            table,
+            rsi_range=None if rsi_range == (0, 100) else rsi_range,
+            min_momentum=None if min_mom <= -100 else min_mom / 100,
+            max_volatility=None if max_vol >= 200 else max_vol / 100,
+            sort_by=sort_by,
+            ascending=sort_by in ("Volatilidad", "RSI"),
+        )
+        st.caption(f"{len(shown)} de {len(table)} tickers con datos (de {len(universe)} pedidos).")
+        pct = ["Volatilidad", "Momentum", "Dist. SMA", "Drawdown", "Máx. drawdown"]
+        st.dataframe(
+            shown.style.format({"Último": "{:,.2f}", "RSI": "{:.1f}", **{c: "{:+.2%}" for c in pct}}, na_rep="—"),
+            use_container_width=True,
+        )
+        deferred_download("⬇️ Descargar screener (CSV)", lambda: shown.to_csv().encode("utf-8"),
+                          "screener.csv", "text/csv", "csv_scr")
+
+# =========================
+# Alertas
+# =========================
+@st.fragment
+def view_alerts():
+    st.caption("Se evalúan en segundo plano sobre las barras nuevas; una regla avisa cuando su condición pasa a cumplirse. "
+               "Campos: Close, SMA20, SMA50, EMA12, EMA26, BB_Up, BB_Mid, BB_Lo, RSI14, Vol21, Return.")
+    a1, a2, a3 = st.columns([2, 4, 1])
+    with a1:
+        al_ticker = st.text_input("Ticker", value=ticker, key="al_ticker").upper().strip()
+    with a2:
+        al_expr = st.text_input("Regla", placeholder="RSI14 < 30 · Close crosses above SMA50 · Vol21 > 40%", key="al_expr")
+    with a3:
+        st.write("")
+        if st.button("➕ Añadir", key="al_add") and al_ticker and al_expr:
+            try:
+                add_rule(al_ticker, al_expr)
+                st.success(f"Regla añadida para {al_ticker}.")
+            except ValueError as e:
+                st.error(str(e))
+
+    rules_df = list_rules()
+    if rules_df.empty:
+        st.info("No hay reglas todavía.")
+    else:
+        st.dataframe(rules_df, use_container_width=True, hide_index=True)
+        d1, d2 = st.columns([3, 1])
+        with d1:
+            to_delete = st.multiselect("Borrar reglas", rules_df["id"].tolist(), key="al_del",
+                                       format_func=lambda i: f"#{i} " + " ".join(rules_df.set_index("id").loc[i, ["ticker", "expr"]]))
+        with d2:
+            st.write("")
+            if st.button("🗑️ Borrar", key="al_del_btn") and to_delete:
+                delete_rules(to_delete)
+                st.rerun(scope="fragment")
+
+    st.markdown("### Alertas disparadas")
+    if st.button("🔔 Evaluar ahora", key="al_run"):
+        with st.spinner("Evaluando reglas..."):
+            n_fired = run_cycle()
+        st.caption(f"{n_fired} alertas nuevas.")
+    fired_df = recent_alerts()
+    if fired_df.empty:
+        st.caption("Ninguna alerta disparada todavía.")
+    else:
+        st.dataframe(fired_df, use_container_width=True, hide_index=True)
+
+# =========================
+# Pestañas (solo se ejecuta la abierta)
+# =========================
+VIEWS = {
+    "Visión general": view_overview,
+    "Ratios": view_ratios,
+    "Estados financieros": view_statements,
+    "Técnicos": view_technicals,
+    "Backtest": view_backtest,
+    "Comparativa": view_comparison,
+    "Cartera": view_portfolio,
+    "Screener": view_screener,
+    "Alertas": view_alerts,
+}
+try:
+    # Pestañas con estado: al cambiar de pestaña se relanza el script y solo
+    # la seleccionada (tab.open) calcula y pinta su contenido
+    tab_list = st.tabs(list(VIEWS), key="main_tab", on_change="rerun")
+    shown = [(name, tab) for name, tab in zip(VIEWS, tab_list) if tab.open]
+except TypeError:
+    # Streamlit sin pestañas perezosas: selector horizontal con el mismo efecto
+    choice = st.radio("Sección", list(VIEWS), horizontal=True, key="main_tab", label_visibility="collapsed")
+    shown = [(choice, st.container())]
+
+for name, container in shown:
+    with container:
+        VIEWS[name]()
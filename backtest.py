@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import os
+import itertools
+import threading
+import multiprocessing as mp
+import concurrent.futures as cf
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.indicators import indicator_kernel
+
+# Procesos del pool (por defecto, todos los núcleos)
+WORKERS = int(os.environ.get("FINANCE_DASHBOARD_BT_WORKERS", "0")) or (os.cpu_count() or 1)
+# Estrategias por tarea: trozos más pequeños reparten mejor, más grandes amortizan el envío
+CHUNK = 64
+# Por debajo de esto (barras × estrategias) no compensa arrancar procesos
+INLINE_CELLS = 2_000_000
+
+METRICS = ["Rentabilidad", "CAGR", "Sharpe", "Máx. drawdown", "Operaciones", "Exposición"]
+
+
+class Strategy(NamedTuple):
+    """
+    Largo mientras la media rápida está por encima de la lenta y el filtro RSI
+    lo permite: el RSI por debajo de rsi_low habilita entrar y por encima de
+    rsi_high obliga a salir hasta el siguiente sobreventa. (0, 100) = sin filtro.
+    """
+    ma: str          # "sma" | "ema"
+    fast: int
+    slow: int
+    rsi_window: int = 14
+    rsi_low: float = 0.0
+    rsi_high: float = 100.0
+
+
+def grid(ma=("sma", "ema"), fast=(10, 20, 50), slow=(50, 100, 200), rsi_window=(14,),
+         rsi_bands=((0, 100), (30, 70))) -> list[Strategy]:
+    """Producto cartesiano de parámetros (solo combinaciones con fast < slow)."""
+    return [Strategy(m, f, s, w, float(lo), float(hi))
+            for m, f, s, w, (lo, hi) in itertools.product(ma, fast, slow, rsi_window, rsi_bands)
+            if f < s]
+
+
+# =========================
+# Núcleo vectorizado (una serie × N estrategias)
+# =========================
+
+def _rsi_state(rsi: np.ndarray, low: float, high: float) -> np.ndarray:
+    """Filtro RSI con memoria sin bucles: último evento (1 = <low, 0 = >high) propagado hacia delante."""
+    events = np.where(rsi < low, 1, np.where(rsi > high, 0, -1))
+    events = np.concatenate(([1], events))  # al principio se permite operar
+    idx = np.where(events >= 0, np.arange(len(events)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return events[idx][1:].astype(bool)
+
+
+def positions(close: np.ndarray, strategies: list[Strategy]) -> np.ndarray:
+    """Matriz (barras × estrategias) de posiciones 0/1 al cierre de cada barra."""
+    sma = sorted({w for s in strategies if s.ma == "sma" for w in (s.fast, s.slow)})
+    ema = sorted({w for s in strategies if s.ma == "ema" for w in (s.fast, s.slow)})
+    rsi = sorted({s.rsi_window for s in strategies if (s.rsi_low, s.rsi_high) != (0.0, 100.0)})
+    ind = indicator_kernel(close, sma=tuple(sma), ema=tuple(ema), bb=None, rsi=tuple(rsi))
+
+    states: dict[tuple, np.ndarray] = {}
+    cols = []
+    for s in strategies:
+        prefix = "SMA" if s.ma == "sma" else "EMA"
+        with np.errstate(invalid="ignore"):
+            trend = ind[f"{prefix}{s.fast}"] > ind[f"{prefix}{s.slow}"]
+        if (s.rsi_low, s.rsi_high) != (0.0, 100.0):
+            key = (s.rsi_window, s.rsi_low, s.rsi_high)
+            if key not in states:
+                states[key] = _rsi_state(ind[f"RSI{s.rsi_window}"], s.rsi_low, s.rsi_high)
+            trend = trend & states[key]
+        cols.append(trend)
+    return np.column_stack(cols)
+
+
+def evaluate(close: np.ndarray, strategies: list[Strategy], periods_per_year: float = 252,
+             cost_bps: float = 0.0) -> np.ndarray:
+    """
+    Métricas (estrategias × METRICS) de todas las estrategias a la vez.
+    La posición decidida al cierre t se aplica al rendimiento de t+1; cada
+    cambio de posición paga cost_bps puntos básicos.
+    """
+    close = np.asarray(close, dtype="float64")
+    pos = positions(close, strategies).astype(np.int8)
+    rets = close[1:] / close[:-1] - 1.0
+    changes = np.abs(np.diff(pos, axis=0, prepend=0))
+    strat = pos[:-1] * rets[:, None] - (cost_bps / 1e4) * changes[:-1]
+
+    equity = np.cumprod(1.0 + strat, axis=0)
+    years = max(len(rets) / periods_per_year, 1e-9)
+    total = equity[-1] - 1.0
+    cagr = np.where(equity[-1] > 0, equity[-1] ** (1.0 / years) - 1.0, -1.0)
+    sd = strat.std(axis=0, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(sd > 0, strat.mean(axis=0) / sd * np.sqrt(periods_per_year), np.nan)
+        max_dd = (equity / np.maximum.accumulate(equity, axis=0) - 1.0).min(axis=0)
+    trades = changes.sum(axis=0)
+    exposure = pos[:-1].mean(axis=0)
+    return np.column_stack([total, cagr, sharpe, max_dd, trades, exposure])
+
+
+def equity_curve(close: pd.Series, strategy: Strategy, cost_bps: float = 0.0) -> pd.Series:
+    """Curva de capital (base 1) de una estrategia, para graficar."""
+    values = close.to_numpy(dtype="float64")
+    pos = positions(values, [strategy])[:, 0].astype(np.int8)
+    rets = values[1:] / values[:-1] - 1.0
+    changes = np.abs(np.diff(pos, prepend=0))
+    strat = pos[:-1] * rets - (cost_bps / 1e4) * changes[:-1]
+    return pd.Series(np.concatenate(([1.0], np.cumprod(1.0 + strat))), index=close.index, name="Estrategia")
+
+
+# =========================
+# Reparto en procesos
+# =========================
+
+_POOL: cf.ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def process_pool() -> cf.ProcessPoolExecutor:
+    """
+    Pool único por proceso para cálculo pesado (backtest, Monte Carlo);
+    'spawn' porque el servidor tiene hilos vivos (fork no es seguro).
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = cf.ProcessPoolExecutor(max_workers=WORKERS, mp_context=mp.get_context("spawn"))
+        return _POOL
+
+
+def _task(close: np.ndarray, strategies: list[Strategy], periods_per_year: float, cost_bps: float) -> np.ndarray:
+    return evaluate(close, strategies, periods_per_year, cost_bps)
+
+
+def run_grid(closes: dict[str, np.ndarray], strategies: list[Strategy], periods_per_year: float = 252,
+             cost_bps: float = 0.0, workers: int | None = None) -> pd.DataFrame:
+    """
+    Evalúa tickers × estrategias: cada tarea es (ticker, trozo de CHUNK
+    estrategias) vectorizada en NumPy; las tareas se reparten en un pool de
+    procesos (escala con los núcleos). Si el trabajo es pequeño o workers=1
+    se hace en el propio proceso.
+    """
+    workers = WORKERS if workers is None else workers
+    closes = {tk: np.asarray(c, dtype="float64") for tk, c in closes.items() if len(c) > 2}
+    chunks = [strategies[i:i + CHUNK] for i in range(0, len(strategies), CHUNK)]
+    tasks = [(tk, chunk) for tk in closes for chunk in chunks]
+    cells = sum(len(closes[tk]) * len(chunk) for tk, chunk in tasks)
+
+    if workers <= 1 or len(tasks) == 1 or cells < INLINE_CELLS:
+        results = [_task(closes[tk], chunk, periods_per_year, cost_bps) for tk, chunk in tasks]
+    else:
+        pool = process_pool() if workers == WORKERS else cf.ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"))
+        futs = [pool.submit(_task, closes[tk], chunk, periods_per_year, cost_bps) for tk, chunk in tasks]
+        results = [f.result() for f in futs]
+        if pool is not _POOL:
+            pool.shutdown()
+
+    rows = []
+    for (tk, chunk), metrics in zip(tasks, results):
+        hold = closes[tk][-1] / closes[tk][0] - 1.0
+        for s, m in zip(chunk, metrics):
+            rows.append((tk, *s, *m, hold))
+    columns = ["Ticker", *Strategy._fields, *METRICS, "Comprar y mantener"]
+    return pd.DataFrame(rows, columns=columns)
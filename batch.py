@@ -0,0 +1,179 @@
+"""
+Informes por lotes sin Streamlit: precios, técnicos y ratios de cientos de
+tickers repartidos en un pool de procesos, con los resultados en disco.
+
+    python -m src.batch tickers.txt --out informes/ --workers 8
+    python -m src.batch AAPL MSFT NVDA --period 10y --format csv --no-ratios
+
+Deja en --out un fichero por ticker en prices/ (mismas columnas que la
+exportación de la app, ver src/export.py) y summary.<formato> con una fila
+por ticker: fuente, barras, último valor de cada indicador, ratios y estado.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing as mp
+import concurrent.futures as cf
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.finance import price_history_many, compute_ratios
+from src.export import FORMATS, formats, ticker_table, _write
+from src.indicators import COLUMNS as INDICATORS
+from src.screener import parse_universe
+
+# La descarga es sobre todo espera de red: más procesos solo multiplican el ritmo contra Yahoo
+WORKERS = int(os.environ.get("FINANCE_DASHBOARD_BATCH_WORKERS", "4"))
+CHUNK = 25  # tickers por tarea: una descarga agrupada de Yahoo por trozo
+REPORT_DIR = os.environ.get(
+    "FINANCE_DASHBOARD_REPORT_DIR", os.path.expanduser("~/.finance-dashboard/reports")
+)
+RATIOS = ("P/E", "P/S", "Current Ratio", "ROE", "ROA")
+SUMMARY = ["Ticker", "Status", "Source", "Bars", "First", "Last", "Close", *INDICATORS, "RelReturn", *RATIOS]
+
+
+# =========================
+# Trabajo por trozo (en el worker)
+# =========================
+
+def _summary_row(ticker: str, df: pd.DataFrame, table: pd.DataFrame | None, ratios: dict | None,
+                 status: str) -> dict:
+    row = {"Ticker": ticker, "Status": status, "Source": df.attrs.get("__source__"), "Bars": len(df),
+           "First": df.index[0] if len(df) else pd.NaT, "Last": df.index[-1] if len(df) else pd.NaT}
+    last = table.iloc[-1] if table is not None and len(table) else None
+    for col in ("Close", *INDICATORS, "RelReturn"):
+        row[col] = float(last[col]) if last is not None else np.nan
+    for name in RATIOS:
+        row[name] = float((ratios or {}).get(name, np.nan))
+    return row
+
+
+def run_chunk(tickers: list[str], out_dir: str, period: str = "5y", interval: str = "1d",
+              source: str = "auto", fmt: str = "parquet", ratios: bool = True) -> list[dict]:
+    """
+    Descarga un trozo de tickers de una vez y, por ticker, calcula técnicos
+    y ratios, escribe su tabla en out_dir/prices y devuelve su fila del
+    resumen. Un ticker que falle no para el resto; los que solo tienen
+    datos demo se marcan y no se escriben.
+    """
+    rows = []
+    frames = price_history_many(tickers, period=period, interval=interval, source=source)
+    for tk in tickers:
+        df = frames.get(tk, pd.DataFrame())
+        if df.empty or df.attrs.get("__demo__"):
+            rows.append(_summary_row(tk, pd.DataFrame(), None, None, "sin datos"))
+            continue
+        try:
+            table = ticker_table(df, tk)
+            _write([table], os.path.join(out_dir, "prices", f"{tk}{FORMATS[fmt][0]}"), fmt)
+            rows.append(_summary_row(tk, df, table, compute_ratios(tk) if ratios else None, "ok"))
+        except Exception as e:
+            rows.append(_summary_row(tk, df, None, None, f"error: {e!r}"))
+    return rows
+
+
+# =========================
+# Reparto en el pool
+# =========================
+
+def _write_summary(summary: pd.DataFrame, path: str, fmt: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        if fmt == "parquet":
+            summary.to_parquet(tmp, index=False, compression="zstd")
+        else:
+            summary.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def run_batch(tickers: list[str], out_dir: str, period: str = "5y", interval: str = "1d",
+              source: str = "auto", fmt: str = "parquet", ratios: bool = True,
+              workers: int = WORKERS, chunk: int = CHUNK, progress=None) -> pd.DataFrame:
+    """
+    Reparte los tickers en trozos de 'chunk' sobre un pool de procesos
+    ('spawn', como src/backtest.py; con workers=1 en el propio proceso),
+    escribe el resumen y lo devuelve. Cada worker tiene su propia caché
+    (src.cache.MemoryCache); el almacén en disco (src/store.py) sí se
+    comparte, así que una segunda pasada solo pide la cola de cada serie.
+    """
+    if fmt not in formats():
+        raise ValueError(f"Formato no disponible: {fmt}. Opciones: {', '.join(formats())}.")
+    tickers = list(dict.fromkeys(t.upper().strip() for t in tickers if t and t.strip()))
+    os.makedirs(os.path.join(out_dir, "prices"), exist_ok=True)
+    chunks = [tickers[i:i + chunk] for i in range(0, len(tickers), chunk)]
+    args = (out_dir, period, interval, source, fmt, ratios)
+
+    rows: list[dict] = []
+    if workers <= 1 or len(chunks) <= 1:
+        for i, part in enumerate(chunks, 1):
+            rows += run_chunk(part, *args)
+            if progress:
+                progress(i, len(chunks))
+    else:
+        with cf.ProcessPoolExecutor(min(workers, len(chunks)), mp_context=mp.get_context("spawn")) as pool:
+            futs = {pool.submit(run_chunk, part, *args): part for part in chunks}
+            for i, fut in enumerate(cf.as_completed(futs), 1):
+                try:
+                    rows += fut.result()
+                except Exception as e:  # el worker murió: se marca el trozo entero
+                    rows += [{"Ticker": tk, "Status": f"error: {e!r}"} for tk in futs[fut]]
+                if progress:
+                    progress(i, len(chunks))
+
+    summary = pd.DataFrame(rows).reindex(columns=SUMMARY).sort_values("Ticker", kind="stable")
+    _write_summary(summary.reset_index(drop=True), os.path.join(out_dir, f"summary{FORMATS[fmt][0]}"), fmt)
+    return summary.reset_index(drop=True)
+
+
+# =========================
+# CLI
+# =========================
+
+def _read_tickers(items: list[str]) -> list[str]:
+    """Cada argumento es un fichero (CSV/TXT como en el screener) o un ticker."""
+    out = []
+    for item in items:
+        if os.path.isfile(item):
+            with open(item, "rb") as f:
+                out += parse_universe(f.read())
+        else:
+            out += parse_universe(item.encode("utf-8"))
+    return list(dict.fromkeys(out))
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m src.batch", description=__doc__.split("\n\n")[0].strip())
+    p.add_argument("tickers", nargs="+", help="ficheros con tickers (CSV/TXT) o tickers sueltos")
+    p.add_argument("--out", default=os.path.join(REPORT_DIR, date.today().isoformat()))
+    p.add_argument("--period", default="5y")
+    p.add_argument("--interval", default="1d", choices=("1d", "1wk", "1mo"))
+    p.add_argument("--source", default="auto", choices=("auto", "stooq"))
+    p.add_argument("--format", dest="fmt", default=formats()[0], choices=formats())
+    p.add_argument("--workers", type=int, default=WORKERS)
+    p.add_argument("--chunk", type=int, default=CHUNK)
+    p.add_argument("--no-ratios", dest="ratios", action="store_false", help="no pedir fundamentales")
+    a = p.parse_args(argv)
+
+    tickers = _read_tickers(a.tickers)
+    if not tickers:
+        p.error("no se ha encontrado ningún ticker")
+    t0 = time.perf_counter()
+    summary = run_batch(tickers, a.out, a.period, a.interval, a.source, a.fmt, a.ratios, a.workers, a.chunk,
+                        progress=lambda i, n: print(f"  trozo {i}/{n}", file=sys.stderr))
+    ok = int((summary["Status"] == "ok").sum())
+    print(f"{ok}/{len(tickers)} tickers con datos en {time.perf_counter() - t0:.1f} s → {a.out}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
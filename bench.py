@@ -0,0 +1,348 @@
+"""
+Micro-benchmarks del dashboard. Se ejecuta desde la carpeta que contiene src/:
+
+    python -m src.bench            # todos
+    python -m src.bench cache_keys # uno concreto
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _synthetic_daily(years: int = 45, ticker: str = "AAPL") -> pd.DataFrame:
+    """Histórico diario tipo 'max' (≈11k barras) sellado como lo hace price_history."""
+    idx = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=252 * years, name="Date")
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(idx))))
+    df = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99,
+                       "Close": close, "Volume": rng.integers(1e6, 1e7, len(idx)).astype(float)}, index=idx)
+    df["Return"] = df["Close"].pct_change()
+    df.attrs.update({"__source__": "yahoo", "__ticker__": ticker, "__interval__": "1d"})
+    return df
+
+
+def _timeit(fn, repeat: int = 50) -> float:
+    """Mediana en milisegundos."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(times))
+
+
+def bench_cache_keys() -> None:
+    """Coste de un rerun con caché caliente: hash completo del DF vs huella (_frame_key)."""
+    import streamlit as st
+    from src import finance
+    from src.cache import set_backend
+    from src.ui import streamlit_cache
+
+    set_backend(streamlit_cache)  # como en la app
+    df = _synthetic_daily()
+
+    def rerun(fns):
+        fns[0](df)
+        fns[1](df)
+        fns[2](df, 21)
+
+    old = [st.cache_data(show_spinner=False, ttl=600)(f.__wrapped__)
+           for f in (finance.technicals, finance.annual_returns, finance.rolling_volatility)]
+    new = [finance.technicals, finance.annual_returns, finance.rolling_volatility]
+    rerun(old), rerun(new)  # calentar ambas cachés
+
+    print(f"cache_keys  filas={len(df)}")
+    print(f"  hash completo : {_timeit(lambda: rerun(old)):8.2f} ms/rerun")
+    print(f"  huella        : {_timeit(lambda: rerun(new)):8.2f} ms/rerun")
+    print(f"  sin caché     : {_timeit(lambda: rerun([f.__wrapped__ for f in new]), 10):8.2f} ms/rerun")
+
+
+def bench_indicators() -> None:
+    """Kernel vectorizado (src/indicators.py) vs referencia pandas, de 1 año a 'max'."""
+    from src import finance
+    from src.indicators import _HAS_NUMBA, indicator_kernel, kernel_technicals
+
+    full = _synthetic_daily()
+    wide = {"sma": (10, 20, 50, 100, 200), "ema": (9, 12, 26, 50), "bb": (20, 2.0), "rsi": (7, 14, 21)}
+
+    def pandas_wide(close: pd.Series) -> None:
+        for w in wide["sma"]:
+            close.rolling(w).mean()
+        for w in wide["ema"]:
+            close.ewm(span=w, adjust=False).mean()
+        close.rolling(20).std()
+        delta = close.diff()
+        for w in wide["rsi"]:
+            delta.clip(lower=0).rolling(w).mean() / (-delta.clip(upper=0)).rolling(w).mean()
+
+    print(f"indicators  numba={_HAS_NUMBA}")
+    print(f"  {'años':>5} {'filas':>6} {'pandas 8':>9} {'kernel 8':>9} {'pandas 13':>10} {'kernel 13':>10}  (ms)")
+    indicator_kernel(full["Close"].to_numpy()[:300])  # compilar numba fuera del cronómetro
+    for years in (1, 2, 5, 10, 20, 45):
+        df = full.iloc[-252 * years:]
+        close = df["Close"].to_numpy()
+        t_ref = _timeit(lambda: finance._technicals_batch(df), 20)
+        t_ker = _timeit(lambda: kernel_technicals(df), 20)
+        t_ref_w = _timeit(lambda: pandas_wide(df["Close"]), 20)
+        t_ker_w = _timeit(lambda: indicator_kernel(close, **wide), 20)
+        print(f"  {years:>5} {len(df):>6} {t_ref:9.2f} {t_ker:9.2f} {t_ref_w:10.2f} {t_ker_w:10.2f}")
+
+
+def bench_screener(n_tickers: int = 300) -> None:
+    """Panel + métricas del screener para cientos de tickers con precios ya en caché."""
+    from src.screener import build_panel, screen
+
+    base = _synthetic_daily(1)
+    rng = np.random.default_rng(1)
+    frames = {}
+    for i in range(n_tickers):
+        df = base.copy()
+        df["Close"] = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, len(df))))
+        frames[f"T{i:03d}"] = df.iloc[rng.integers(0, 30):]  # longitudes distintas
+
+    t_panel = _timeit(lambda: build_panel(frames), 20)
+    panel, names = build_panel(frames)
+    t_screen = _timeit(lambda: screen(panel, names), 20)
+    print(f"screener  tickers={n_tickers} barras={len(panel)}")
+    print(f"  panel   : {t_panel:8.2f} ms")
+    print(f"  métricas: {t_screen:8.2f} ms")
+
+
+def bench_backtest(n_tickers: int = 8) -> None:
+    """Rejilla de estrategias × tickers 'max': en el propio proceso vs pool de procesos."""
+    from src.backtest import WORKERS, grid, run_grid
+
+    rng = np.random.default_rng(2)
+    base = _synthetic_daily()
+    closes = {f"T{i}": base["Close"].to_numpy() * np.exp(np.cumsum(rng.normal(0, 0.005, len(base))))
+              for i in range(n_tickers)}
+    strategies = grid(fast=(5, 10, 20, 50), slow=(50, 100, 150, 200), rsi_bands=((0, 100), (30, 70), (20, 80)))
+    run_grid(closes, strategies[:1], workers=WORKERS)  # arrancar el pool fuera del cronómetro
+
+    print(f"backtest  tickers={n_tickers} estrategias={len(strategies)} barras={len(base)} núcleos={os.cpu_count()}")
+    for workers in sorted({1, WORKERS}):
+        ms = _timeit(lambda: run_grid(closes, strategies, workers=workers), 3)
+        print(f"  workers={workers:<3}: {ms:9.1f} ms  ({ms / (n_tickers * len(strategies)):.3f} ms/combinación)")
+
+
+def bench_montecarlo() -> None:
+    """Caminos/segundo de la proyección por trozos (solo percentiles en memoria)."""
+    from src.montecarlo import CHUNK, simulate
+
+    close = _synthetic_daily(10)["Close"].to_numpy()
+    print(f"montecarlo  horizonte=252 trozo={CHUNK}")
+    for mode in ("gbm", "bootstrap"):
+        for n in (10_000, 100_000):
+            res = simulate(close, 252, n, mode, budget_s=60)
+            print(f"  {mode:<9} {n:>7} caminos: {res['elapsed_s'] * 1000:8.1f} ms "
+                  f"({res['paths'] / res['elapsed_s']:,.0f} caminos/s)")
+
+
+def bench_correlation(n_tickers: int = 21, years: int = 10, window: int = 63) -> None:
+    """Correlación y beta móviles de N tickers: sumas por ventana fusionadas vs rolling().corr() por par."""
+    from src.correlation import rolling_against
+
+    idx = _synthetic_daily(years).index
+    rng = np.random.default_rng(3)
+    common = rng.normal(0, 0.01, len(idx))
+    rets = pd.DataFrame({f"T{i}": common * rng.uniform(0.5, 1.5) + rng.normal(0, 0.01, len(idx))
+                         for i in range(n_tickers)}, index=idx)
+
+    def with_pandas():
+        for col in rets.columns:
+            rets[col].rolling(window).corr(rets["T0"])
+            rets[col].rolling(window).cov(rets["T1"]) / rets["T1"].rolling(window).var()
+
+    def with_numpy():
+        rolling_against(rets, "T0", window)
+        rolling_against(rets, "T1", window)
+
+    print(f"correlation  tickers={n_tickers} barras={len(rets)} ventana={window}")
+    print(f"  pandas por par : {_timeit(with_pandas, 10):8.2f} ms")
+    print(f"  NumPy fusionado: {_timeit(with_numpy, 10):8.2f} ms")
+
+
+def bench_portfolio() -> None:
+    """Estimación + frontera + máximo Sharpe + 20k carteras aleatorias para 25–200 activos."""
+    from src.portfolio import estimate, optimize
+
+    rng = np.random.default_rng(4)
+    print("portfolio  5 años diarios, largo-solo")
+    for n in (25, 100, 200):
+        factor = rng.normal(0, 0.01, (1260, 1))
+        rets = pd.DataFrame(factor * rng.uniform(0.5, 1.5, n) + rng.normal(0.0003, 0.015, (1260, n)))
+        t_est = _timeit(lambda: estimate(rets), 5)
+        mu, cov = estimate(rets)
+        t_opt = _timeit(lambda: optimize(mu, cov, rf=0.02), 3)
+        print(f"  activos={n:<4} Σ: {t_est:7.1f} ms   optimización: {t_opt:8.1f} ms")
+
+
+def bench_alerts(n_rules: int = 5000) -> None:
+    """Evaluación vectorizada de miles de reglas sobre un ticker (barras nuevas de un ciclo)."""
+    from src import finance
+    from src.alerts import evaluate
+
+    df = _synthetic_daily(1)
+    frame = finance._technicals_batch(df).assign(Vol21=df["Return"].rolling(21).std() * np.sqrt(252))
+    fields = ["RSI14", "Close", "Vol21"]
+    rng = np.random.default_rng(5)
+    rules = [(i, fields[i % 3], ["lt", "gt"][i % 2], "SMA50" if i % 3 == 1 else float(rng.uniform(0, 100)))
+             for i in range(n_rules)]
+    print(f"alerts  reglas={n_rules}")
+    for new_bars in (1, 5, 250):
+        ms = _timeit(lambda: evaluate(frame, rules, len(frame) - new_bars), 10)
+        print(f"  {new_bars:>3} barras nuevas: {ms:7.2f} ms")
+
+
+def bench_rerun(repeat: int = 5) -> None:
+    """
+    Latencia de un rerun completo de app.py (AppTest, sin navegador) con la
+    caché caliente: sin cambios, cambiando el modo oscuro y cambiando una
+    ventana en la pestaña Técnicos.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(os.path.dirname(__file__), "app.py"), default_timeout=300)
+
+    def run():
+        at.session_state["main_tab"] = "Técnicos"  # AppTest no conserva la pestaña entre reruns
+        at.run()
+
+    def dark():
+        tg = at.toggle[0]
+        tg.set_value(not tg.value)
+        run()
+
+    def window():
+        ms = next(m for m in at.multiselect if m.key == "win_sma")
+        ms.set_value([20] if ms.value != [20] else [20, 50])
+        run()
+
+    run(), run()  # calentar
+
+    print("rerun  app.py con caché caliente")
+    print(f"  sin cambios      : {_timeit(run, repeat):8.1f} ms")
+    print(f"  modo oscuro      : {_timeit(dark, repeat):8.1f} ms")
+    print(f"  ventana SMA      : {_timeit(window, repeat):8.1f} ms")
+
+
+def bench_downsample() -> None:
+    """LTTB / min-max sobre un histórico 'max' y tamaño del JSON de Plotly del gráfico de Técnicos."""
+    import plotly.express as px
+    from src import finance
+    from src.downsample import CHART_PX, decimate, lttb, minmax
+
+    df = _synthetic_daily()
+    tech = finance._technicals_batch(df)
+    cols = ["Close", "SMA20", "SMA50", "EMA12", "EMA26", "BB_Up", "BB_Mid", "BB_Lo"]
+    y = df["Close"].to_numpy()
+    print(f"downsample  barras={len(df)} → {CHART_PX} puntos")
+    print(f"  lttb          : {_timeit(lambda: lttb(y, CHART_PX), 20):8.2f} ms")
+    print(f"  minmax        : {_timeit(lambda: minmax(y, CHART_PX), 20):8.2f} ms")
+    for label, frame, mode in (("completo", tech[cols], "svg"), ("reducido", decimate(tech[cols], by="Close"), "webgl")):
+        fig = px.line(frame.reset_index(), x="Date", y=cols, render_mode=mode)
+        print(f"  JSON {label:<9}: {len(fig.to_json()) / 2**20:8.2f} MB")
+
+
+def bench_figures() -> None:
+    """Gráfico de Técnicos 'max': construirlo (decimate + px.line + estilo) vs sacarlo de la caché."""
+    from src import finance
+    from src.charts import line_figure, _line_figure
+
+    df = _synthetic_daily()
+    tech = finance._technicals_batch(df)
+    tech.attrs.update(df.attrs)
+    cols = ("Close", "SMA20", "SMA50", "EMA12", "EMA26", "BB_Up", "BB_Mid", "BB_Lo")
+    line_figure(tech, cols, "AAPL", True, by="Close")
+    print(f"figures  barras={len(df)}, {len(cols)} series")
+    build = lambda: _line_figure.__wrapped__(tech[list(cols)], cols, "AAPL", True, "Close", None, ())
+    print(f"  construir     : {_timeit(build, 5):8.1f} ms")
+    print(f"  caché         : {_timeit(lambda: line_figure(tech, cols, 'AAPL', True, by='Close'), 20):8.1f} ms")
+
+
+# Lo que app.py importa al cargarse (sin ejecutar Streamlit)
+APP_IMPORTS = ("src.finance", "src.charts", "src.export", "src.alerts", "src.warmer", "src.ui",
+               "src.watchlist", "src.screener", "src.backtest", "src.downsample", "src.lazy")
+# Dependencias que app.py importa siempre: lo que ellas arrastren (pandas ya
+# importa pyarrow si está instalado) no se puede diferir desde aquí
+BASELINE_IMPORTS = ("numpy", "pandas", "streamlit", "plotly.graph_objects")
+IMPORT_BUDGET_MS = float(os.environ.get("FINANCE_DASHBOARD_IMPORT_BUDGET_MS", "1500"))
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # carpeta que contiene src/
+
+
+def _loaded(modules: tuple[str, ...]) -> tuple[float, set[str]]:
+    """Milisegundos y módulos cargados al importar 'modules' en un proceso nuevo."""
+    import subprocess
+
+    code = ("import sys, time; t0 = time.perf_counter(); import " + ", ".join(modules)
+            + "; print((time.perf_counter() - t0) * 1000); print(' '.join(sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=_ROOT).stdout.split("\n")
+    return float(out[0]), set(out[1].split())
+
+
+def import_profile(repeat: int = 3) -> dict:
+    """
+    Import en frío de los módulos de app.py: tiempo total (mediana de
+    'repeat'), tiempo propio por paquete raíz (-X importtime) y qué módulos
+    de src.lazy.HEAVY se cargan. 'heavy' son los que trae nuestro código;
+    'inherited' los que ya trae BASELINE_IMPORTS por su cuenta.
+    """
+    import subprocess
+    from src.lazy import HEAVY
+
+    runs = [_loaded(APP_IMPORTS) for _ in range(repeat)]
+    loaded = runs[-1][1]
+    baseline = _loaded(BASELINE_IMPORTS)[1]
+    prof = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + ", ".join(APP_IMPORTS)],
+                          capture_output=True, text=True, check=True, cwd=_ROOT).stderr
+    by_pkg: dict[str, float] = {}
+    for line in prof.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():  # tiempo propio, sumado por paquete raíz
+            pkg = parts[2].strip().split(".")[0]
+            by_pkg[pkg] = by_pkg.get(pkg, 0.0) + int(parts[0].split(":")[1]) / 1000
+    return {
+        "wall_ms": float(np.median([wall for wall, _ in runs])),
+        "by_package": dict(sorted(by_pkg.items(), key=lambda kv: -kv[1])),
+        "heavy": [m for m in HEAVY if m in loaded and m not in baseline],
+        "inherited": [m for m in HEAVY if m in loaded and m in baseline],
+    }
+
+
+def bench_imports(budget_ms: float = IMPORT_BUDGET_MS, repeat: int = 3) -> None:
+    """
+    Import en frío de los módulos de app.py en un proceso nuevo (ver
+    import_profile). Sale con código 1 si se pasa del presupuesto o si
+    importa algo pesado. tests/test_imports.py comprueba solo lo segundo:
+    el tiempo depende de la máquina y en CI daría falsos fallos.
+    """
+    prof = import_profile(repeat)
+    print(f"imports  {len(APP_IMPORTS)} módulos de app.py, proceso nuevo")
+    print(f"  total         : {prof['wall_ms']:8.1f} ms (presupuesto {budget_ms:.0f} ms)")
+    for name, ms in list(prof["by_package"].items())[:8]:
+        print(f"    {name:<26}{ms:8.1f} ms")
+    inherited = f" (ya los trae {', '.join(BASELINE_IMPORTS)}: {', '.join(prof['inherited'])})" \
+        if prof["inherited"] else ""
+    print(f"  pesados       : {', '.join(prof['heavy']) or 'ninguno'}{inherited}")
+    if prof["wall_ms"] > budget_ms or prof["heavy"]:
+        sys.exit(1)
+
+
+BENCHES = {"cache_keys": bench_cache_keys, "indicators": bench_indicators, "screener": bench_screener,
+           "backtest": bench_backtest, "montecarlo": bench_montecarlo,
+           "correlation": bench_correlation, "portfolio": bench_portfolio,
+           "alerts": bench_alerts, "rerun": bench_rerun,
+           "downsample": bench_downsample, "figures": bench_figures,
+           "imports": bench_imports}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHES)
+    for name in names:
+        BENCHES[name]()
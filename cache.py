@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import copy
+import time
+import pickle
+import hashlib
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def nbytes(value) -> int:
+    """Tamaño aproximado en memoria de lo que guardamos (DF/Series profundos, resto por sys)."""
+    if isinstance(value, pd.DataFrame):
+        if all(isinstance(dt, np.dtype) and dt != object for dt in value.dtypes):
+            # Solo columnas NumPy de ancho fijo: tamaño exacto sin recorrer memory_usage
+            return int(value.index.nbytes + len(value) * sum(dt.itemsize for dt in value.dtypes))
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(nbytes(k) + nbytes(v) for k, v in value.items())
+    import sys
+    return sys.getsizeof(value)
+
+
+class ByteLRU:
+    """
+    Caché LRU con presupuesto en bytes y TTL por entrada.
+    Al insertar se expulsan las entradas menos usadas hasta caber en 'budget';
+    una entrada mayor que el presupuesto entero no se guarda.
+    """
+
+    def __init__(self, budget_bytes: int, ttl_s: float | None = None):
+        self.budget = int(budget_bytes)
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._data: OrderedDict = OrderedDict()  # key -> (value, nbytes, expires_at)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, size, expires = item
+            if expires is not None and time.monotonic() >= expires:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl_s: float | None = None) -> None:
+        """'ttl_s' sustituye al TTL de la caché para esta entrada."""
+        size = nbytes(value)
+        if size > self.budget:
+            return
+        ttl_s = self.ttl_s if ttl_s is None else ttl_s
+        expires = time.monotonic() + ttl_s if ttl_s else None
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, size, expires)
+            self._bytes += size
+            while self._bytes > self.budget and self._data:
+                old = next(iter(self._data))
+                self._drop(old)
+                self.evictions += 1
+
+    def pop(self, key) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def pop_where(self, pred) -> int:
+        """Quita todas las claves que cumplan pred(key); devuelve cuántas."""
+        with self._lock:
+            keys = [k for k in self._data if pred(k)]
+            for k in keys:
+                self._drop(k)
+            return len(keys)
+
+    def values(self) -> list:
+        with self._lock:
+            return [v for v, _, _ in self._data.values()]
+
+    def _drop(self, key) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def groups(self) -> dict[str, dict]:
+        """Entradas y bytes por grupo (primer elemento de las claves tupla)."""
+        out: dict[str, dict] = {}
+        with self._lock:
+            for key, (_, size, _) in self._data.items():
+                g = out.setdefault(str(key[0]) if isinstance(key, tuple) else "", {"entries": 0, "bytes": 0})
+                g["entries"] += 1
+                g["bytes"] += size
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else float("nan"),
+                "evictions": self.evictions,
+            }
+
+
+# =========================
+# Memo de funciones (backend intercambiable)
+# =========================
+
+class MemoryCache:
+    """
+    Backend por defecto de memoize: LRU por función con TTL, en memoria del
+    proceso. Mismo contrato que st.cache_data: la clave son los argumentos
+    (con los valores por defecto aplicados; 'hash_funcs' da la huella de los
+    tipos caros de hashear), cada llamada devuelve una copia y las
+    excepciones no se guardan.
+    """
+
+    def __init__(self, fn, ttl: float | None = None, max_entries: int | None = None,
+                 hash_funcs: dict | None = None):
+        self.fn = fn
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hash_funcs = dict(hash_funcs or {})
+        self._sig = inspect.signature(fn)
+        self._lock = threading.Lock()
+        self._data: OrderedDict = OrderedDict()  # key -> (value, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    def _part(self, value):
+        for typ, fn in self.hash_funcs.items():
+            if isinstance(value, typ):
+                return (typ.__name__, fn(value))
+        if isinstance(value, (list, tuple)):
+            return tuple(self._part(v) for v in value)
+        if isinstance(value, dict):
+            return tuple((k, self._part(v)) for k, v in sorted(value.items()))
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return ("pandas", int(pd.util.hash_pandas_object(value, index=True).sum()))
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return ("pickle", hashlib.sha1(pickle.dumps(value)).hexdigest())
+
+    def _key(self, args, kwargs) -> tuple:
+        bound = self._sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple((name, self._part(v)) for name, v in bound.arguments.items())
+
+    def __call__(self, *args, **kwargs):
+        key = self._key(args, kwargs)
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or time.monotonic() < item[1]):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(item[0])
+            self.misses += 1
+        value = self.fn(*args, **kwargs)
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while self.max_entries and len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return copy.deepcopy(value)
+
+    def clear(self, *args, **kwargs) -> None:
+        """Sin argumentos vacía la función entera; con ellos, solo esa clave."""
+        with self._lock:
+            if args or kwargs:
+                self._data.pop(self._key(args, kwargs), None)
+            else:
+                self._data.clear()
+
+
+class BudgetCache(MemoryCache):
+    """
+    Variante de MemoryCache que guarda en una ByteLRU compartida (presupuesto
+    en bytes común a varias funciones) y en forma compacta: 'pack' al guardar
+    y 'unpack' al servir, también en la primera llamada para que acierto y
+    fallo den lo mismo. 'unpack' debe devolver un objeto nuevo (hace de copia).
+    """
+
+    def __init__(self, fn, store: ByteLRU, ttl: float | None = None, hash_funcs: dict | None = None,
+                 pack=None, unpack=None):
+        super().__init__(fn, ttl=ttl, hash_funcs=hash_funcs)
+        self.store = store
+        self.pack = pack or (lambda v: v)
+        self.unpack = unpack or copy.deepcopy
+        self._name = f"{fn.__module__}.{fn.__qualname__}"
+
+    def __call__(self, *args, **kwargs):
+        key = (self._name, self._key(args, kwargs))
+        value = self.store.get(key)
+        if value is None:
+            value = self.pack(self.fn(*args, **kwargs))
+            self.store.put(key, value, ttl_s=self.ttl)
+        return self.unpack(value)
+
+    def clear(self, *args, **kwargs) -> None:
+        if args or kwargs:
+            self.store.pop((self._name, self._key(args, kwargs)))
+        else:
+            self.store.pop_where(lambda k: k[0] == self._name)
+
+
+# Fábrica fn, ttl, max_entries, hash_funcs -> callable con .clear(); la app
+# instala la de Streamlit (ui.streamlit_cache) para compartir caché entre sesiones
+_BACKEND = MemoryCache
+_BACKEND_LOCK = threading.Lock()
+
+
+def set_backend(factory) -> None:
+    """Cambia el backend de todas las funciones memoize; con el mismo no hace nada."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        _BACKEND = factory or MemoryCache
+
+
+class _Memo:
+    """Función memoizada: crea su caché en el backend activo al primer uso."""
+
+    def __init__(self, fn, options: dict, budget: dict | None = None):
+        functools.update_wrapper(self, fn)
+        self._options = options
+        self._backend = None
+        self._impl = None
+        if budget is not None:  # presupuesto en bytes: fija, no depende del backend
+            self._impl = BudgetCache(fn, ttl=options["ttl"], hash_funcs=options["hash_funcs"], **budget)
+            self._backend = self
+
+    def _target(self):
+        if self._backend is self:
+            return self._impl
+        backend = _BACKEND
+        if self._backend is not backend:
+            with _BACKEND_LOCK:
+                if self._backend is not backend:
+                    self._impl = backend(self.__wrapped__, **self._options)
+                    self._backend = backend
+        return self._impl
+
+    def __call__(self, *args, **kwargs):
+        return self._target()(*args, **kwargs)
+
+    def clear(self, *args, **kwargs) -> None:
+        self._target().clear(*args, **kwargs)
+
+
+def memoize(ttl: float | None = None, max_entries: int | None = None, hash_funcs: dict | None = None,
+            store: ByteLRU | None = None, pack=None, unpack=None):
+    """
+    Decorador de caché para el núcleo (src/finance.py) sin depender de
+    Streamlit: en scripts, workers y notebooks usa MemoryCache y dentro de
+    la app st.cache_data (ver set_backend). Con 'store' (y opcionalmente
+    pack/unpack) usa siempre BudgetCache sobre esa ByteLRU: st.cache_data
+    solo limita por entradas, no por bytes. Expone .clear() y __wrapped__.
+    """
+    options = {"ttl": ttl, "max_entries": max_entries, "hash_funcs": hash_funcs}
+    budget = None if store is None else {"store": store, "pack": pack, "unpack": unpack}
+    return lambda fn: _Memo(fn, options, budget)
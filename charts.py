@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import importlib.util
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from src import lazy
+from src.downsample import decimate, render_mode
+from src.ui import deferred_download
+
+# kaleido solo hace falta para exportar PNG; no se importa hasta que se pide uno
+HAS_KALEIDO = importlib.util.find_spec("kaleido") is not None
+
+
+# =========================
+# Estilo
+# =========================
+
+def style_fig(fig, dark: bool):
+    """Ajustes de contraste para todas las figuras Plotly."""
+    if dark:
+        paper_bg = "#0f1115"; plot_bg = "#0f1115"
+        grid = "#2a2f3a"; axis = "#cbd5e1"; font = "#e6e6e6"; template = "plotly_dark"
+    else:
+        paper_bg = "#ffffff"; plot_bg = "#ffffff"
+        grid = "#d1d5db"; axis = "#111827"; font = "#0b1220"; template = "plotly_white"
+    fig.update_layout(
+        template=template, paper_bgcolor=paper_bg, plot_bgcolor=plot_bg,
+        font=dict(color=font),
+        xaxis=dict(gridcolor=grid, zerolinecolor=grid, linecolor=axis,
+                   tickfont=dict(color=axis), title=dict(font=dict(color=axis))),
+        yaxis=dict(gridcolor=grid, zerolinecolor=grid, linecolor=axis,
+                   tickfont=dict(color=axis), title=dict(font=dict(color=axis))),
+        margin=dict(l=10, r=10, t=50, b=10), height=420
+    ); return fig
+
+
+# =========================
+# Figuras cacheadas
+# =========================
+
+def _data_key(df: pd.DataFrame) -> tuple:
+    """
+    Huella de lo que se dibuja: hash completo de valores e índice. Se aplica
+    al DF ya recortado a las columnas del gráfico (barato), no a la huella
+    de precios (_frame_key), que no ve cambios en indicadores derivados
+    (p. ej. otra ventana de Bollinger con las mismas columnas y cierres).
+    """
+    return (int(pd.util.hash_pandas_object(df, index=True).sum()), tuple(map(str, df.columns)))
+
+
+_DATA_HASH = {pd.DataFrame: _data_key}
+
+
+def line_figure(frame: pd.DataFrame, columns: tuple[str, ...], title: str, dark: bool,
+                by: str | None = None, height: int | None = None, hlines: tuple[float, ...] = ()) -> go.Figure:
+    """
+    Gráfico de líneas ya reducido (LTTB), estilizado y con el modo de dibujo
+    (svg/webgl) elegido. La clave son los datos de 'columns', el título y el
+    tema: un rerun sin cambios no vuelve a pasar por decimate, px.line ni
+    style_fig.
+    """
+    return _line_figure(frame[list(columns)], columns, title, dark, by, height, hlines)
+
+
+def line_figure_png(frame: pd.DataFrame, columns: tuple[str, ...], title: str, dark: bool,
+                    by: str | None = None, height: int | None = None, hlines: tuple[float, ...] = ()) -> bytes:
+    """PNG (kaleido) de line_figure con la misma clave; solo se llama al pedir la descarga."""
+    return _line_figure_png(frame[list(columns)], columns, title, dark, by, height, hlines)
+
+
+@st.cache_data(show_spinner=False, ttl=600, max_entries=64, hash_funcs=_DATA_HASH)
+def _line_figure(data: pd.DataFrame, columns: tuple[str, ...], title: str, dark: bool,
+                 by: str | None, height: int | None, hlines: tuple[float, ...]) -> go.Figure:
+    view = decimate(data, by=by)
+    data = view.reset_index()
+    if "Date" not in data.columns:
+        data = data.rename(columns={data.columns[0]: "Date"})
+    px = lazy.module("plotly.express")  # ~0.2 s de import: solo al primer gráfico
+    fig = px.line(data, x="Date", y=list(columns), title=title, render_mode=render_mode(view))
+    for y in hlines:
+        fig.add_hline(y=y, line_dash="dash")
+    fig = style_fig(fig, dark)
+    if height:
+        fig.update_layout(height=height)
+    return fig
+
+
+@st.cache_data(show_spinner=False, ttl=600, max_entries=16, hash_funcs=_DATA_HASH)
+def _line_figure_png(data: pd.DataFrame, columns: tuple[str, ...], title: str, dark: bool,
+                     by: str | None, height: int | None, hlines: tuple[float, ...]) -> bytes:
+    fig = _line_figure(data, columns, title, dark, by, height, hlines)
+    return pio.to_image(fig, format="png")
+
+
+def png_download(label: str, file_name: str, key: str, render) -> None:
+    """Descarga PNG generada con kaleido solo al pulsar el botón ('render' sin argumentos)."""
+    if not HAS_KALEIDO:
+        st.caption("Para exportar a PNG instala `kaleido`.")
+        return
+    deferred_download(label, render, file_name, "image/png", key)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+# =========================
+# Panel de rendimientos
+# =========================
+
+def align_returns(frames: dict[str, pd.DataFrame], column: str = "Close") -> pd.DataFrame:
+    """Rendimientos simples de N tickers en las fechas comunes (columnas = tickers)."""
+    closes = {tk: df[column] for tk, df in frames.items() if df is not None and not df.empty and column in df}
+    if not closes:
+        return pd.DataFrame()
+    prices = pd.concat(closes, axis=1, join="inner").dropna()
+    return prices.pct_change().iloc[1:]
+
+
+def corr_matrix(returns: pd.DataFrame) -> pd.DataFrame:
+    """Matriz de correlaciones de todo el periodo."""
+    if returns.shape[0] < 3:
+        return pd.DataFrame(index=returns.columns, columns=returns.columns, dtype=float)
+    m = np.corrcoef(returns.to_numpy(), rowvar=False)
+    return pd.DataFrame(np.atleast_2d(m), index=returns.columns, columns=returns.columns)
+
+
+# =========================
+# Momentos móviles
+# =========================
+
+def _window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """Suma de cada ventana sobre el eje 0 (barras-window+1 × ...) con una sola cumsum."""
+    c = np.cumsum(x, axis=0)
+    out = c[window - 1:].copy()
+    out[1:] -= c[:-window]
+    return out
+
+
+def rolling_against(returns: pd.DataFrame, against: str, window: int = 63) -> dict[str, pd.DataFrame]:
+    """
+    Correlación y beta móviles de cada columna frente a 'against', todas a la
+    vez: x, x·y, x² (barras × N) e y, y² se apilan en un único array y sus
+    sumas por ventana salen de una sola cumsum, en vez de N llamadas a
+    rolling().corr(). beta = cov(r_i, r_ref) / var(r_ref).
+    """
+    empty = {"corr": pd.DataFrame(), "beta": pd.DataFrame()}
+    if against not in returns.columns or len(returns) < window or window < 2:
+        return empty
+    x = returns.to_numpy(dtype="float64")
+    y = returns[against].to_numpy(dtype="float64")
+    x = x - x.mean(axis=0)  # centrar no cambia cov/var y evita cancelación en las sumas
+    y = y - y.mean()
+    n = x.shape[1]
+
+    sums = _window_sums(np.hstack([x, x * y[:, None], x * x, y[:, None], (y * y)[:, None]]), window)
+    sx, sxy, sxx = sums[:, :n], sums[:, n:2 * n], sums[:, 2 * n:3 * n]
+    sy, syy = sums[:, 3 * n], sums[:, 3 * n + 1]
+
+    cov = (sxy - sx * sy[:, None] / window) / (window - 1)
+    var_x = np.maximum((sxx - sx * sx / window) / (window - 1), 0.0)
+    var_y = np.maximum((syy - sy * sy / window) / (window - 1), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.sqrt(var_x * var_y[:, None])
+        beta = cov / var_y[:, None]
+
+    index = returns.index[window - 1:]
+    return {
+        "corr": pd.DataFrame(np.clip(corr, -1.0, 1.0), index=index, columns=returns.columns),
+        "beta": pd.DataFrame(beta, index=index, columns=returns.columns),
+    }
+
+
+def beta_table(returns: pd.DataFrame, benchmark: str) -> pd.DataFrame:
+    """Beta y correlación de todo el periodo frente al benchmark."""
+    if benchmark not in returns.columns or len(returns) < 3:
+        return pd.DataFrame(columns=["Beta", "Correlación"])
+    x = returns.to_numpy(dtype="float64")
+    x = x - x.mean(axis=0)
+    y = x[:, returns.columns.get_loc(benchmark)]
+    cov = (x * y[:, None]).sum(axis=0) / (len(x) - 1)
+    var = (x * x).sum(axis=0) / (len(x) - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = pd.DataFrame({"Beta": cov / var[returns.columns.get_loc(benchmark)],
+                            "Correlación": cov / np.sqrt(var * var[returns.columns.get_loc(benchmark)])},
+                           index=returns.columns)
+    return out.drop(index=benchmark)
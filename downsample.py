@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Anchura útil de un gráfico a ancho completo (px): más puntos que píxeles no se ven
+CHART_PX = int(os.environ.get("FINANCE_DASHBOARD_CHART_PX", "1500"))
+# A partir de estos puntos (sumando trazas) se dibuja con WebGL en vez de SVG
+WEBGL_MIN_POINTS = 5000
+
+
+# =========================
+# Selección de puntos (una serie)
+# =========================
+
+def _buckets(n: int, n_out: int) -> np.ndarray:
+    """Límites de n_out-2 cubos interiores; el primer y el último punto van aparte."""
+    return np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+
+def lttb(y: np.ndarray, n_out: int, x: np.ndarray | None = None) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013): índices de los n_out
+    puntos que mejor conservan la forma de la serie. En cada cubo se elige el
+    punto que forma el triángulo de mayor área con el punto ya elegido del
+    cubo anterior y la media del siguiente. Las medias de todos los cubos se
+    calculan de una vez; el bucle solo hace un argmax por cubo.
+    """
+    y = np.asarray(y, dtype="float64")
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype="float64") if x is None else np.asarray(x, dtype="float64")
+
+    edges = _buckets(n, n_out)
+    cx, cy = np.cumsum(x), np.cumsum(y)
+    lo, hi = edges[:-1], edges[1:]
+    # Media de cada cubo (y del "cubo" final = último punto) para usarla como vértice C
+    mean_x = np.append((cx[hi - 1] - cx[lo - 1]) / (hi - lo), x[-1])
+    mean_y = np.append((cy[hi - 1] - cy[lo - 1]) / (hi - lo), y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        s, e = lo[i], hi[i]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - mean_x[i + 1]) * (y[s:e] - ay) - (ax - x[s:e]) * (mean_y[i + 1] - ay))
+        a = s + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Índices del mínimo y el máximo de cada cubo (n_out/2 cubos), sin bucles:
+    conserva todos los picos, aunque dibuja algo más "dentado" que LTTB.
+    """
+    y = np.asarray(y, dtype="float64")
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    pad = size * n_buckets - n
+    blocks = np.concatenate([y, np.full(pad, np.nan)]).reshape(n_buckets, size)
+    start = np.arange(n_buckets) * size
+    valid = ~np.isnan(blocks).all(axis=1)
+    lo = start[valid] + np.nanargmin(blocks[valid], axis=1)
+    hi = start[valid] + np.nanargmax(blocks[valid], axis=1)
+    return np.unique(np.concatenate([[0, n - 1], lo, hi]))
+
+
+# =========================
+# DataFrames para gráficos
+# =========================
+
+def _select(y: np.ndarray, x: np.ndarray, n_out: int, method: str) -> np.ndarray:
+    """Índices (posiciones en y) elegidos solo entre los valores no NaN."""
+    pos = np.flatnonzero(~np.isnan(y))
+    if len(pos) <= n_out:
+        return pos
+    if method == "minmax":
+        return pos[minmax(y[pos], n_out)]
+    return pos[lttb(y[pos], n_out, x[pos])]
+
+
+def decimate(frame: pd.DataFrame, n_out: int = CHART_PX, by: str | None = None,
+             method: str = "lttb") -> pd.DataFrame:
+    """
+    Filas de 'frame' suficientes para dibujarlo a n_out píxeles de ancho.
+      - by='Close': los índices salen de esa columna y se aplican a todas
+        (indicadores suaves como SMA/EMA/Bollinger sobre el precio)
+      - by=None: unión de los índices de cada columna, con n_out/k puntos
+        por columna (varias series igual de rugosas, p. ej. comparables)
+    Si ya cabe, se devuelve tal cual. Solo para dibujar: las exportaciones
+    deben usar el DataFrame original.
+    """
+    if len(frame) <= n_out or frame.empty:
+        return frame
+    x = frame.index.asi8.astype("float64") if isinstance(frame.index, pd.DatetimeIndex) \
+        else np.arange(len(frame), dtype="float64")
+    cols = [by] if by is not None else list(frame.columns)
+    per_col = n_out if by is not None else max(n_out // max(len(cols), 1), 16)
+    picks = [_select(frame[c].to_numpy(dtype="float64"), x, per_col, method) for c in cols]
+    idx = np.unique(np.concatenate(picks + [np.array([0, len(frame) - 1])]))
+    return frame.iloc[idx]
+
+
+def render_mode(frame: pd.DataFrame, columns: list[str] | None = None) -> str:
+    """'webgl' si el gráfico tiene muchos puntos en total; si no, 'svg' (más nítido)."""
+    n_traces = len(columns) if columns is not None else frame.shape[1]
+    return "webgl" if len(frame) * n_traces >= WEBGL_MIN_POINTS else "svg"
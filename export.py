@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src import lazy
+from src.finance import price_history_many, technicals, _frame_key
+from src.indicators import COLUMNS as INDICATORS
+
+# Parquet vía pyarrow (opcional: sin él solo se ofrece CSV; se importa al exportar)
+_HAS_PARQUET = lazy.available("pyarrow")
+
+EXPORT_DIR = os.environ.get(
+    "FINANCE_DASHBOARD_EXPORT_DIR", os.path.expanduser("~/.finance-dashboard/exports")
+)
+KEEP = 8  # ficheros de exportación que se conservan (los más recientes)
+
+# Tabla larga: una fila por ticker y barra, mismas columnas para todos
+COLUMNS = ["Date", "Ticker", "Open", "High", "Low", "Close", "Volume", "Return", *INDICATORS, "RelReturn"]
+FORMATS = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "csv": (".csv", "text/csv"),
+}
+
+
+def formats() -> list[str]:
+    return [f for f in FORMATS if f != "parquet" or _HAS_PARQUET]
+
+
+# =========================
+# Tabla por ticker
+# =========================
+
+def ticker_table(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """Precios + technicals + rentabilidad relativa desde el inicio del periodo, en formato largo."""
+    tech = technicals(df)
+    first = tech["Close"].dropna()
+    base = first.iloc[0] if len(first) else np.nan
+    out = tech.assign(Ticker=ticker, RelReturn=tech["Close"] / base - 1.0).reset_index()
+    if "Date" not in out.columns:
+        out = out.rename(columns={out.columns[0]: "Date"})
+    out = out.reindex(columns=COLUMNS)
+    out["Date"] = pd.to_datetime(out["Date"])
+    out["Ticker"] = out["Ticker"].astype(str)
+    floats = [c for c in COLUMNS if c not in ("Date", "Ticker")]
+    out[floats] = out[floats].astype("float64")
+    return out
+
+
+def _schema():
+    pa = lazy.module("pyarrow")
+    return pa.schema([("Date", pa.timestamp("ns")), ("Ticker", pa.string())]
+                     + [(c, pa.float64()) for c in COLUMNS[2:]])
+
+
+# =========================
+# Exportación por trozos
+# =========================
+
+def _key(frames: dict[str, pd.DataFrame], period: str, interval: str, fmt: str) -> str:
+    """Huella de la exportación: mismos datos (por _frame_key) → mismo fichero."""
+    parts = [period, interval, fmt] + [repr((tk, _frame_key(df))) for tk, df in frames.items()]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _prune() -> None:
+    """Borra las exportaciones antiguas (deja las KEEP más recientes)."""
+    try:
+        files = [os.path.join(EXPORT_DIR, f) for f in os.listdir(EXPORT_DIR) if f.startswith("export_")]
+        for path in sorted(files, key=os.path.getmtime, reverse=True)[KEEP:]:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def _write(tables, path: str, fmt: str) -> None:
+    """
+    Escribe tabla a tabla ('tables': iterable de ticker_table; con un
+    generador, un row group de Parquet o un bloque de CSV por ticker) en un
+    temporal y lo renombra al final: en memoria solo está la tabla del
+    ticker en curso, nunca el fichero entero.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        if fmt == "parquet":
+            pa, pq = lazy.module("pyarrow"), lazy.module("pyarrow.parquet")
+            with pq.ParquetWriter(tmp, _schema(), compression="zstd") as writer:
+                for table in tables:
+                    writer.write_table(pa.Table.from_pandas(table, schema=_schema(), preserve_index=False))
+        else:
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                for i, table in enumerate(tables):
+                    table.to_csv(f, header=i == 0, index=False)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def export_bundle(tickers: list[str] | tuple[str, ...], period: str = "10y", interval: str = "1d",
+                  source: str = "auto", fmt: str = "parquet") -> str:
+    """
+    Exporta precios, technicals y rentabilidad relativa de varios tickers a
+    un único fichero (Parquet o CSV) y devuelve su ruta. Si ya existe una
+    exportación con los mismos datos se reutiliza sin escribir nada. Los
+    tickers sin precios reales (modo demo) se omiten.
+    """
+    if fmt not in formats():
+        raise ValueError(f"Formato no disponible: {fmt}. Opciones: {', '.join(formats())}.")
+    frames = price_history_many(list(tickers), period=period, interval=interval, source=source)
+    frames = {tk: df for tk, df in frames.items() if not df.empty and not df.attrs.get("__demo__")}
+    if not frames:
+        raise ValueError("Ninguno de los tickers tiene precios reales que exportar.")
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f"export_{_key(frames, period, interval, fmt)}{FORMATS[fmt][0]}")
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    _write((ticker_table(df, tk) for tk, df in frames.items()), path, fmt)
+    _prune()
+    return path
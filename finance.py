@@ -1,38 +1,319 @@
 from __future__ import annotations
 
+import os
+import time
+import weakref
+import inspect
+import functools
+import threading
 import traceback
 import concurrent.futures as cf
+from collections import deque
+from typing import TYPE_CHECKING
 
-import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
 
-# Stooq vía pandas-datareader (sin API key)
-try:
-    import pandas_datareader.data as web
-    _HAS_STOOQ = True
-except Exception:
-    _HAS_STOOQ = False
+from src import lazy, store, transport
+from src.cache import ByteLRU, memoize
+from src.indicators import IndicatorEngine, kernel_technicals
+from src.screener import build_panel, periods_per_year, screen
+from src.backtest import Strategy, run_grid
+from src.montecarlo import projection_frame
+from src.correlation import align_returns, corr_matrix, rolling_against, beta_table
+from src.portfolio import estimate, optimize, portfolio_stats
+
+if TYPE_CHECKING:
+    import yfinance as yf
+
+# yfinance y pandas-datareader (Stooq, sin API key) se importan al primer uso:
+# servir datos ya en caché no necesita ninguno de los dos (ver src/lazy.py)
+_STOOQ_MODULE = "pandas_datareader.data"
+
+
+def _yf():
+    return lazy.module("yfinance")
 
 
 # =========================
-# Helpers para precio
+# Ejecutor compartido
 # =========================
 
-def _yahoo_download(ticker: str, period: str, interval: str) -> pd.DataFrame:
-    """Intenta primero yf.download; si viene vacío, intenta Ticker().history()."""
-    # 1) download
+# Pool de larga vida para las llamadas de red: un timeout no espera al hilo
+# colgado (no hay 'with' que haga shutdown), la descarga sigue en segundo plano.
+_FETCH_POOL = cf.ThreadPoolExecutor(max_workers=16, thread_name_prefix="fetch")
+# Pool aparte para las carreras Yahoo/Stooq: sus tareas esperan a _FETCH_POOL
+# y si compartieran pool podrían quedarse sin hilos libres.
+_RACE_POOL = cf.ThreadPoolExecutor(max_workers=16, thread_name_prefix="race")
+
+# Modo cubierto en 'auto': si Yahoo no responde en HEDGE_AFTER_S se lanza Stooq
+# en paralelo y gana la primera serie válida. "off" lo desactiva.
+_hedge_env = os.environ.get("FINANCE_DASHBOARD_HEDGE_S", "0.5").strip().lower()
+HEDGE_AFTER_S: float | None = None if _hedge_env in ("", "off") else float(_hedge_env)
+
+
+def _run_with_timeout(fn, *args, timeout_s: float, on_late=None):
+    """
+    Ejecuta fn en el pool compartido y espera como mucho timeout_s.
+    Si se agota lanza cf.TimeoutError y, cuando la tarea termine con datos,
+    llama a on_late(resultado) para aprovecharlos (rellenar caché). Los
+    errores de fn se propagan: _guarded los cuenta como fallo de la fuente.
+    """
+    fut = _FETCH_POOL.submit(fn, *args)
+    try:
+        return fut.result(timeout=timeout_s)
+    except cf.TimeoutError:
+        if on_late is not None:
+            fut.add_done_callback(lambda f: _late_result(f, on_late))
+        raise
+
+
+def _late_result(fut: cf.Future, on_late) -> None:
     try:
-        df = yf.download(ticker, period=period, interval=interval, auto_adjust=True, progress=False)
-        if isinstance(df, pd.DataFrame) and not df.empty:
-            return df
+        res = fut.result()
+        if res is not None and len(res) > 0:
+            on_late(res)
     except Exception:
         pass
-    # 2) history
+
+
+# =========================
+# Salud de fuentes (circuit breaker)
+# =========================
+
+class _CircuitBreaker:
+    """
+    Cortacircuitos por fuente, compartido por todo el proceso.
+      - closed    → se llama normal
+      - open      → tras 'threshold' fallos seguidos (de ≥2 tickers distintos,
+                    para que un ticker mal escrito no tumbe la fuente) se salta
+                    la fuente durante 'cooldown_s'
+      - half_open → pasado el cooldown se deja pasar UNA llamada de prueba;
+                    si va bien se cierra, si falla vuelve a open
+    """
+
+    def __init__(self, name: str, threshold: int = 5, cooldown_s: float = 60.0, window: int = 20):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+        self._streak = 0
+        self._streak_keys: set[str] = set()
+        self._recent: deque[tuple[bool, float]] = deque(maxlen=window)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.cooldown_s:
+                    return False
+                self._state = "half_open"
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, ok: bool | None, latency_s: float, key: str = "") -> None:
+        """ok=None: respuesta vacía (ticker inexistente, o no se sabe): no cambia el estado."""
+        with self._lock:
+            self._recent.append((ok is not False, latency_s))
+            self._probing = False
+            if ok is None:
+                return
+            if ok:
+                self._state = "closed"
+                self._streak = 0
+                self._streak_keys.clear()
+                return
+            self._streak += 1
+            self._streak_keys.add(key)
+            if self._state == "half_open" or (self._streak >= self.threshold and len(self._streak_keys) >= 2):
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            n = len(self._recent)
+            fails = sum(1 for ok, _ in self._recent if not ok)
+            lat = [l for _, l in self._recent]
+            retry_in = 0.0
+            if self._state == "open":
+                retry_in = max(0.0, self.cooldown_s - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "recent_calls": n,
+                "recent_failures": fails,
+                "avg_latency_ms": (1000 * sum(lat) / n) if n else float("nan"),
+                "retry_in_s": retry_in,
+            }
+
+
+_BREAKERS = {"yahoo": _CircuitBreaker("yahoo"), "stooq": _CircuitBreaker("stooq")}
+
+
+def _guarded(source: str, key: str, call, empty):
+    """
+    Pasa la llamada por el breaker de la fuente; si está abierto devuelve
+    'empty' sin red. Solo cuentan como fallo las excepciones y los timeouts.
+    Una respuesta vacía (ticker mal escrito o deslistado) no abre el breaker
+    para los demás tickers, pero tampoco lo cierra: yfinance a veces también
+    convierte un fallo de red en "sin zona horaria", así que es neutra.
+    """
+    br = _BREAKERS[source]
+    if not br.allow():
+        return empty
+    t0 = time.monotonic()
+    try:
+        res = call()
+    except Exception:
+        br.record(False, time.monotonic() - t0, key)
+        return empty
+    br.record(True if res is not None and len(res) > 0 else None, time.monotonic() - t0, key)
+    return res
+
+
+def source_health() -> dict[str, dict]:
+    """Estado actual de cada fuente: {'yahoo': {'state': 'closed', ...}, 'stooq': {...}}."""
+    out = {name: br.snapshot() for name, br in _BREAKERS.items()}
+    if not lazy.available(_STOOQ_MODULE):
+        out["stooq"]["state"] = "unavailable"
+    return out
+
+
+# =========================
+# Single-flight
+# =========================
+
+class _SingleFlight:
+    """
+    Coalescencia de peticiones concurrentes: la primera llamada ("líder")
+    ejecuta y las demás con la misma clave esperan su resultado.
+
+    La caché (memoize) guarda una misma clave, pero no junta llamadas que
+    acaban en la misma descarga con claves distintas ('auto' y 'stooq', el
+    ticker en minúsculas, price_history_many, la carrera Yahoo/Stooq, hilos
+    en segundo plano...). Por eso se aplica por debajo, en la capa de fetch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[tuple, cf.Future] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def do(self, key: tuple, fn, *args, **kwargs):
+        with self._lock:
+            st_ = self._stats.setdefault(key[0], {"calls": 0, "coalesced": 0})
+            st_["calls"] += 1
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = cf.Future()
+                self._calls[key] = fut
+            else:
+                st_["coalesced"] += 1
+        if not leader:
+            return fut.result()
+        try:
+            res = fn(*args, **kwargs)
+            fut.set_result(res)
+            return res
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            out = {k: dict(v) for k, v in self._stats.items()}
+            for key in self._calls:
+                out.setdefault(key[0], {"calls": 0, "coalesced": 0})
+                out[key[0]]["in_flight"] = out[key[0]].get("in_flight", 0) + 1
+            return out
+
+
+_FLIGHTS = _SingleFlight()
+
+
+def _single_flight(kind: str):
+    """Decorador: clave = (kind, argumentos con defaults aplicados; textos en mayúsculas)."""
+    def deco(fn):
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (kind,) + tuple(v.upper() if isinstance(v, str) else v for v in bound.arguments.values())
+            return _FLIGHTS.do(key, fn, *args, **kwargs)
+        return wrapper
+    return deco
+
+
+def singleflight_stats() -> dict[str, dict[str, int]]:
+    """Por tipo ('price', 'financials', 'ratios'): llamadas, coalescidas y en curso."""
+    return _FLIGHTS.stats()
+
+
+# =========================
+# Helpers para precio
+# =========================
+
+def _yahoo_no_data() -> tuple[type, ...]:
+    """Excepciones de yfinance que significan "Yahoo contestó que no hay datos"."""
+    ex = lazy.module("yfinance.exceptions")
+    if ex is None:
+        return ()
+    names = ("YFTickerMissingError", "YFPricesMissingError", "YFTzMissingError", "YFInvalidPeriodError")
+    return tuple(getattr(ex, n) for n in names if hasattr(ex, n))
+
+
+_YAHOO_PROBE_URL = "https://query2.finance.yahoo.com/v8/finance/chart/{}"
+
+
+def _yahoo_probe(ticker: str) -> None:
+    """Petición mínima a Yahoo: lanza si no responde (DNS, conexión…), con cualquier respuesta HTTP vuelve."""
+    transport.session("yahoo").get(_YAHOO_PROBE_URL.format(ticker), params={"range": "1d", "interval": "1d"},
+                                   timeout=2.0)
+
+
+def _yahoo_history(ticker: str, **kwargs) -> pd.DataFrame:
+    """
+    Ticker().history con raise_errors: "no hay datos" → DF vacío; red, rate
+    limit… → excepción. yfinance se traga los fallos de red al buscar la zona
+    horaria y los da como YFTzMissingError ("possibly delisted"), así que ese
+    caso se confirma con una petición propia antes de darlo por vacío.
+    """
+    try:
+        return get_ticker(ticker).history(raise_errors=True, **kwargs)
+    except _yahoo_no_data() as e:
+        if type(e).__name__ == "YFTzMissingError":
+            _yahoo_probe(ticker)
+        return pd.DataFrame()
+
+
+def _yahoo_download(ticker: str, period: str, interval: str, start=None) -> pd.DataFrame:
+    """
+    Intenta primero Ticker().history(); si viene vacío, intenta yf.download.
+    Con 'start' pide solo las barras desde esa fecha (cola incremental).
+    DF vacío = Yahoo no tiene ese ticker; los fallos de red se propagan.
+    """
+    span = {"start": start} if start is not None else {"period": period}
+    # 1) history: distingue "no existe" de "no responde" (va primero porque un
+    #    download fallido deja el ticker como "sin zona horaria" y tapa el error)
+    df = transport.call("yahoo", _yahoo_history, ticker, interval=interval, auto_adjust=True, **span)
+    if isinstance(df, pd.DataFrame) and not df.empty:
+        return df
+    # 2) download (no lanza: cualquier error acaba en un DF vacío)
     try:
-        t = yf.Ticker(ticker.upper())
-        df = t.history(period=period, interval=interval, auto_adjust=True)
+        df = transport.call("yahoo", _yf().download, ticker, interval=interval, auto_adjust=True,
+                            progress=False, session=transport.session("yahoo"), **span)
         if isinstance(df, pd.DataFrame) and not df.empty:
             return df
     except Exception:
@@ -40,32 +321,182 @@ def _yahoo_download(ticker: str, period: str, interval: str) -> pd.DataFrame:
     return pd.DataFrame()
 
 
-def _yahoo_with_timeout(ticker: str, period: str, interval: str, timeout_s: float = 2.0) -> pd.DataFrame:
-    """Ejecuta Yahoo con timeout duro; si se agota, devuelve DF vacío (para no colgar la UI)."""
-    try:
-        with cf.ThreadPoolExecutor(max_workers=1) as ex:
-            fut = ex.submit(_yahoo_download, ticker, period, interval)
-            return fut.result(timeout=timeout_s)
-    except Exception:
+def _yahoo_with_timeout(ticker: str, period: str, interval: str, timeout_s: float = 2.0,
+                        start=None, on_late=None) -> pd.DataFrame:
+    """Ejecuta Yahoo con timeout duro (para no colgar la UI); si se agota lanza cf.TimeoutError."""
+    return _run_with_timeout(_yahoo_download, ticker, period, interval, start,
+                             timeout_s=timeout_s, on_late=on_late)
+
+
+def _yahoo_download_many(tickers: list[str], period: str, interval: str, start=None) -> dict[str, pd.DataFrame]:
+    """
+    Una sola llamada agrupada a yf.download; devuelve {ticker: DF} solo para
+    los que traen datos. Las excepciones se propagan (fallo de la fuente).
+    """
+    span = {"start": start} if start is not None else {"period": period}
+    df = transport.call("yahoo", _yf().download, tickers, interval=interval, auto_adjust=True,
+                        progress=False, group_by="ticker", threads=True,
+                        session=transport.session("yahoo"), **span)
+    if not isinstance(df, pd.DataFrame) or df.empty or not isinstance(df.columns, pd.MultiIndex):
+        return {}
+    out: dict[str, pd.DataFrame] = {}
+    got = set(df.columns.get_level_values(0))
+    for tk in tickers:
+        if tk not in got:
+            continue
+        sub = df[tk].dropna(how="all")  # p.ej. SPY no cotiza en fin de semana y BTC sí
+        if not sub.empty:
+            out[tk] = sub
+    return out
+
+
+def _yahoo_many_with_timeout(tickers: list[str], period: str, interval: str,
+                             timeout_s: float, start=None, on_late=None) -> dict[str, pd.DataFrame]:
+    return _run_with_timeout(_yahoo_download_many, tickers, period, interval, start,
+                             timeout_s=timeout_s, on_late=on_late)
+
+
+_STOOQ_EPOCH = "1970-01-01"  # sin 'start' pandas-datareader solo pide 5 años
+
+
+def _stooq_fetch(ticker: str, start=None) -> pd.DataFrame:
+    """
+    Carga diario desde Stooq: todo el histórico o, con 'start', solo desde esa
+    fecha. Sin API key. Ticker desconocido → DF vacío; fallos de red → excepción.
+    """
+    web = lazy.module(_STOOQ_MODULE)
+    if web is None:
+        return pd.DataFrame()
+    df = transport.call("stooq", web.DataReader, ticker, "stooq",
+                        start=start if start is not None else _STOOQ_EPOCH,
+                        session=transport.session("stooq"))
+    if df is None or df.empty:
+        return pd.DataFrame()
+    return df.sort_index()  # asegurar ascendente
+
+
+# =========================
+# Almacén local + delta
+# =========================
+
+_PERIOD_YEARS = {"1y": 1, "2y": 2, "5y": 5, "10y": 10}
+
+
+def _period_start(period: str) -> pd.Timestamp | None:
+    """Fecha de inicio del periodo pedido; None para 'max'."""
+    if period == "max":
+        return None
+    yrs = _PERIOD_YEARS.get(period, 5)
+    return pd.Timestamp.today().normalize() - pd.DateOffset(years=yrs)
+
+
+def _tidy(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas planas en Title Case e índice ordenado sin zona horaria (para poder unir colas)."""
+    if not isinstance(df, pd.DataFrame) or df.empty:
         return pd.DataFrame()
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):  # yf.download ≥0.2.48 devuelve (Price, Ticker)
+        df.columns = df.columns.get_level_values(0)
+    df = df.rename(columns={c: str(c).title() for c in df.columns})
+    df = df.loc[:, ~df.columns.duplicated()]
+    if isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df.index.name = "Date"
+    return df.sort_index()
 
 
-def _stooq_fetch(ticker: str, period: str) -> pd.DataFrame:
-    """Carga diario desde Stooq y recorta ventana aproximada según 'period'. Sin API key."""
-    if not _HAS_STOOQ:
+def _fetch(source: str, ticker: str, start=None, on_late=None) -> pd.DataFrame:
+    """Diario completo ('max') de la fuente, o solo desde 'start' para la cola."""
+    if source == "yahoo":
+        return _guarded("yahoo", ticker, lambda: _yahoo_with_timeout(
+            ticker, "max", "1d", timeout_s=2.0, start=start, on_late=on_late), pd.DataFrame())
+    if not lazy.available(_STOOQ_MODULE):
         return pd.DataFrame()
-    try:
-        df = web.DataReader(ticker, "stooq")
-        if df is None or df.empty:
-            return pd.DataFrame()
-        df = df.sort_index()  # asegurar ascendente
-        # recorte aproximado por periodo (diario)
-        years_map = {"1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "max": len(df)}
-        n = years_map.get(period, 1260)
-        df = df.tail(min(n, len(df)))
-        return df
-    except Exception:
+    return _guarded("stooq", ticker, lambda: _stooq_fetch(ticker, start=start), pd.DataFrame())
+
+
+# Series recién bajadas en bloque por price_history_many, pendientes de que
+# price_history las recoja (sirven aunque no haya pyarrow para el parquet).
+# Van a la caché acotada _MEM (grupo "prefetched"), dentro del presupuesto.
+_PREFETCHED_LOCK = threading.Lock()
+
+
+def _stash_prefetched(source: str, ticker: str, df: pd.DataFrame) -> None:
+    df = df.copy()
+    df.attrs = {"__full__": True, "__stored_at__": time.time()}
+    _MEM.put(("prefetched", source, ticker.upper()), df, ttl_s=store.FRESH_S)
+
+
+def _keep(source: str, ticker: str, df: pd.DataFrame) -> None:
+    """Guarda en parquet y deja la serie lista para el próximo price_history."""
+    store.save(ticker, source, "1d", df, full=True)
+    _stash_prefetched(source, ticker, df)
+
+
+def _take_prefetched(source: str, ticker: str) -> pd.DataFrame:
+    key = ("prefetched", source, ticker.upper())
+    with _PREFETCHED_LOCK:
+        df = _MEM.get(key)
+        _MEM.pop(key)
+    if df is None or not store.is_fresh(df):
         return pd.DataFrame()
+    return df
+
+
+def _merge_tail(source: str, ticker: str, stored: pd.DataFrame, tail: pd.DataFrame) -> pd.DataFrame:
+    """
+    Une la cola a lo guardado. Si la cola delata un reajuste (store.restated:
+    split o dividendo desde la última descarga) se descarta lo guardado y se
+    pide el histórico entero; si eso falla se queda lo guardado, sin la cola.
+    """
+    if not store.restated(stored, tail):
+        return store.merge(stored, tail)
+    full = _tidy(_fetch(source, ticker))
+    return full if not full.empty else stored
+
+
+@_single_flight("price")
+def _stored_fetch(source: str, ticker: str, revalidate: bool = False) -> pd.DataFrame:
+    """
+    Serie diaria completa de una fuente. Lee primero el parquet local y solo
+    pide las barras posteriores a la última guardada; si no hay nada guardado
+    (o no cubre 'max'), descarga el histórico entero. 'revalidate' pide la
+    cola aunque lo guardado sea reciente.
+    """
+    stored = _take_prefetched(source, ticker)
+    if stored.empty:
+        stored = store.load(ticker, source, "1d")
+
+    def late(base: pd.DataFrame):
+        # Yahoo llegó tarde: guardar lo que traiga y tirar las entradas de caché
+        # que se rellenaron con Stooq/demo para que el siguiente rerun las recoja.
+        def fill(res: pd.DataFrame) -> None:
+            _keep(source, ticker, _merge_tail(source, ticker, base, _tidy(res)))
+            _clear_price_caches(ticker, "auto")
+        return fill if source == "yahoo" else None
+
+    if store.covers(stored, None):
+        if revalidate or not store.is_fresh(stored):
+            tail = _tidy(_fetch(source, ticker, start=store.tail_start(stored), on_late=late(stored)))
+            if not tail.empty:
+                stored = _merge_tail(source, ticker, stored, tail)
+                store.save(ticker, source, "1d", stored, full=True)
+        return stored
+
+    df = _tidy(_fetch(source, ticker, on_late=late(pd.DataFrame())))
+    if not df.empty:
+        store.save(ticker, source, "1d", df, full=True)
+    return df
+
+
+def _finish(df: pd.DataFrame, source: str) -> pd.DataFrame | None:
+    """Añade 'Return' y la fuente; None si no hay 'Close' utilizable."""
+    if not isinstance(df, pd.DataFrame) or df.empty or "Close" not in df.columns:
+        return None
+    df = df.copy()
+    df.attrs = {"__source__": source}
+    df["Return"] = df["Close"].pct_change()
+    return df
 
 
 def _demo_series(tk: str, period: str, interval: str) -> pd.DataFrame:
@@ -78,7 +509,7 @@ def _demo_series(tk: str, period: str, interval: str) -> pd.DataFrame:
     elif interval == "1wk":
         n = int(52 * yrs);  freq = "W-FRI"; dt_step = 1 / 52
     else:  # "1mo"
-        n = int(12 * yrs);  freq = "M"; dt_step = 1 / 12
+        n = int(12 * yrs);  freq = "ME"; dt_step = 1 / 12
 
     end = pd.Timestamp.today().normalize()
     idx = pd.date_range(end=end, periods=max(n, 30), freq=freq)
@@ -95,85 +526,536 @@ def _demo_series(tk: str, period: str, interval: str) -> pd.DataFrame:
     return df
 
 
+# =========================
+# Derivados locales (periodo / intervalo)
+# =========================
+
+PERIODS = ("1y", "2y", "5y", "10y", "max")
+INTERVALS = ("1d", "1wk", "1mo")
+# Etiquetas como Yahoo: semana por su lunes, mes por su día 1 (nunca fechas futuras)
+_RESAMPLE_RULE = {"1wk": dict(rule="W-MON", label="left", closed="left"), "1mo": dict(rule="MS")}
+_OHLC_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+def _resample_ohlc(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Barras semanales/mensuales a partir de diarias (resto de columnas: último valor)."""
+    how = _RESAMPLE_RULE.get(interval)
+    if how is None or df.empty:
+        return df
+    agg = {c: _OHLC_AGG.get(c, "last") for c in df.columns if c != "Return"}
+    out = df.resample(**how).agg(agg)
+    return out.dropna(subset=["Close"])
+
+
+def _derive(daily: pd.DataFrame, period: str, interval: str) -> pd.DataFrame:
+    """Recorta por fecha y remuestrea la serie diaria canónica; recalcula 'Return'."""
+    if daily.empty:
+        return daily
+    start = _period_start(period)
+    out = daily if start is None else daily.loc[daily.index >= start]
+    out = _widen(_resample_ohlc(out, interval))
+    out["Return"] = out["Close"].pct_change()
+    out.attrs = dict(daily.attrs)
+    return out
+
+
+# =========================
+# Caché en memoria acotada
+# =========================
+
+# Un solo presupuesto de bytes con expulsión LRU para lo que ocupa memoria
+# en proporción al histórico: diarias canónicas ("daily"), series pendientes
+# de price_history_many ("prefetched") y los resultados de price_history,
+# price_history_many, technicals y custom_technicals (grupo = nombre de la
+# función). Solo las diarias van compactas (precios en float32, índices
+# compartidos); las vistas derivadas se guardan ya anchas, tal como se sirven,
+# para que un acierto sea una copia y no una conversión.
+CACHE_MB = float(os.environ.get("FINANCE_DASHBOARD_CACHE_MB", "256"))
+_MEM = ByteLRU(int(CACHE_MB * 1024 * 1024), ttl_s=300)
+_COMPACT_COLS = ("Open", "High", "Low", "Close", "Volume")
+_FLOAT32_MAX_INT = 2 ** 24  # por encima, float32 ya no guarda todos los enteros
+# Índices compartidos: acciones del mismo mercado tienen el mismo calendario
+_INDEXES: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+
+def _compact(df: pd.DataFrame, cols: tuple[str, ...] | None = _COMPACT_COLS) -> pd.DataFrame:
+    """
+    Columnas 'cols' (por defecto OHLCV; None = todas) en float32, reutilizando
+    un índice idéntico si ya hay otro en memoria. Volume y las columnas de
+    enteros se quedan como están: en float32 perderían unidades (>2^24).
+    """
+    if df.empty:
+        return df
+    cols = list(df.columns) if cols is None else [c for c in cols if c in df.columns]
+    out = df[cols].astype({c: "float32" for c in cols if _fits_float32(df[c])})
+    key = (len(out), out.index[0], out.index[-1])
+    shared = _INDEXES.get(key)
+    if shared is not None and shared.equals(out.index):
+        out.index = shared
+    else:
+        _INDEXES[key] = out.index
+    out.attrs = dict(df.attrs)
+    return out
+
+
+def _fits_float32(col: pd.Series) -> bool:
+    """Columna de precios que cabe en float32 (no Volume, ni enteros grandes)."""
+    if col.name == "Volume" or col.dtype.kind != "f":
+        return False
+    vals = col.to_numpy()
+    vals = vals[np.isfinite(vals)]
+    return not (len(vals) and np.all(vals == np.round(vals)) and np.abs(vals).max() > _FLOAT32_MAX_INT)
+
+
+def _widen(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Columnas float32 de vuelta a float64 redondeando a 7 cifras significativas
+    (lo que guarda un float32), para que 123.45 no salga como
+    123.44999694824219 en el CSV. Se hace una vez al derivar, no en cada acierto.
+    """
+    out = df.copy()
+    for c in out.columns[out.dtypes == "float32"]:
+        vals = out[c].to_numpy(dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mag = 10.0 ** (6 - np.floor(np.log10(np.abs(vals))))
+            out[c] = np.where(np.isfinite(mag), np.round(vals * mag) / mag, vals)
+    out.attrs = dict(df.attrs)
+    return out
+
+
+def _fresh(value):
+    """Copia de lo guardado en _MEM (es compartido): DFs sueltos o en dict."""
+    if isinstance(value, dict):
+        return {k: _fresh(v) for k, v in value.items()}
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+def cache_stats() -> dict[str, dict]:
+    """Entradas, bytes, aciertos y expulsiones de la caché acotada (y por grupo) + single-flight."""
+    return {"memory": _MEM.stats(), "groups": _MEM.groups(), "singleflight": singleflight_stats()}
+
+
+def _clear_price_caches(ticker: str, source: str) -> None:
+    """Tira la diaria canónica y todas las vistas (periodo × intervalo) de un ticker."""
+    try:
+        _MEM.pop(("daily", ticker.upper(), source))
+        for period in PERIODS:
+            for interval in INTERVALS:
+                price_history.clear(ticker, period=period, interval=interval, source=source)
+    except Exception:
+        pass
+
+
 # =========================
 # API principal de precios
 # =========================
 
-@st.cache_data(show_spinner=False, ttl=300)  # 5 minutos
-def price_history(ticker: str, period: str = "5y", interval: str = "1d", source: str = "auto") -> pd.DataFrame:
+def _hedged_auto(ticker: str, errors: list[str]) -> pd.DataFrame | None:
     """
-    Devuelve histórico con columnas 'Close' y 'Return'.
-    Guarda la fuente usada en df.attrs['__source__'] ∈ {'yahoo','stooq','demo'}.
+    Lanza Yahoo; si en HEDGE_AFTER_S no ha contestado, lanza también Stooq y
+    devuelve la primera serie válida. La perdedora sigue en segundo plano y
+    deja su resultado en el almacén local.
+    """
+    def attempt(source: str):
+        try:
+            return _finish(_stored_fetch(source, ticker), source)
+        except Exception as e:
+            errors.extend([f"{source} error: {repr(e)}", traceback.format_exc()])
+            return None
+
+    yahoo = _RACE_POOL.submit(attempt, "yahoo")
+    try:
+        df = yahoo.result(timeout=HEDGE_AFTER_S)
+        if df is not None:
+            return df
+    except cf.TimeoutError:
+        pass
+
+    pending = {yahoo, _RACE_POOL.submit(attempt, "stooq")}
+    while pending:
+        done, pending = cf.wait(pending, return_when=cf.FIRST_COMPLETED)
+        for fut in sorted(done, key=lambda f: f is not yahoo):  # empate → Yahoo
+            df = fut.result()
+            if df is not None:
+                return df
+    return None
+
+
+def daily_history(ticker: str, source: str = "auto") -> pd.DataFrame:
+    """
+    Serie diaria canónica ('max') de un ticker, de la que se derivan todas
+    las vistas de price_history. Vive en la caché acotada _MEM (compacta,
+    precios en float32): el DF devuelto es compartido y no debe modificarse.
+    """
+    key = ("daily", ticker.upper(), source)
+    df = _MEM.get(key)
+    if df is None:
+        df = _FLIGHTS.do(key, _load_daily, ticker, source)
+    return df
+
+
+def _load_daily(ticker: str, source: str) -> pd.DataFrame:
+    df = _compact(_fetch_daily(ticker, source))
+    _MEM.put(("daily", ticker.upper(), source), df)
+    return df
+
+
+def _fetch_daily(ticker: str, source: str) -> pd.DataFrame:
+    """
+    Recorre las fuentes para la diaria canónica. Guarda la fuente en attrs['__source__'].
 
     Parámetro 'source':
-      - 'auto'  → Yahoo (timeout 2s) → Stooq → Demo
+      - 'auto'  → Yahoo (timeout 2s) → Stooq → Demo; con HEDGE_AFTER_S activo,
+                  Stooq arranca en paralelo si Yahoo tarda y gana el primero válido
       - 'stooq' → Solo Stooq → Demo
+
+    Una fuente con el circuit breaker abierto (ver source_health) no se llama:
+    se sirve lo que haya en el almacén local o se pasa a la siguiente.
+
+    Cada fuente pasa por el almacén parquet local (src/store.py): se lee lo
+    guardado y solo se descargan las barras nuevas desde la última fecha.
     """
     # Forzar Stooq si lo pide el usuario
     if source == "stooq":
-        df = _stooq_fetch(ticker, period)
-        if isinstance(df, pd.DataFrame) and not df.empty:
-            df = df.rename(columns={c: c.title() for c in df.columns})
-            if "Close" in df.columns:
-                df["Return"] = df["Close"].pct_change()
-                df.attrs["__source__"] = "stooq"
-                return df
-        return _demo_series(ticker, period, interval)
+        df = _finish(_stored_fetch("stooq", ticker), "stooq")
+        if df is not None:
+            return df
+        return _demo_series(ticker, "max", "1d")
 
-    # AUTO: Yahoo con timeout → Stooq → Demo
+    # AUTO: Yahoo con timeout → Stooq → Demo (o ambos en carrera si hay cobertura)
     errors: list[str] = []
-    try:
-        df = _yahoo_with_timeout(ticker, period, interval, timeout_s=2.0)
-    except Exception as e:
-        df = pd.DataFrame()
-        errors += [f"yahoo timeout error: {repr(e)}", traceback.format_exc()]
-
-    if isinstance(df, pd.DataFrame) and not df.empty:
-        df = df.rename(columns={c: c.title() for c in df.columns})
-        if "Close" in df.columns:
-            df["Return"] = df["Close"].pct_change()
-            df.attrs["__source__"] = "yahoo"
+    if HEDGE_AFTER_S is not None:
+        df = _hedged_auto(ticker, errors)
+        if df is not None:
             return df
+    else:
+        try:
+            df = _finish(_stored_fetch("yahoo", ticker), "yahoo")
+            if df is not None:
+                return df
+        except Exception as e:
+            errors += [f"yahoo timeout error: {repr(e)}", traceback.format_exc()]
 
-    # Stooq fallback
-    df = _stooq_fetch(ticker, period)
-    if isinstance(df, pd.DataFrame) and not df.empty:
-        df = df.rename(columns={c: c.title() for c in df.columns})
-        if "Close" in df.columns:
-            df["Return"] = df["Close"].pct_change()
-            df.attrs["__source__"] = "stooq"
+        # Stooq fallback
+        df = _finish(_stored_fetch("stooq", ticker), "stooq")
+        if df is not None:
             return df
 
     # Demo final
-    demo = _demo_series(ticker, period, interval)
+    demo = _demo_series(ticker, "max", "1d")
     if errors:
         demo.attrs["__errors__"] = "\n".join(errors[-3:])
     return demo
 
 
-@st.cache_data(show_spinner=False, ttl=600)
+@memoize(ttl=300, store=_MEM, unpack=_fresh)  # 5 minutos
+def price_history(ticker: str, period: str = "5y", interval: str = "1d", source: str = "auto") -> pd.DataFrame:
+    """
+    Devuelve histórico con columnas 'Close' y 'Return'.
+    Guarda la fuente usada en df.attrs['__source__'] ∈ {'yahoo','stooq','demo'}.
+
+    Se deriva en local de daily_history: el periodo es un recorte por fecha y
+    '1wk'/'1mo' un remuestreo OHLC, así que cambiar de periodo o intervalo no
+    descarga nada.
+    """
+    df = _derive(daily_history(ticker, source=source), period, interval)
+    df.attrs.update({"__ticker__": ticker.upper(), "__interval__": interval})
+    return df
+
+
+def _prefetch_yahoo_many(tickers: list[str]) -> None:
+    """
+    Descarga en bloque lo que falta: una llamada para los tickers sin histórico
+    guardado y otra (solo cola) para los que lo tienen pero ya no está fresco.
+    Lo bajado se guarda en el parquet y se deja listo para daily_history.
+    """
+    full_need: list[str] = []
+    tail_need: dict[str, pd.DataFrame] = {}
+    for tk in tickers:
+        stored = store.load(tk, "yahoo", "1d")
+        if not store.covers(stored, None):
+            full_need.append(tk)
+        elif not store.is_fresh(stored):
+            tail_need[tk] = stored
+
+    def keep_full(got: dict[str, pd.DataFrame]) -> None:
+        for tk, df in got.items():
+            df = _tidy(df)
+            if not df.empty:
+                _keep("yahoo", tk, df)
+
+    def keep_tail(got: dict[str, pd.DataFrame]) -> None:
+        for tk, tail in got.items():
+            _keep("yahoo", tk, _merge_tail("yahoo", tk, tail_need[tk], _tidy(tail)))
+
+    budget = 2.0 + 0.25 * len(tickers)  # mismo criterio que el timeout individual, algo más holgado
+    if full_need:
+        keep_full(_guarded("yahoo", ",".join(full_need), lambda: _yahoo_many_with_timeout(
+            full_need, "max", "1d", timeout_s=budget, on_late=keep_full), {}))
+    if tail_need:
+        since = min(store.tail_start(df) for df in tail_need.values())
+        keep_tail(_guarded("yahoo", ",".join(tail_need), lambda: _yahoo_many_with_timeout(
+            list(tail_need), "max", "1d", timeout_s=budget, start=since, on_late=keep_tail), {}))
+
+
+@memoize(ttl=300, store=_MEM, unpack=_fresh)
+def price_history_many(tickers: list[str], period: str = "5y", interval: str = "1d",
+                       source: str = "auto") -> dict[str, pd.DataFrame]:
+    """
+    Igual que price_history pero para varios tickers a la vez: en modo 'auto'
+    hace una única descarga agrupada en Yahoo y reparte el resultado por ticker.
+    Los que no lleguen en bloque siguen el camino normal (Yahoo → Stooq → Demo).
+    """
+    tickers = list(dict.fromkeys(t.upper().strip() for t in tickers if t and t.strip()))
+    if source == "auto" and len(tickers) > 1:
+        _prefetch_yahoo_many(tickers)
+    return {tk: price_history(tk, period=period, interval=interval, source=source) for tk in tickers}
+
+
+# =========================
+# Refresco proactivo
+# =========================
+
+def _revalidate(ticker: str, source: str, force: bool = False) -> None:
+    """Pone al día el parquet de la primera fuente que responda (solo la cola)."""
+    sources = ["stooq"] if source == "stooq" else ["yahoo", "stooq"]
+    for src in sources:
+        if not _stored_fetch(src, ticker, revalidate=force).empty:
+            break
+
+
+def warm_price(ticker: str, period: str = "5y", interval: str = "1d", source: str = "auto") -> None:
+    """
+    Pone al día el almacén local (solo la cola) y vuelve a poblar la diaria
+    canónica y la vista pedida; al encontrar el parquet fresco no tocan la red.
+    """
+    _revalidate(ticker, source)
+    _MEM.pop(("daily", ticker.upper(), source))
+    daily_history(ticker, source=source)
+    price_history.clear(ticker, period=period, interval=interval, source=source)
+    price_history(ticker, period=period, interval=interval, source=source)
+
+
+def warm_fundamentals(ticker: str) -> None:
+    """Recalcula estados y ratios (los usa fundamentals_available en cada carga)."""
+    get_financials.clear(ticker)
+    get_financials(ticker)
+    compute_ratios.clear(ticker)
+    compute_ratios(ticker)
+
+
+# =========================
+# Claves de caché baratas
+# =========================
+
+def _frame_key(df: pd.DataFrame) -> tuple:
+    """
+    Huella barata de un DataFrame de precios para memoize: en lugar de
+    hashear todas las celdas en cada rerun se usan ticker/fuente/intervalo
+    (sellados por price_history en attrs), extremos del índice, nº de filas,
+    columnas y último cierre (la última barra puede venir corregida).
+    Frames sin sello caen al hash completo.
+    """
+    a = getattr(df, "attrs", {})
+    if df.empty or "__ticker__" not in a:
+        return ("full", int(pd.util.hash_pandas_object(df, index=True).sum()), tuple(map(str, df.columns)))
+    last_close = float(df["Close"].iloc[-1]) if "Close" in df.columns else None
+    return (a["__ticker__"], a.get("__source__"), a.get("__interval__"),
+            df.index[0], df.index[-1], len(df), tuple(map(str, df.columns)), last_close)
+
+
+_FRAME_HASH = {pd.DataFrame: _frame_key}
+
+
+def refresh_ticker(ticker: str, peers: list[str] | tuple = (), source: str = "auto",
+                   fundamentals: bool = True) -> None:
+    """
+    Recarga solo 'ticker' (y opcionalmente sus peers) en vez de vaciar toda
+    la caché del servidor. Primero revalida el parquet con una descarga de
+    cola y después sustituye la diaria y sus vistas, que se reconstruyen en
+    local. Los técnicos no hace falta tocarlos: su clave es la huella del DF
+    (_frame_key), que cambia en cuanto hay barras nuevas. Las fundamentales
+    se recalculan solo para el ticker principal.
+    """
+    for tk in dict.fromkeys(t.upper().strip() for t in [ticker, *peers] if t and t.strip()):
+        _revalidate(tk, source, force=True)
+        _clear_price_caches(tk, source)
+    # Las comparativas se rearman desde las cachés por ticker, sin red
+    price_history_many.clear()
+    if fundamentals:
+        warm_fundamentals(ticker)
+
+
+@memoize(ttl=600, max_entries=64, hash_funcs=_FRAME_HASH)
 def annual_returns(df: pd.DataFrame) -> pd.Series:
     if df.empty:
         return pd.Series(dtype=float)
-    return df["Close"].resample("Y").last().pct_change().dropna()
+    return df["Close"].resample("YE").last().pct_change().dropna()
 
 
-@st.cache_data(show_spinner=False, ttl=600)
+@memoize(ttl=600, max_entries=64, hash_funcs=_FRAME_HASH)
 def rolling_volatility(df: pd.DataFrame, window: int = 21) -> pd.Series:
     if df.empty:
         return pd.Series(dtype=float)
     return df["Return"].rolling(window).std() * np.sqrt(252)
 
 
+# =========================
+# Screener (muchos tickers)
+# =========================
+
+@memoize(ttl=300, max_entries=16)
+def screen_universe(tickers: tuple[str, ...], period: str = "1y", source: str = "auto",
+                    rsi_window: int = 14, sma_window: int = 50, vol_window: int = 21,
+                    momentum_window: int = 126) -> pd.DataFrame:
+    """
+    Métricas del screener (src/screener.py) para todo un universo de tickers:
+    una descarga agrupada vía price_history_many y un único panel NumPy.
+    Los tickers sin datos reales (modo demo) se descartan. La volatilidad se
+    anualiza con las barras por año de cada ticker (cripto 365, resto 252).
+    """
+    frames = price_history_many(list(tickers), period=period, interval="1d", source=source)
+    frames = {tk: df for tk, df in frames.items() if not df.attrs.get("__demo__")}
+    panel, names = build_panel(frames)
+    per_year = np.array([periods_per_year(frames[tk].index) for tk in names], dtype="float64")
+    return screen(panel, names, rsi_window=rsi_window, sma_window=sma_window,
+                  vol_window=vol_window, momentum_window=momentum_window, periods_per_year=per_year)
+
+
+# =========================
+# Backtesting
+# =========================
+
+PERIODS_PER_YEAR = {"1d": 252, "1wk": 52, "1mo": 12}
+
+
+@memoize(ttl=600, max_entries=16)
+def backtest_grid(tickers: tuple[str, ...], strategies: tuple[Strategy, ...], period: str = "5y",
+                  interval: str = "1d", source: str = "auto", cost_bps: float = 5.0) -> pd.DataFrame:
+    """
+    Métricas de cada (ticker, estrategia) con src/backtest.py: todas las
+    combinaciones de parámetros vectorizadas y repartidas en procesos.
+    Los tickers sin datos reales (modo demo) se descartan.
+    """
+    frames = price_history_many(list(tickers), period=period, interval=interval, source=source)
+    closes = {tk: df["Close"].dropna().to_numpy() for tk, df in frames.items()
+              if not df.empty and not df.attrs.get("__demo__")}
+    return run_grid(closes, list(strategies), periods_per_year=PERIODS_PER_YEAR.get(interval, 252),
+                    cost_bps=cost_bps)
+
+
+# =========================
+# Proyección Monte Carlo
+# =========================
+
+_FUTURE_FREQ = {"1d": "B", "1wk": "W-MON", "1mo": "MS"}
+
+
+@memoize(ttl=3600, max_entries=32, hash_funcs=_FRAME_HASH)
+def monte_carlo(df: pd.DataFrame, horizon: int = 252, n_paths: int = 20_000, mode: str = "gbm",
+                seed: int = 0, budget_s: float = 3.0) -> pd.DataFrame:
+    """
+    Bandas de percentiles de la proyección (src/montecarlo.py). La clave es la
+    huella del DF (ticker, intervalo, última barra) + parámetros: mientras no
+    llegue una barra nueva no se vuelve a simular.
+    """
+    if df.empty or len(df) < 3:
+        return pd.DataFrame()
+    freq = _FUTURE_FREQ.get(df.attrs.get("__interval__", "1d"), "B")
+    return projection_frame(df, horizon=horizon, n_paths=n_paths, mode=mode, seed=seed,
+                            budget_s=budget_s, freq=freq)
+
+
+# =========================
+# Correlaciones y beta
+# =========================
+
+@memoize(ttl=300, max_entries=32)
+def correlation_stats(tickers: tuple[str, ...], benchmark: str = "SPY", period: str = "5y",
+                      interval: str = "1d", source: str = "auto", window: int = 63) -> dict:
+    """
+    Para la Comparativa (src/correlation.py), sobre los rendimientos en fechas
+    comunes de los tickers con datos reales (los demo y vacíos se descartan):
+      - 'matrix': correlaciones de todo el periodo, todos los pares (tickers + benchmark)
+      - 'corr': correlación móvil de cada ticker con el primero (solo esos
+        pares; el resto, de todo el periodo, en 'matrix')
+      - 'beta': beta móvil frente al benchmark
+      - 'betas': beta y correlación de todo el periodo frente al benchmark
+      - 'message': por qué falta algo (sin datos del primero o del benchmark), o ""
+    """
+    empty = {"matrix": pd.DataFrame(), "corr": pd.DataFrame(), "beta": pd.DataFrame(), "betas": pd.DataFrame()}
+    names = list(dict.fromkeys(list(tickers) + [benchmark]))
+    frames = price_history_many(names, period=period, interval=interval, source=source)
+    frames = {tk: df for tk, df in frames.items() if not df.empty and not df.attrs.get("__demo__")}
+    missing = [tk for tk in dict.fromkeys([tickers[0], benchmark]) if tk not in frames]
+    if missing:
+        return {**empty, "message": f"Sin datos reales de {', '.join(missing)}: no se calculan correlaciones."}
+    rets = align_returns(frames)
+    if rets.empty:
+        return {**empty, "message": "No hay fechas comunes suficientes para calcular correlaciones."}
+    vs_first = rolling_against(rets, tickers[0], window)["corr"]
+    vs_bench = rolling_against(rets, benchmark, window)["beta"]
+    return {
+        "matrix": corr_matrix(rets),
+        "corr": vs_first.drop(columns=[tickers[0]], errors="ignore"),
+        "beta": vs_bench.drop(columns=[benchmark], errors="ignore"),
+        "betas": beta_table(rets, benchmark),
+        "message": "",
+    }
+
+
+# =========================
+# Cartera (frontera eficiente)
+# =========================
+
+@memoize(ttl=600, max_entries=16, hash_funcs=_FRAME_HASH)
+def _portfolio_estimates(frames: tuple[pd.DataFrame, ...], names: tuple[str, ...],
+                         periods_per_year: float, shrink: float) -> tuple[pd.Index, np.ndarray, np.ndarray]:
+    """μ y Σ anualizadas; la clave es la huella de cada DF, así que cambiar rf no recalcula Σ."""
+    rets = align_returns(dict(zip(names, frames)))
+    mu, cov = estimate(rets, periods_per_year, shrink)
+    return rets.columns, mu, cov
+
+
+@memoize(ttl=600, max_entries=16)
+def optimize_portfolio(tickers: tuple[str, ...], period: str = "5y", interval: str = "1d", source: str = "auto",
+                       rf: float = 0.02, shrink: float = 0.1) -> dict[str, pd.DataFrame]:
+    """
+    Mínima varianza, máximo Sharpe y frontera eficiente largo-solo
+    (src/portfolio.py) sobre las fechas comunes de los tickers con datos reales.
+    """
+    frames = price_history_many(list(tickers), period=period, interval=interval, source=source)
+    frames = {tk: df for tk, df in frames.items() if not df.empty and not df.attrs.get("__demo__")}
+    if len(frames) < 2:
+        return {}
+    names, mu, cov = _portfolio_estimates(tuple(frames.values()), tuple(frames),
+                                          PERIODS_PER_YEAR.get(interval, 252), shrink)
+    res = optimize(mu, cov, rf=rf)
+    weights = pd.DataFrame({"Mín. varianza": res["min_var"], "Máx. Sharpe": res["max_sharpe"],
+                            "Rentabilidad": mu, "Volatilidad": np.sqrt(np.diag(cov))}, index=names)
+    ret, vol, sharpe = portfolio_stats(np.vstack([res["min_var"], res["max_sharpe"]]), mu, cov, rf)
+    summary = pd.DataFrame({"Rentabilidad": ret, "Volatilidad": vol, "Sharpe": sharpe},
+                           index=["Mín. varianza", "Máx. Sharpe"])
+    cols = ["Rentabilidad", "Volatilidad", "Sharpe"]
+    return {
+        "weights": weights,
+        "summary": summary,
+        "frontier": pd.DataFrame(res["frontier"], columns=cols),
+        "random": pd.DataFrame(res["random"][:5000], columns=cols),
+    }
+
+
 # =========================
 # Fundamentales (yfinance)
 # =========================
 
 def get_ticker(ticker: str) -> yf.Ticker:
-    return yf.Ticker(ticker.upper())
+    """Ticker sobre la sesión compartida de Yahoo (keep-alive, ver src/transport.py)."""
+    return _yf().Ticker(ticker.upper(), session=transport.session("yahoo"))
 
 
-@st.cache_data(show_spinner=False, ttl=1200)
+@memoize(ttl=1200, max_entries=256)
+@_single_flight("financials")
 def get_financials(ticker: str) -> dict[str, pd.DataFrame]:
     """
     Usa yfinance. Puede venir vacío (depende del ticker/disponibilidad).
@@ -182,7 +1064,7 @@ def get_financials(ticker: str) -> dict[str, pd.DataFrame]:
     t = get_ticker(ticker)
 
     def safe_df(attr_name: str) -> pd.DataFrame:
-        df = getattr(t, attr_name, pd.DataFrame())
+        df = transport.call("yahoo", getattr, t, attr_name, pd.DataFrame())
         if isinstance(df, pd.DataFrame) and not df.empty:
             return df
         return pd.DataFrame()
@@ -200,7 +1082,8 @@ def get_financials(ticker: str) -> dict[str, pd.DataFrame]:
     return {"income": income, "balance": balance, "cashflow": cashflow}
 
 
-@st.cache_data(show_spinner=False, ttl=1200)
+@memoize(ttl=1200, max_entries=256)
+@_single_flight("ratios")
 def compute_ratios(ticker: str) -> dict[str, float]:
     """
     Intenta ratios vía yfinance.get_info().
@@ -212,7 +1095,7 @@ def compute_ratios(ticker: str) -> dict[str, float]:
     info_dict = {}
     try:
         if hasattr(t, "get_info") and callable(t.get_info):
-            info_dict = t.get_info() or {}
+            info_dict = transport.call("yahoo", t.get_info) or {}
     except Exception:
         info_dict = {}
 
@@ -279,9 +1162,51 @@ def fundamentals_available(ticker: str) -> bool:
 # Indicadores técnicos
 # =========================
 
-@st.cache_data(show_spinner=False, ttl=600)
+# Estado incremental por serie: con barras nuevas solo se procesan esas
+_ENGINE = IndicatorEngine()
+
+
+@memoize(ttl=600, hash_funcs=_FRAME_HASH, store=_MEM, unpack=_fresh)
 def technicals(df: pd.DataFrame) -> pd.DataFrame:
-    """Calcula SMA20/50, EMA12/26, Bollinger(20,2) y RSI(14)."""
+    """
+    Calcula SMA20/50, EMA12/26, Bollinger(20,2) y RSI(14).
+    Los DF de price_history pasan por el motor incremental (src/indicators.py),
+    que da el mismo resultado que _technicals_batch procesando solo lo nuevo.
+    """
+    if df.empty:
+        return df
+    a = df.attrs
+    if "__ticker__" in a and not df["Close"].isna().any():
+        key = (a["__ticker__"], a.get("__source__"), a.get("__interval__"), df.index[0])
+        return _ENGINE.technicals(key, df)
+    return _technicals_batch(df)
+
+
+DEFAULT_WINDOWS = {"sma": (20, 50), "ema": (12, 26), "bb": (20, 2.0), "rsi": (14,)}
+
+
+@memoize(ttl=600, hash_funcs=_FRAME_HASH, store=_MEM, unpack=_fresh)
+def custom_technicals(df: pd.DataFrame, sma: tuple[int, ...] = (20, 50), ema: tuple[int, ...] = (12, 26),
+                      bb: tuple[int, float] | None = (20, 2.0), rsi: tuple[int, ...] = (14,)) -> pd.DataFrame:
+    """
+    Indicadores con ventanas elegidas por el usuario (SMA{w}, EMA{w}, BB_*, RSI{w})
+    con el kernel vectorizado de src/indicators.py: una sola pasada de sumas
+    acumuladas para todas las ventanas. Las filas con cierre NaN quedan en NaN.
+    """
+    if df.empty:
+        return df
+    valid = df["Close"].notna()
+    if valid.all():
+        return kernel_technicals(df, sma, ema, bb, rsi)
+    part = kernel_technicals(df[valid], sma, ema, bb, rsi)
+    out = df.copy()
+    for col in [c for c in part.columns if c not in df.columns]:
+        out[col] = part[col].reindex(df.index)
+    return out
+
+
+def _technicals_batch(df: pd.DataFrame) -> pd.DataFrame:
+    """Versión de referencia con pandas (recorre todo el histórico)."""
     if df.empty:
         return df
     out = df.copy()
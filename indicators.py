@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import copy
+import math
+import functools
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from src import lazy
+
+# numba opcional: acelera el bucle de las EMA (sin él se usa pandas ewm, en C).
+# Importarlo cuesta casi un segundo: se hace al primer cálculo, no al arrancar.
+_HAS_NUMBA = lazy.available("numba")
+
+# Mismo orden y nombres que finance.technicals
+COLUMNS = ["SMA20", "SMA50", "EMA12", "EMA26", "BB_Mid", "BB_Up", "BB_Lo", "RSI14"]
+
+
+# =========================
+# Estado incremental
+# =========================
+
+class _Window:
+    """
+    Ventana deslizante de tamaño fijo con media y M2 (Welford) actualizados
+    en O(1) al entrar/salir un valor. Cuenta los no-ceros para devolver una
+    media exactamente 0 cuando toca (RSI: pérdidas todas a cero → NaN), y la
+    racha de valores iguales para que una ventana plana dé media exacta y
+    desviación 0 (como pandas) en vez del residuo de restar y sumar.
+    """
+
+    __slots__ = ("size", "buf", "mean", "m2", "nonzero", "run")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.buf: deque[float] = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.nonzero = 0
+        self.run = 0
+
+    def push(self, x: float) -> None:
+        self.run = self.run + 1 if self.buf and self.buf[-1] == x else 1
+        self.buf.append(x)
+        self.nonzero += x != 0.0
+        k = len(self.buf)
+        d = x - self.mean
+        self.mean += d / k
+        self.m2 += d * (x - self.mean)
+        if k > self.size:
+            y = self.buf.popleft()
+            self.nonzero -= y != 0.0
+            k -= 1
+            d = y - self.mean
+            self.mean -= d / k
+            self.m2 -= d * (y - self.mean)
+        if self.run >= self.size:
+            self.mean, self.m2 = x, 0.0
+
+    @property
+    def full(self) -> bool:
+        return len(self.buf) == self.size
+
+    def avg(self) -> float:
+        if not self.full:
+            return math.nan
+        return self.mean if self.nonzero else 0.0
+
+    def std(self) -> float:
+        """Desviación muestral (ddof=1), como pandas rolling().std()."""
+        if not self.full:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.size - 1))
+
+
+class IndicatorState:
+    """
+    Estado en curso de SMA20/50, EMA12/26, Bollinger(20,2) y RSI(14) para una
+    serie: cada barra nueva se procesa en O(1) sin recorrer el histórico.
+    Reproduce las definiciones de finance.technicals (EMA con adjust=False
+    sembrada con el primer cierre; RSI con medias simples de ganancias/pérdidas).
+    """
+
+    def __init__(self):
+        self.w20 = _Window(20)
+        self.w50 = _Window(50)
+        self.gain = _Window(14)
+        self.loss = _Window(14)
+        self.ema12: float | None = None
+        self.ema26: float | None = None
+        self.prev_close: float | None = None
+
+    def update(self, close: float) -> tuple[float, ...]:
+        self.w20.push(close)
+        self.w50.push(close)
+        a12, a26 = 2.0 / 13.0, 2.0 / 27.0
+        self.ema12 = close if self.ema12 is None else a12 * close + (1 - a12) * self.ema12
+        self.ema26 = close if self.ema26 is None else a26 * close + (1 - a26) * self.ema26
+
+        rsi = math.nan
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            self.gain.push(max(delta, 0.0))
+            self.loss.push(max(-delta, 0.0))
+            up, down = self.gain.avg(), self.loss.avg()
+            if not math.isnan(up) and down != 0.0 and not math.isnan(down):
+                rsi = 100.0 - 100.0 / (1.0 + up / down)
+        self.prev_close = close
+
+        mb, sd = self.w20.avg(), self.w20.std()
+        return (mb, self.w50.avg(), self.ema12, self.ema26, mb, mb + 2 * sd, mb - 2 * sd, rsi)
+
+
+class _Track:
+    """Estado + resultados ya calculados de una serie concreta (buffer que crece ×2)."""
+
+    def __init__(self, first_ts, first_close: float):
+        self.state = IndicatorState()
+        self.prev_state: IndicatorState | None = None  # antes de la última barra
+        self.first_ts = first_ts
+        self.first_close = first_close
+        self.last_ts = None
+        self.last_close = math.nan
+        self.n = 0
+        self.out = np.empty((256, len(COLUMNS)))
+
+    def extend(self, index: pd.Index, close: np.ndarray, start: int) -> None:
+        for i in range(start, len(close)):
+            if i == len(close) - 1:
+                self.prev_state = copy.deepcopy(self.state)
+            if self.n == len(self.out):
+                self.out = np.concatenate([self.out, np.empty_like(self.out)])
+            self.out[self.n] = self.state.update(float(close[i]))
+            self.n += 1
+        if len(close):
+            self.last_ts = index[len(close) - 1]
+            self.last_close = float(close[-1])
+
+    def rollback_last(self) -> bool:
+        """Deshace la última barra (Yahoo a veces corrige la del día)."""
+        if self.prev_state is None or self.n == 0:
+            return False
+        self.state, self.prev_state = self.prev_state, None
+        self.n -= 1
+        return True
+
+
+# =========================
+# Motor por ticker
+# =========================
+
+class IndicatorEngine:
+    """
+    Mantiene un _Track por clave (ticker, fuente, intervalo, inicio) y, cuando
+    llega el mismo DF con barras añadidas, solo procesa las nuevas. Si la serie
+    no es continuación de la anterior (otro inicio, ajuste por dividendos que
+    cambia el primer cierre, más de una barra corregida...) se reconstruye.
+    """
+
+    def __init__(self, max_tracks: int = 256):
+        self.max_tracks = max_tracks
+        self._tracks: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def technicals(self, key, df: pd.DataFrame) -> pd.DataFrame:
+        close = df["Close"].to_numpy(dtype="float64")
+        index = df.index
+        with self._lock:
+            tr = self._tracks.get(key)
+            if tr is not None:
+                self._tracks.move_to_end(key)
+                if not self._continues(tr, index, close):
+                    tr = None
+            if tr is None:
+                tr = _Track(index[0], float(close[0]))
+                self._tracks[key] = tr
+                while len(self._tracks) > self.max_tracks:
+                    self._tracks.popitem(last=False)
+            tr.extend(index, close, tr.n)
+            values = tr.out[:len(close)].copy()
+        out = df.copy()
+        out[COLUMNS] = values
+        return out
+
+    @staticmethod
+    def _continues(tr: _Track, index: pd.Index, close: np.ndarray) -> bool:
+        if tr.n == 0 or len(close) < tr.n:
+            return False
+        if index[0] != tr.first_ts or float(close[0]) != tr.first_close:
+            return False
+        if index[tr.n - 1] != tr.last_ts:
+            return False
+        if float(close[tr.n - 1]) != tr.last_close:
+            return tr.rollback_last()  # se recalcula esa barra en extend()
+        return True
+
+
+# =========================
+# Kernel vectorizado (ventanas configurables)
+# =========================
+
+# Ventanas cuya suma de cuadrados es menor que esto por lo acumulado hasta
+# ellas: la resta de cumsums ya no da ~9 cifras y se recalculan (_rolling_var)
+_CANCEL_TOL = 1e-6
+
+
+def _rolling_from_cumsum(cs: np.ndarray, w: int) -> np.ndarray:
+    """Suma móvil de ventana w a partir de la suma acumulada con 0 inicial; NaN hasta llenar."""
+    out = np.full(len(cs) - 1, np.nan)
+    if w <= len(cs) - 1:
+        out[w - 1:] = cs[w:] - cs[:-w]
+    return out
+
+
+def _rolling_var(close: np.ndarray, w: int) -> np.ndarray:
+    """
+    Varianza muestral móvil (ddof=1). Va por sumas acumuladas de cuadrados,
+    pero esa resta pierde cifras cuando la ventana varía poco frente a todo
+    lo acumulado (una serie que pasa de 1000 a 10): esas ventanas se rehacen
+    en dos pasadas, recentradas en su propia media.
+    """
+    n = len(close)
+    out = np.full(n, np.nan)
+    if w > n:
+        return out
+    x = close - close.mean()
+    cs1 = np.concatenate(([0.0], np.cumsum(x)))
+    cs2 = np.concatenate(([0.0], np.cumsum(x * x)))
+    s1 = cs1[w:] - cs1[:-w]
+    m2 = np.maximum(cs2[w:] - cs2[:-w] - s1 * s1 / w, 0.0)
+    lossy = np.flatnonzero(m2 < _CANCEL_TOL * cs2[w:])
+    if len(lossy):
+        win = np.lib.stride_tricks.sliding_window_view(close, w)[lossy]
+        d = win - win.mean(axis=1, keepdims=True)
+        m2[lossy] = np.einsum("ij,ij->i", d, d)
+    out[w - 1:] = m2 / (w - 1)
+    return out
+
+
+def _flat_windows(changes: np.ndarray, w: int) -> np.ndarray:
+    """
+    True donde las w últimas barras son idénticas (ventana plana), a partir
+    de 'changes' = nº acumulado de cambios de cierre entre barras consecutivas.
+    """
+    n = len(changes)
+    flat = np.zeros(n, dtype=bool)
+    if w <= n:
+        flat[w - 1:] = changes[w - 1:] == changes[:n - w + 1]
+    return flat
+
+
+def _ema_numpy(close: np.ndarray, spans: tuple[int, ...]) -> np.ndarray:
+    s = pd.Series(close)
+    return np.column_stack([s.ewm(span=sp, adjust=False).mean().to_numpy() for sp in spans])
+
+
+def _ema_loop_py(close, alphas):
+    out = np.empty((close.shape[0], alphas.shape[0]))
+    for j in range(alphas.shape[0]):
+        out[0, j] = close[0]
+    for i in range(1, close.shape[0]):
+        for j in range(alphas.shape[0]):
+            out[i, j] = alphas[j] * close[i] + (1.0 - alphas[j]) * out[i - 1, j]
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def _ema_loop():
+    """Bucle de EMA compilado con numba la primera vez que se pide (None sin numba)."""
+    numba = lazy.module("numba") if _HAS_NUMBA else None
+    return numba.njit(cache=True)(_ema_loop_py) if numba is not None else None
+
+
+def _ema(close: np.ndarray, spans: tuple[int, ...]) -> np.ndarray:
+    loop = _ema_loop()
+    if loop is None:
+        return _ema_numpy(close, spans)
+    return loop(close, 2.0 / (np.asarray(spans, dtype="float64") + 1.0))
+
+
+def indicator_kernel(close: np.ndarray, sma=(20, 50), ema=(12, 26), bb=(20, 2.0),
+                     rsi=(14,)) -> dict[str, np.ndarray]:
+    """
+    Todos los indicadores en una pasada de sumas acumuladas compartidas:
+      - una cumsum de cierres (centrados, para no perder precisión) sirve
+        para cualquier SMA y para el centro de Bollinger
+      - una cumsum de cuadrados da la varianza de Bollinger, rehaciendo en dos
+        pasadas las ventanas donde la resta pierde precisión (_rolling_var);
+        una ventana plana da media exacta y desviación 0
+      - cumsums de ganancias/pérdidas (y de pérdidas no nulas, para que una
+        ventana sin pérdidas dé NaN como en pandas) dan cualquier RSI
+      - las EMA van juntas en un solo bucle (numba) o con pandas ewm
+    'bb' es (ventana, nº de desviaciones) o None. Sin NaN en 'close'.
+    """
+    close = np.asarray(close, dtype="float64")
+    n = len(close)
+    out: dict[str, np.ndarray] = {}
+    if n == 0:
+        return out
+
+    ref = close.mean()
+    x = close - ref
+    cs1 = np.concatenate(([0.0], np.cumsum(x)))
+    sma_windows = set(sma) | ({bb[0]} if bb else set())
+    changes = np.concatenate(([0], np.cumsum(close[1:] != close[:-1])))
+    flat = {w: _flat_windows(changes, w) for w in sma_windows}
+    means = {w: np.where(flat[w], close, _rolling_from_cumsum(cs1, w) / w + ref) for w in sma_windows}
+    for w in sma:
+        out[f"SMA{w}"] = means[w]
+
+    if ema:
+        e = _ema(close, tuple(ema))
+        for j, sp in enumerate(ema):
+            out[f"EMA{sp}"] = e[:, j]
+
+    if bb:
+        w, k = bb
+        sd = np.sqrt(np.where(flat[w], 0.0, _rolling_var(close, w)))
+        mid = means[w]
+        out["BB_Mid"], out["BB_Up"], out["BB_Lo"] = mid, mid + k * sd, mid - k * sd
+
+    if rsi:
+        delta = np.diff(close)
+        gain = np.maximum(delta, 0.0)
+        loss = np.maximum(-delta, 0.0)
+        csg = np.concatenate(([0.0, 0.0], np.cumsum(gain)))
+        csl = np.concatenate(([0.0, 0.0], np.cumsum(loss)))
+        csz = np.concatenate(([0, 0], np.cumsum(loss > 0)))
+        for w in rsi:
+            up = np.full(n, np.nan)
+            down = np.full(n, np.nan)
+            nz = np.zeros(n)
+            if w <= n - 1:
+                up[w:] = (csg[w + 1:] - csg[1:-w]) / w
+                down[w:] = (csl[w + 1:] - csl[1:-w]) / w
+                nz[w:] = csz[w + 1:] - csz[1:-w]
+            down = np.where(nz > 0, down, np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[f"RSI{w}"] = 100.0 - 100.0 / (1.0 + up / down)
+    return out
+
+
+def kernel_technicals(df: pd.DataFrame, sma=(20, 50), ema=(12, 26), bb=(20, 2.0), rsi=(14,)) -> pd.DataFrame:
+    """DF de precios + columnas de indicator_kernel (SMA{w}, EMA{w}, BB_*, RSI{w})."""
+    if df.empty:
+        return df.copy()
+    cols = indicator_kernel(df["Close"].to_numpy(), sma, ema, bb, rsi)
+    out = pd.concat([df, pd.DataFrame(cols, index=df.index)], axis=1)
+    out.attrs = dict(df.attrs)
+    return out
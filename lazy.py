@@ -0,0 +1,88 @@
+"""
+Importación diferida de dependencias pesadas (proveedores de datos y
+renderizadores). Servir datos ya en caché no necesita ninguna: se importan
+la primera vez que se usan, o antes con prewarm().
+
+    python -m src.lazy     # precalienta (bytecode + caché de disco) y muestra tiempos
+"""
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+
+# Lo que no hace falta para pintar datos cacheados
+HEAVY = ("yfinance", "curl_cffi", "pandas_datareader.data", "plotly.express", "numba", "pyarrow")
+
+_FAILED: set[str] = set()
+_TIMES: dict[str, float] = {}
+_PREWARM: threading.Thread | None = None
+_PREWARM_LOCK = threading.Lock()
+
+
+def available(name: str) -> bool:
+    """¿Se puede importar 'name'? Sin importarlo (solo busca el paquete raíz)."""
+    if name in _FAILED:
+        return False
+    if name in sys.modules:
+        return True
+    return importlib.util.find_spec(name.split(".")[0]) is not None
+
+
+def module(name: str):
+    """
+    Importa 'name' la primera vez que se pide y lo devuelve; None si no está
+    instalado o falla al importar (p. ej. pandas-datareader con pandas nuevo).
+    Importaciones simultáneas del mismo módulo las serializa el propio import.
+    """
+    mod = sys.modules.get(name)
+    if mod is not None:
+        return mod
+    if name in _FAILED:
+        return None
+    t0 = time.perf_counter()
+    try:
+        mod = importlib.import_module(name)
+    except Exception:
+        _FAILED.add(name)
+        return None
+    _TIMES.setdefault(name, time.perf_counter() - t0)
+    return mod
+
+
+def import_times() -> dict[str, float]:
+    """Segundos que costó cada importación diferida hecha en este proceso."""
+    return dict(_TIMES)
+
+
+def prewarm(names: tuple[str, ...] = HEAVY, background: bool = True) -> None:
+    """
+    Paga el coste de importación antes de que lo pida una petición: en un
+    hilo aparte (una vez por proceso) o, con background=False, en el acto.
+    """
+    global _PREWARM
+
+    def run():
+        for name in names:
+            module(name)
+
+    if not background:
+        run()
+        return
+    with _PREWARM_LOCK:
+        if _PREWARM is None:
+            _PREWARM = threading.Thread(target=run, name="prewarm-imports", daemon=True)
+            _PREWARM.start()
+
+
+if __name__ == "__main__":
+    t0 = time.perf_counter()
+    prewarm(background=False)
+    for name in HEAVY:
+        if name in _TIMES:
+            print(f"{name:<24} {_TIMES[name] * 1000:8.1f} ms")
+        else:
+            print(f"{name:<24} {'(ya importado por otro)' if name in sys.modules else 'no disponible'}")
+    print(f"{'total':<24} {(time.perf_counter() - t0) * 1000:8.1f} ms")
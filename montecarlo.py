@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import WORKERS, process_pool
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# Caminos por trozo: (CHUNK × horizonte) float64 ≈ 2 MB con 1 año diario
+CHUNK = int(os.environ.get("FINANCE_DASHBOARD_MC_CHUNK", "1000"))
+# Resolución del histograma por paso (en log-precio)
+BINS = 512
+# Anchura del histograma en desviaciones típicas (lo de fuera cae en los extremos)
+SPAN_SIGMAS = 8.0
+
+
+# =========================
+# Simulación por trozos
+# =========================
+
+def _grid(log_rets: np.ndarray, horizon: int) -> tuple[np.ndarray, np.ndarray]:
+    """Límite inferior y anchura de bin por paso, centrados en la deriva y abiertos con σ√t."""
+    mu, sigma = float(log_rets.mean()), float(log_rets.std(ddof=1)) or 1e-4
+    t = np.arange(1, horizon + 1)
+    half = SPAN_SIGMAS * sigma * np.sqrt(t) + 1e-9
+    return mu * t - half, 2 * half / BINS
+
+
+def _chunk_hist(log_rets: np.ndarray, horizon: int, n: int, mode: str, seed) -> np.ndarray:
+    """
+    Simula n caminos de log-rendimiento acumulado y devuelve solo su
+    histograma por paso (horizonte × BINS); los caminos se descartan.
+    """
+    rng = np.random.default_rng(seed)
+    if mode == "bootstrap":
+        steps = log_rets[rng.integers(0, len(log_rets), size=(n, horizon))]
+    else:  # GBM: incrementos log-normales con la media y σ históricas
+        steps = rng.normal(log_rets.mean(), log_rets.std(ddof=1), size=(n, horizon))
+    paths = np.cumsum(steps, axis=1)
+
+    lo, width = _grid(log_rets, horizon)
+    idx = np.clip(((paths - lo) / width).astype(np.int64), 0, BINS - 1)
+    flat = (idx + np.arange(horizon) * BINS).ravel()
+    return np.bincount(flat, minlength=horizon * BINS).reshape(horizon, BINS)
+
+
+def _percentiles(hist: np.ndarray, lo: np.ndarray, width: np.ndarray, q: tuple[int, ...]) -> np.ndarray:
+    """Percentiles (len(q) × horizonte) interpolando dentro del bin en el histograma acumulado."""
+    cum = np.cumsum(hist, axis=1)
+    total = cum[:, -1:]
+    out = np.empty((len(q), hist.shape[0]))
+    for i, p in enumerate(q):
+        target = total[:, 0] * p / 100.0
+        b = np.minimum((cum < target[:, None]).sum(axis=1), BINS - 1)
+        rows = np.arange(hist.shape[0])
+        before = np.where(b > 0, cum[rows, np.maximum(b - 1, 0)], 0)
+        frac = np.where(hist[rows, b] > 0, (target - before) / np.maximum(hist[rows, b], 1), 0.5)
+        out[i] = lo + (b + frac) * width
+    return out
+
+
+def simulate(close: np.ndarray, horizon: int = 252, n_paths: int = 20_000, mode: str = "gbm",
+             seed: int = 0, budget_s: float = 3.0, workers: int | None = None,
+             percentiles: tuple[int, ...] = PERCENTILES) -> dict:
+    """
+    Proyección Monte Carlo del precio 'horizon' barras hacia delante.
+      - mode 'gbm': incrementos normales en log-precio (media y σ históricas)
+      - mode 'bootstrap': remuestreo de los log-rendimientos históricos
+    Los caminos se simulan en trozos de CHUNK (memoria acotada) y de cada
+    trozo solo se guarda un histograma por paso; los histogramas se suman y
+    al final se sacan los percentiles. Con varios núcleos los trozos van al
+    pool de procesos. Se para al llegar a n_paths o al agotar budget_s.
+    """
+    close = np.asarray(close, dtype="float64")
+    close = close[~np.isnan(close)]
+    log_rets = np.diff(np.log(close))
+    if len(log_rets) < 2:
+        return {"bands": np.empty((len(percentiles), 0)), "paths": 0, "elapsed_s": 0.0}
+
+    workers = WORKERS if workers is None else workers
+    n_chunks = max(1, -(-n_paths // CHUNK))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)  # reproducible: misma semilla → mismas bandas
+    sizes = [min(CHUNK, n_paths - i * CHUNK) for i in range(n_chunks)]
+
+    t0 = time.perf_counter()
+    hist = np.zeros((horizon, BINS), dtype=np.int64)
+    done = 0
+    if workers <= 1 or n_chunks == 1:
+        for size, s in zip(sizes, seeds):
+            hist += _chunk_hist(log_rets, horizon, size, mode, s)
+            done += size
+            if time.perf_counter() - t0 > budget_s:
+                break
+    else:
+        pool = process_pool()
+        for start in range(0, n_chunks, workers):  # por oleadas para poder cortar por tiempo
+            wave = list(zip(sizes[start:start + workers], seeds[start:start + workers]))
+            futs = [pool.submit(_chunk_hist, log_rets, horizon, size, mode, s) for size, s in wave]
+            for fut, (size, _) in zip(futs, wave):
+                hist += fut.result()
+                done += size
+            if time.perf_counter() - t0 > budget_s:
+                break
+
+    lo, width = _grid(log_rets, horizon)
+    bands = close[-1] * np.exp(_percentiles(hist, lo, width, percentiles))
+    return {"bands": bands, "paths": done, "elapsed_s": time.perf_counter() - t0}
+
+
+def projection_frame(df: pd.DataFrame, horizon: int = 252, n_paths: int = 20_000, mode: str = "gbm",
+                     seed: int = 0, budget_s: float = 3.0, freq: str = "B") -> pd.DataFrame:
+    """Bandas P5…P95 indexadas por fecha futura (arrancan en el último cierre)."""
+    res = simulate(df["Close"].to_numpy(), horizon, n_paths, mode, seed, budget_s)
+    if res["paths"] == 0:
+        return pd.DataFrame()
+    dates = pd.date_range(df.index[-1], periods=horizon + 1, freq=freq)
+    last = float(df["Close"].dropna().iloc[-1])
+    data = {f"P{p}": np.concatenate(([last], band)) for p, band in zip(PERCENTILES, res["bands"])}
+    out = pd.DataFrame(data, index=pd.Index(dates, name="Date"))
+    out.attrs.update({"__paths__": res["paths"], "__elapsed_s__": res["elapsed_s"], "__mode__": mode})
+    return out
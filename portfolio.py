@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+# =========================
+# Estimación
+# =========================
+
+def estimate(returns: pd.DataFrame, periods_per_year: float = 252, shrink: float = 0.1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rentabilidad media y covarianza anualizadas. La covarianza se encoge
+    hacia su diagonal ('shrink' ∈ [0, 1]): con 100+ activos y pocos años la
+    muestral está mal condicionada y el optimizador amplifica su ruido.
+    """
+    x = returns.to_numpy(dtype="float64")
+    mu = x.mean(axis=0) * periods_per_year
+    cov = np.cov(x, rowvar=False) * periods_per_year
+    cov = np.atleast_2d(cov)
+    cov = (1.0 - shrink) * cov + shrink * np.diag(np.diag(cov))
+    return mu, cov
+
+
+# =========================
+# Solver (gradiente proyectado sobre el símplex)
+# =========================
+
+def project_simplex(v: np.ndarray) -> np.ndarray:
+    """Proyección euclídea de cada fila sobre {w ≥ 0, Σw = 1} (Duchi et al., 2008)."""
+    v = np.atleast_2d(v)
+    n = v.shape[1]
+    u = -np.sort(-v, axis=1)
+    css = np.cumsum(u, axis=1) - 1.0
+    ks = np.arange(1, n + 1)
+    rho = (u - css / ks > 0).sum(axis=1)
+    theta = css[np.arange(len(v)), rho - 1] / rho
+    return np.maximum(v - theta[:, None], 0.0)
+
+
+def solve_frontier(mu: np.ndarray, cov: np.ndarray, lambdas: np.ndarray,
+                   iters: int = 1000, tol: float = 1e-8) -> np.ndarray:
+    """
+    Resuelve a la vez, para cada λ, el QP convexo largo-solo
+        min  wᵀΣw − λ·μᵀw   s.a.  w ≥ 0, Σw = 1
+    con gradiente proyectado acelerado (FISTA) en lote: una fila de pesos por λ.
+    λ = 0 es la cartera de mínima varianza; λ grande, la de máxima rentabilidad.
+    """
+    n = len(mu)
+    k = len(lambdas)
+    step = 1.0 / (2.0 * max(np.linalg.eigvalsh(cov)[-1], 1e-12))
+    w = np.full((k, n), 1.0 / n)
+    y, t = w.copy(), 1.0
+    lin = lambdas[:, None] * mu[None, :]
+    for _ in range(iters):
+        grad = 2.0 * y @ cov - lin
+        w_next = project_simplex(y - step * grad)
+        t_next = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        y = w_next + ((t - 1.0) / t_next) * (w_next - w)
+        done = np.abs(w_next - w).max() < tol
+        w, t = w_next, t_next
+        if done:
+            break
+    return w
+
+
+def portfolio_stats(weights: np.ndarray, mu: np.ndarray, cov: np.ndarray, rf: float = 0.0) -> tuple[np.ndarray, ...]:
+    """Rentabilidad, volatilidad y Sharpe de cada fila de pesos (vectorizado)."""
+    weights = np.atleast_2d(weights)
+    ret = weights @ mu
+    vol = np.sqrt(np.maximum(((weights @ cov) * weights).sum(axis=1), 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(vol > 0, (ret - rf) / vol, np.nan)
+    return ret, vol, sharpe
+
+
+def random_portfolios(n_assets: int, n: int = 20_000, seed: int = 0) -> np.ndarray:
+    """Pesos aleatorios uniformes en el símplex (Dirichlet(1)), en lote (n × activos)."""
+    rng = np.random.default_rng(seed)
+    return rng.dirichlet(np.ones(n_assets), size=n)
+
+
+# =========================
+# Optimización completa
+# =========================
+
+def optimize(mu: np.ndarray, cov: np.ndarray, rf: float = 0.0, n_frontier: int = 60,
+             n_random: int = 20_000, seed: int = 0) -> dict:
+    """
+    Mínima varianza, máximo Sharpe y frontera eficiente (largo-solo):
+      - frontera: n_frontier valores de λ resueltos en un solo lote
+      - máximo Sharpe: el mejor punto de la frontera, refinado con una
+        segunda rejilla de λ entre sus vecinos; si ningún punto tiene Sharpe
+        (volatilidad 0 o NaN en toda la frontera) es la de mínima varianza
+      - nube de carteras aleatorias evaluadas en bloque, para el gráfico
+    """
+    scale = 2.0 * float(np.mean(np.diag(cov))) / max(float(np.abs(mu).max()), 1e-12)
+    lambdas = np.concatenate(([0.0], np.logspace(-3, 2, n_frontier - 1) * scale))
+    frontier = solve_frontier(mu, cov, lambdas)
+    f_ret, f_vol, f_sharpe = portfolio_stats(frontier, mu, cov, rf)
+
+    w_sharpe = frontier[0]
+    if np.isfinite(f_sharpe).any():
+        best = int(np.nanargmax(f_sharpe))
+        w_sharpe = frontier[best]
+        lo, hi = lambdas[max(best - 1, 0)], lambdas[min(best + 1, len(lambdas) - 1)]
+        fine = np.linspace(lo, hi, 25)
+        fine_w = solve_frontier(mu, cov, fine)
+        fine_sharpe = portfolio_stats(fine_w, mu, cov, rf)[2]
+        if np.isfinite(fine_sharpe).any() and np.nanmax(fine_sharpe) >= f_sharpe[best]:
+            w_sharpe = fine_w[int(np.nanargmax(fine_sharpe))]
+
+    rand = random_portfolios(len(mu), n_random, seed) if n_random else np.empty((0, len(mu)))
+    r_ret, r_vol, r_sharpe = portfolio_stats(rand, mu, cov, rf) if n_random else (np.array([]),) * 3
+
+    order = np.argsort(f_vol)
+    return {
+        "min_var": frontier[0],
+        "max_sharpe": w_sharpe,
+        "frontier": np.column_stack([f_ret[order], f_vol[order], f_sharpe[order]]),
+        "random": np.column_stack([r_ret, r_vol, r_sharpe]),
+    }
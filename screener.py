@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import io
+import re
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+CALENDAR_DAYS = 365  # cripto: cotiza también en fin de semana
+
+# Columnas del resultado (en este orden)
+COLUMNS = ["Último", "RSI", "Volatilidad", "Momentum", "Dist. SMA", "Drawdown", "Máx. drawdown", "Barras"]
+
+
+# =========================
+# Panel N tickers
+# =========================
+
+def build_panel(frames: dict[str, pd.DataFrame], column: str = "Close") -> tuple[np.ndarray, list[str]]:
+    """
+    Apila los cierres de N tickers en un array (barras × tickers) alineado por
+    la ÚLTIMA barra de cada uno: la fila -1 es el último cierre de todos.
+    Así acciones y cripto (calendarios distintos) no necesitan rellenar huecos
+    y las métricas "a hoy" usan exactamente las últimas k barras de cada serie.
+    Las series más cortas quedan con NaN por arriba.
+    """
+    tickers, series = [], []
+    for tk, df in frames.items():
+        if df is None or df.empty or column not in df:
+            continue
+        values = df[column].to_numpy(dtype="float64")
+        values = values[~np.isnan(values)]
+        if len(values):
+            tickers.append(tk)
+            series.append(values)
+    if not series:
+        return np.empty((0, 0)), []
+    length = max(len(v) for v in series)
+    panel = np.full((length, len(series)), np.nan)
+    for j, v in enumerate(series):
+        panel[length - len(v):, j] = v
+    return panel, tickers
+
+
+def periods_per_year(index: pd.Index) -> int:
+    """Barras por año de una serie diaria: 365 si tiene barras en fin de semana (cripto), si no 252."""
+    if isinstance(index, pd.DatetimeIndex) and (index.dayofweek >= 5).any():
+        return CALENDAR_DAYS
+    return TRADING_DAYS
+
+
+# =========================
+# Métricas vectorizadas
+# =========================
+
+def _tail_mean(x: np.ndarray, k: int) -> np.ndarray:
+    """Media de las últimas k filas por columna; NaN si la columna no tiene k valores."""
+    if len(x) < k:
+        return np.full(x.shape[1], np.nan)
+    return x[-k:].sum(axis=0) / k
+
+
+def screen(panel: np.ndarray, tickers: list[str], rsi_window: int = 14, sma_window: int = 50,
+           vol_window: int = 21, momentum_window: int = 126,
+           periods_per_year: np.ndarray | float = TRADING_DAYS) -> pd.DataFrame:
+    """
+    Métricas de todos los tickers a la vez, por columnas del panel:
+      - RSI(rsi_window) con medias simples, como finance.technicals
+      - volatilidad anualizada de los últimos vol_window rendimientos, con
+        las barras por año de cada ticker ('periods_per_year', uno por
+        columna o uno para todos; ver periods_per_year())
+      - momentum: rentabilidad de las últimas momentum_window barras
+      - distancia al SMA(sma_window) y drawdown desde el máximo del periodo
+      - máximo drawdown del periodo
+    """
+    if panel.size == 0:
+        return pd.DataFrame(columns=COLUMNS)
+    last = panel[-1]
+
+    delta = np.diff(panel[-(rsi_window + 1):], axis=0)
+    up = _tail_mean(np.maximum(delta, 0.0), rsi_window)
+    down = _tail_mean(np.maximum(-delta, 0.0), rsi_window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(down > 0, 100.0 - 100.0 / (1.0 + up / down), np.nan)
+
+        rets = panel[-(vol_window + 1):][1:] / panel[-(vol_window + 1):][:-1] - 1.0
+        vol = rets.std(axis=0, ddof=1) * np.sqrt(periods_per_year) if len(rets) == vol_window else np.full(len(last), np.nan)
+
+        base = panel[-(momentum_window + 1)] if len(panel) > momentum_window else np.full(len(last), np.nan)
+        momentum = last / base - 1.0
+
+        dist_sma = last / _tail_mean(panel, sma_window) - 1.0
+
+        peak = np.fmax.accumulate(panel, axis=0)  # fmax ignora los NaN iniciales
+        dd = panel / peak - 1.0
+    drawdown = dd[-1]
+    max_dd = np.nanmin(dd, axis=0)
+
+    out = pd.DataFrame({
+        "Último": last,
+        "RSI": rsi,
+        "Volatilidad": vol,
+        "Momentum": momentum,
+        "Dist. SMA": dist_sma,
+        "Drawdown": drawdown,
+        "Máx. drawdown": max_dd,
+        "Barras": (~np.isnan(panel)).sum(axis=0),
+    }, index=pd.Index(tickers, name="Ticker"))
+    return out
+
+
+def apply_filters(table: pd.DataFrame, rsi_range: tuple[float, float] | None = None,
+                  min_momentum: float | None = None, max_volatility: float | None = None,
+                  sort_by: str = "Momentum", ascending: bool = False) -> pd.DataFrame:
+    """Filtra y ordena la tabla de screen() (los NaN no pasan los filtros activos)."""
+    mask = np.ones(len(table), dtype=bool)
+    if rsi_range is not None:
+        mask &= table["RSI"].between(*rsi_range).to_numpy()
+    if min_momentum is not None:
+        mask &= (table["Momentum"] >= min_momentum).to_numpy()
+    if max_volatility is not None:
+        mask &= (table["Volatilidad"] <= max_volatility).to_numpy()
+    return table[mask].sort_values(sort_by, ascending=ascending, na_position="last")
+
+
+# =========================
+# Universo desde fichero
+# =========================
+
+def parse_universe(data: bytes) -> list[str]:
+    """
+    Tickers de un CSV/TXT subido: columna 'ticker'/'symbol' si la hay; si no,
+    cualquier token separado por comas, espacios o saltos de línea.
+    """
+    text = data.decode("utf-8-sig", errors="ignore")
+    try:
+        df = pd.read_csv(io.StringIO(text))
+        cols = {c.strip().lower(): c for c in df.columns}
+        for name in ("ticker", "symbol", "tickers", "symbols"):
+            if name in cols:
+                raw = df[cols[name]].dropna().astype(str).tolist()
+                break
+        else:
+            raw = re.split(r"[\s,;]+", text)
+    except Exception:
+        raw = re.split(r"[\s,;]+", text)
+    tickers = [t.strip().upper() for t in raw if re.fullmatch(r"[A-Za-z0-9.\-^=]{1,15}", t.strip())]
+    return list(dict.fromkeys(tickers))
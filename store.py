@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import os
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src import lazy
+
+# Parquet vía pyarrow (opcional: sin motor el almacén queda desactivado).
+# No se importa aquí: pandas lo carga en la primera lectura/escritura.
+_HAS_PARQUET = lazy.available("pyarrow")
+
+STORE_DIR = os.environ.get(
+    "FINANCE_DASHBOARD_STORE", os.path.expanduser("~/.finance-dashboard/store")
+)
+FRESH_S = 300  # si el fichero se escribió hace menos de esto, no se pide cola
+# Diferencia relativa en cierres ya consolidados que delata un reajuste (split/dividendo)
+ADJUST_RTOL = 1e-4
+
+
+def _path(ticker: str, source: str, interval: str) -> str:
+    safe = ticker.upper().strip().replace("/", "_").replace(os.sep, "_")
+    return os.path.join(STORE_DIR, source, interval, f"{safe}.parquet")
+
+
+def enabled() -> bool:
+    return _HAS_PARQUET and bool(STORE_DIR)
+
+
+def load(ticker: str, source: str, interval: str) -> pd.DataFrame:
+    """Lee el histórico guardado (OHLCV) o DF vacío si no existe / no se puede leer."""
+    if not enabled():
+        return pd.DataFrame()
+    path = _path(ticker, source, interval)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    try:
+        df = pd.read_parquet(path)
+        df.attrs["__stored_at__"] = os.path.getmtime(path)
+        return df
+    except Exception:
+        return pd.DataFrame()
+
+
+def is_fresh(df: pd.DataFrame) -> bool:
+    stored_at = getattr(df, "attrs", {}).get("__stored_at__")
+    return stored_at is not None and (time.time() - stored_at) < FRESH_S
+
+
+def save(ticker: str, source: str, interval: str, df: pd.DataFrame, full: bool = False) -> None:
+    """
+    Escribe de forma atómica (fichero temporal + os.replace) para que otro
+    proceso nunca lea un parquet a medias. 'full' marca que cubre period='max'.
+    """
+    if not enabled() or df is None or df.empty:
+        return
+    path = _path(ticker, source, interval)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        out = df.drop(columns=["Return"], errors="ignore").copy()
+        out.attrs = {"__full__": bool(full)}
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            out.to_parquet(tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    except Exception:
+        pass
+
+
+def merge(stored: pd.DataFrame, tail: pd.DataFrame) -> pd.DataFrame:
+    """Une histórico + cola nueva; en solapes manda la cola (la última barra puede venir corregida)."""
+    if tail is None or tail.empty:
+        return stored
+    if stored is None or stored.empty:
+        return tail
+    cols = [c for c in stored.columns if c in tail.columns]
+    out = pd.concat([stored[cols], tail[cols]])
+    out = out[~out.index.duplicated(keep="last")].sort_index()
+    out.attrs = dict(stored.attrs)
+    return out
+
+
+def tail_start(stored: pd.DataFrame) -> pd.Timestamp:
+    """
+    Desde dónde pedir la cola: la penúltima barra guardada, para que el solape
+    incluya al menos una barra cerrada con la que comprobar el ajuste
+    (la última podía estar a medias).
+    """
+    return stored.index[-2] if len(stored) > 1 else stored.index[-1]
+
+
+def restated(stored: pd.DataFrame, tail: pd.DataFrame, rtol: float = ADJUST_RTOL) -> bool:
+    """
+    ¿La cola viene ajustada de otra forma que lo guardado? Con auto_adjust un
+    split o un dividendo reescala todo el histórico, así que pegar la cola
+    nueva sobre las barras viejas daría un salto falso. Compara el cierre de
+    las barras solapadas (sin la última guardada si hay más).
+    """
+    if stored is None or stored.empty or tail is None or tail.empty \
+            or "Close" not in stored.columns or "Close" not in tail.columns:
+        return False
+    common = stored.index.intersection(tail.index)
+    if len(common) > 1:
+        common = common[common != stored.index[-1]]
+    if not len(common):
+        return False
+    old = stored.loc[common, "Close"].to_numpy(dtype="float64")
+    new = tail.loc[common, "Close"].to_numpy(dtype="float64")
+    ok = np.isfinite(old) & np.isfinite(new) & (old != 0)
+    return bool(np.any(np.abs(new[ok] / old[ok] - 1.0) > rtol))
+
+
+def covers(stored: pd.DataFrame, start: pd.Timestamp | None, slack_days: int = 10) -> bool:
+    """True si lo guardado alcanza el inicio pedido (start=None ⇒ 'max')."""
+    if stored is None or stored.empty:
+        return False
+    if start is None:
+        return bool(stored.attrs.get("__full__"))
+    if stored.attrs.get("__full__"):
+        return True
+    return stored.index[0] <= start + pd.Timedelta(days=slack_days)
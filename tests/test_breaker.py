@@ -0,0 +1,106 @@
+"""
+Circuit breaker por fuente (finance._CircuitBreaker / _guarded): solo las
+excepciones y los timeouts cuentan como fallo, no las respuestas vacías.
+"""
+import concurrent.futures as cf
+
+import pandas as pd
+import pytest
+
+from src import finance
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    fresh = {"yahoo": finance._CircuitBreaker("yahoo"), "stooq": finance._CircuitBreaker("stooq")}
+    monkeypatch.setattr(finance, "_BREAKERS", fresh)
+    return fresh
+
+
+def _fail(exc):
+    def call():
+        raise exc
+    return call
+
+
+def test_empty_results_do_not_open_the_breaker(breakers):
+    for i in range(20):  # tickers mal escritos o deslistados, de cualquier sesión
+        assert finance._guarded("yahoo", f"TYPO{i}", lambda: pd.DataFrame(), pd.DataFrame()).empty
+    assert breakers["yahoo"].snapshot()["state"] == "closed"
+    assert breakers["yahoo"].snapshot()["recent_failures"] == 0
+
+
+@pytest.mark.parametrize("exc", [ConnectionError("dns"), cf.TimeoutError()])
+def test_exceptions_and_timeouts_open_the_breaker(breakers, exc):
+    for i in range(5):
+        assert finance._guarded("yahoo", f"T{i}", _fail(exc), "vacío") == "vacío"
+    assert breakers["yahoo"].snapshot()["state"] == "open"
+
+    called = []
+    assert finance._guarded("yahoo", "AAPL", lambda: called.append(1), "vacío") == "vacío"
+    assert not called  # abierto: no se toca la red
+
+
+def test_one_bad_ticker_alone_does_not_open_the_breaker(breakers):
+    for _ in range(10):
+        finance._guarded("yahoo", "SAME", _fail(ConnectionError()), None)
+    assert breakers["yahoo"].snapshot()["state"] == "closed"
+
+
+def test_success_closes_after_half_open(breakers, monkeypatch):
+    br = breakers["yahoo"]
+    for i in range(5):
+        finance._guarded("yahoo", f"T{i}", _fail(ConnectionError()), None)
+    monkeypatch.setattr(br, "cooldown_s", 0.0)
+    assert finance._guarded("yahoo", "AAPL", lambda: pd.DataFrame({"Close": [1.0]}), None) is not None
+    assert br.snapshot()["state"] == "closed"
+
+
+def test_fetch_counts_a_missing_ticker_as_an_answer(breakers, monkeypatch):
+    monkeypatch.setattr(finance, "_yahoo_download", lambda *a, **k: pd.DataFrame())
+    for i in range(10):
+        assert finance._fetch("yahoo", f"NOPE{i}").empty
+    assert breakers["yahoo"].snapshot()["state"] == "closed"
+
+    monkeypatch.setattr(finance, "_yahoo_download", lambda *a, **k: (_ for _ in ()).throw(ConnectionError()))
+    for i in range(5):
+        assert finance._fetch("yahoo", f"T{i}").empty
+    assert breakers["yahoo"].snapshot()["state"] == "open"
+
+
+def test_yahoo_history_tells_missing_from_unreachable(monkeypatch):
+    ex = pytest.importorskip("yfinance.exceptions")
+
+    class FakeTicker:
+        def __init__(self, exc):
+            self.exc = exc
+
+        def history(self, **kwargs):
+            assert kwargs.get("raise_errors") is True
+            raise self.exc
+
+    monkeypatch.setattr(finance, "get_ticker", lambda tk: FakeTicker(ex.YFPricesMissingError(tk, "")))
+    assert finance._yahoo_history("NOPE", period="5d").empty
+
+    monkeypatch.setattr(finance, "get_ticker", lambda tk: FakeTicker(ConnectionError("dns")))
+    with pytest.raises(ConnectionError):
+        finance._yahoo_history("AAPL", period="5d")
+
+    # Sin zona horaria: yfinance lo da igual si el ticker no existe que si no hay red
+    monkeypatch.setattr(finance, "get_ticker", lambda tk: FakeTicker(ex.YFTzMissingError(tk)))
+    monkeypatch.setattr(finance, "_yahoo_probe", lambda tk: None)
+    assert finance._yahoo_history("NOPE", period="5d").empty
+
+    monkeypatch.setattr(finance, "_yahoo_probe", lambda tk: (_ for _ in ()).throw(ConnectionError("dns")))
+    with pytest.raises(ConnectionError):
+        finance._yahoo_history("AAPL", period="5d")
+
+
+def test_empty_answer_leaves_half_open_untouched(breakers, monkeypatch):
+    br = breakers["yahoo"]
+    for i in range(5):
+        finance._guarded("yahoo", f"T{i}", _fail(ConnectionError()), None)
+    monkeypatch.setattr(br, "cooldown_s", 0.0)
+    finance._guarded("yahoo", "NOPE", lambda: pd.DataFrame(), None)
+    assert br.snapshot()["state"] == "half_open"
+    assert br.allow()  # la prueba vacía libera el hueco para la siguiente
@@ -0,0 +1,81 @@
+"""
+Caché acotada en bytes (src/cache.py: ByteLRU, memoize con store) y la
+forma compacta de las diarias en finance (_compact/_widen).
+"""
+import numpy as np
+import pandas as pd
+
+from src import finance
+from src.bench import _synthetic_daily
+from src.cache import ByteLRU, memoize, nbytes
+
+
+def _frame(n: int = 100) -> pd.DataFrame:
+    return pd.DataFrame({"x": np.arange(n, dtype="float64")})
+
+
+def test_bytelru_evicts_least_recently_used():
+    size = nbytes(_frame())
+    lru = ByteLRU(3 * size)
+    for k in "abc":
+        lru.put(k, _frame())
+    assert lru.get("a") is not None  # 'a' pasa a ser la más reciente
+    lru.put("d", _frame())
+    assert lru.get("b") is None
+    assert all(lru.get(k) is not None for k in "acd")
+    assert lru.stats()["evictions"] == 1
+    assert lru.stats()["bytes"] <= lru.budget
+
+
+def test_bytelru_skips_oversized_and_expires(monkeypatch):
+    lru = ByteLRU(nbytes(_frame()) // 2)
+    lru.put("big", _frame())
+    assert lru.get("big") is None and lru.stats()["entries"] == 0
+
+    lru = ByteLRU(10 * nbytes(_frame()), ttl_s=60)
+    lru.put(("g", 1), _frame(), ttl_s=0.0)  # 0 = sin caducidad
+    lru.put(("g", 2), _frame(), ttl_s=-1.0)
+    assert lru.get(("g", 1)) is not None and lru.get(("g", 2)) is None
+    assert lru.groups() == {"g": {"entries": 1, "bytes": nbytes(_frame())}}
+
+
+def test_memoize_with_store_serves_copies():
+    lru = ByteLRU(1 << 20)
+    calls = []
+
+    @memoize(ttl=60, store=lru, unpack=finance._fresh)
+    def frames(n):
+        calls.append(n)
+        return {"a": _frame(n)}
+
+    first = frames(5)
+    first["a"].iloc[0, 0] = -1.0  # quien llama puede modificar lo que recibe
+    second = frames(5)
+    assert calls == [5]
+    assert second["a"].iloc[0, 0] == 0.0
+
+
+def test_compact_widen_round_trip():
+    df = _synthetic_daily(3)[["Open", "High", "Low", "Close", "Volume"]]
+    df.loc[df.index[0], "Close"] = 123.45
+    df["Volume"] = df["Volume"].round() + 2 ** 30  # >2^24: float32 perdería unidades
+
+    small = finance._compact(df)
+    assert (small[["Open", "High", "Low", "Close"]].dtypes == "float32").all()
+    assert small["Volume"].dtype == df["Volume"].dtype
+
+    back = finance._widen(small)
+    assert (back.dtypes == "float64").all()
+    assert back["Close"].iloc[0] == 123.45  # redondeado a lo que guarda un float32
+    np.testing.assert_allclose(back[["Open", "High", "Low", "Close"]], df[["Open", "High", "Low", "Close"]],
+                               rtol=1e-6)
+    np.testing.assert_array_equal(back["Volume"], df["Volume"])
+
+
+def test_compact_keeps_large_integer_columns():
+    df = pd.DataFrame({"Close": [1.5, 2.5], "Shares": [2.0 ** 25 + 1, 2.0 ** 26 + 3],
+                       "Count": np.array([1, 2], dtype="int64")})
+    small = finance._compact(df, None)
+    assert small["Close"].dtype == "float32"
+    assert small["Shares"].dtype == "float64" and small["Count"].dtype == "int64"
+    np.testing.assert_array_equal(finance._widen(small)["Shares"], df["Shares"])
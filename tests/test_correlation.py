@@ -0,0 +1,46 @@
+"""
+Comparativa (finance.correlation_stats): los tickers en modo demo o sin
+datos no entran en las correlaciones, con un proveedor falso.
+"""
+import pandas as pd
+import pytest
+
+from src import finance
+from src.bench import _synthetic_daily
+
+
+def _daily(ticker: str, demo: bool = False) -> pd.DataFrame:
+    df = _synthetic_daily(3, ticker)[["Open", "High", "Low", "Close", "Volume"]]
+    df.attrs = {"__demo__": True} if demo else {}
+    return df
+
+
+@pytest.fixture
+def frames(monkeypatch):
+    data = {"AAA": _daily("AAA"), "BBB": _daily("BBB"), "SPY": _daily("SPY"),
+            "DEMO": _daily("DEMO", demo=True), "NONE": pd.DataFrame()}
+    monkeypatch.setattr(finance, "price_history_many",
+                        lambda names, **kw: {tk: data.get(tk, pd.DataFrame()) for tk in names})
+    finance.correlation_stats.clear()
+    yield data
+    finance.correlation_stats.clear()
+
+
+def test_demo_and_empty_tickers_are_left_out(frames):
+    stats = finance.correlation_stats(("AAA", "BBB", "DEMO", "NONE"), benchmark="SPY")
+    assert stats["message"] == ""
+    assert list(stats["matrix"].columns) == ["AAA", "BBB", "SPY"]
+    assert list(stats["corr"].columns) == ["BBB", "SPY"]
+    assert list(stats["betas"].index) == ["AAA", "BBB"]
+    # una ventana móvil por cada fecha común de los reales
+    assert len(stats["corr"]) == len(frames["AAA"]) - 63
+
+
+@pytest.mark.parametrize("tickers, benchmark, missing", [
+    (("DEMO", "AAA"), "SPY", "DEMO"),
+    (("AAA", "BBB"), "NONE", "NONE"),
+])
+def test_missing_reference_returns_empty_with_message(frames, tickers, benchmark, missing):
+    stats = finance.correlation_stats(tickers, benchmark=benchmark)
+    assert all(stats[k].empty for k in ("matrix", "corr", "beta", "betas"))
+    assert missing in stats["message"]
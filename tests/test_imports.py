@@ -0,0 +1,32 @@
+"""
+Importaciones al cargar: el núcleo no trae la UI ni los paquetes pesados de
+src.lazy.HEAVY, y app.py no arrastra ninguno de estos por su cuenta. Se mira
+sys.modules en un proceso nuevo; el tiempo en frío no se comprueba aquí (varía
+con la máquina), lo mide `python -m src.bench imports`.
+
+    python -m pytest src/tests     # desde la carpeta que contiene src/
+"""
+from src.bench import APP_IMPORTS, BASELINE_IMPORTS, _loaded
+from src.lazy import HEAVY
+
+# El núcleo se usa desde scripts, cron y notebooks sin Streamlit (ver README)
+CORE_IMPORTS = ("src.finance", "src.cache", "src.indicators")
+CORE_BASELINE = ("numpy", "pandas")  # pandas ya importa pyarrow si está instalado
+UI_MODULES = ("streamlit", "plotly")
+
+
+def _dragged(modules: tuple[str, ...], baseline: tuple[str, ...], watched: tuple[str, ...]) -> list[str]:
+    """De 'watched', los que carga importar 'modules' y no trae ya 'baseline'."""
+    loaded = _loaded(modules)[1]
+    base = _loaded(baseline)[1]
+    return [m for m in watched if m in loaded and m not in base]
+
+
+def test_core_loads_no_ui_or_heavy_modules():
+    dragged = _dragged(CORE_IMPORTS, CORE_BASELINE, (*HEAVY, *UI_MODULES))
+    assert not dragged, f"{', '.join(CORE_IMPORTS)} importan al cargar: {dragged} (ver src/lazy.py)"
+
+
+def test_app_loads_no_heavy_modules():
+    dragged = _dragged(APP_IMPORTS, BASELINE_IMPORTS, HEAVY)
+    assert not dragged, f"app.py importa al cargar: {dragged} (ver src/lazy.py)"
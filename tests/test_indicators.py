@@ -0,0 +1,89 @@
+"""
+Indicadores incrementales (src/indicators.py: IndicatorEngine) y kernel
+vectorizado (indicator_kernel) frente a la versión de referencia con pandas,
+finance._technicals_batch.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import finance
+from src.bench import _synthetic_daily
+from src.indicators import COLUMNS, IndicatorEngine, indicator_kernel, kernel_technicals
+
+
+def _prices(years: int = 2) -> pd.DataFrame:
+    df = _synthetic_daily(years)[["Open", "High", "Low", "Close", "Volume"]]
+    df.attrs = {}
+    return df
+
+
+def _flat(df: pd.DataFrame, start: int = 100, bars: int = 60) -> pd.DataFrame:
+    """Tramo plano (suspensión de cotización): RSI 0/0 y desviación cero."""
+    df = df.copy()
+    df.iloc[start:start + bars, df.columns.get_loc("Close")] = df["Close"].iloc[start]
+    return df
+
+
+def assert_matches_batch(got: pd.DataFrame, df: pd.DataFrame, rtol: float = 1e-8) -> None:
+    # rtol: pandas rolling().std() deja ~1e-7 de residuo en una ventana plana
+    ref = finance._technicals_batch(df)
+    pd.testing.assert_index_equal(got.index, ref.index)
+    for col in COLUMNS:
+        np.testing.assert_allclose(got[col].to_numpy(), ref[col].to_numpy(), rtol=rtol, atol=1e-9,
+                                   equal_nan=True, err_msg=col)
+
+
+def test_engine_matches_batch_on_repeated_appends():
+    df = _prices()
+    eng = IndicatorEngine()
+    for end in (30, 31, 120, 121, 122, 300, len(df)):  # barras de una en una y a trozos
+        assert_matches_batch(eng.technicals("K", df.iloc[:end]), df.iloc[:end])
+    assert eng._tracks["K"].n == len(df)  # nunca se reconstruyó
+
+
+def test_engine_recomputes_a_corrected_last_bar():
+    df = _prices()
+    eng = IndicatorEngine()
+    eng.technicals("K", df.iloc[:200])
+
+    fixed = df.iloc[:200].copy()
+    fixed.iloc[-1, fixed.columns.get_loc("Close")] *= 1.02  # Yahoo corrige la barra del día
+    assert_matches_batch(eng.technicals("K", fixed), fixed)
+
+    grown = pd.concat([fixed, df.iloc[200:205]])
+    assert_matches_batch(eng.technicals("K", grown), grown)
+    assert eng._tracks["K"].n == 205
+
+
+@pytest.mark.parametrize("start", [0, 100])
+def test_engine_matches_batch_on_flat_segment(start):
+    df = _flat(_prices(), start=start)
+    eng = IndicatorEngine()
+    eng.technicals("K", df.iloc[:start + 30])  # el tramo plano llega a medias
+    got = eng.technicals("K", df)
+    assert_matches_batch(got, df)
+
+    inside = df.index[start + 40]  # ventana de 20 y de 14 enteras dentro del tramo
+    assert got.loc[inside, "BB_Mid"] == got.loc[inside, "Close"]
+    assert got.loc[inside, "BB_Up"] == got.loc[inside, "BB_Lo"] == got.loc[inside, "Close"]
+    assert np.isnan(got.loc[inside, "RSI14"])
+
+
+@pytest.mark.parametrize("make", [_prices, lambda: _flat(_prices()), lambda: _prices(40)])
+def test_kernel_matches_batch(make):
+    df = make()
+    assert_matches_batch(kernel_technicals(df), df)  # mismos nombres de columna que technicals
+
+
+def test_kernel_bollinger_after_a_crash():
+    # De ~10 000 a ~1: con una sola cumsum de cuadrados la desviación de las
+    # ventanas bajas se quedaba en el ruido de la resta (0,5 % de error)
+    rng = np.random.default_rng(0)
+    close = np.concatenate([1e4 * np.exp(np.cumsum(rng.normal(0, 0.01, 1500))),
+                            np.exp(np.cumsum(rng.normal(0, 0.01, 500)))])
+    out = indicator_kernel(close, sma=(), ema=(), bb=(20, 2.0), rsi=())
+    win = np.lib.stride_tricks.sliding_window_view(close, 20)
+    exact = win.std(axis=1, ddof=1)
+    np.testing.assert_allclose((out["BB_Up"] - out["BB_Mid"])[19:] / 2, exact, rtol=1e-8)
+    np.testing.assert_allclose(out["BB_Mid"][19:], win.mean(axis=1), rtol=1e-10)
@@ -0,0 +1,23 @@
+"""
+Optimización de cartera (src/portfolio.py: optimize).
+"""
+import numpy as np
+
+from src.portfolio import optimize, portfolio_stats
+
+
+def test_max_sharpe_beats_min_variance():
+    mu = np.array([0.12, 0.06, 0.09])
+    cov = np.array([[0.09, 0.01, 0.02], [0.01, 0.01, 0.0], [0.02, 0.0, 0.04]])
+    res = optimize(mu, cov, rf=0.02, n_random=1000)
+    assert np.isclose(res["max_sharpe"].sum(), 1.0) and (res["max_sharpe"] >= -1e-12).all()
+    sharpe = portfolio_stats(np.vstack([res["min_var"], res["max_sharpe"]]), mu, cov, 0.02)[2]
+    assert sharpe[1] >= sharpe[0]
+    assert sharpe[1] >= np.nanmax(res["random"][:, 2]) - 1e-6
+
+
+def test_no_finite_sharpe_falls_back_to_min_variance():
+    # Precios planos: volatilidad 0 en toda la frontera, Sharpe NaN en todos los puntos
+    mu, cov = np.zeros(3), np.zeros((3, 3))
+    res = optimize(mu, cov, n_random=100)
+    np.testing.assert_array_equal(res["max_sharpe"], res["min_var"])
@@ -0,0 +1,31 @@
+"""
+Screener (src/screener.py): volatilidad anualizada con las barras por año
+de cada ticker.
+"""
+import numpy as np
+import pandas as pd
+
+from src.screener import CALENDAR_DAYS, TRADING_DAYS, build_panel, periods_per_year, screen
+
+
+def _closes(index: pd.DatetimeIndex) -> pd.DataFrame:
+    rets = np.random.default_rng(0).normal(0, 0.02, len(index))
+    return pd.DataFrame({"Close": 100 * np.cumprod(1 + rets)}, index=index)
+
+
+def test_periods_per_year_from_calendar():
+    assert periods_per_year(pd.bdate_range("2024-01-01", periods=300)) == TRADING_DAYS
+    assert periods_per_year(pd.date_range("2024-01-01", periods=300)) == CALENDAR_DAYS
+    assert periods_per_year(pd.RangeIndex(300)) == TRADING_DAYS
+
+
+def test_volatility_annualised_per_ticker():
+    stock = _closes(pd.bdate_range("2024-01-01", periods=300))
+    crypto = stock.set_axis(pd.date_range("2024-01-01", periods=300))  # mismos rendimientos, otro calendario
+    frames = {"AAPL": stock, "BTC-USD": crypto}
+    panel, names = build_panel(frames)
+    per_year = np.array([periods_per_year(frames[tk].index) for tk in names], dtype="float64")
+
+    vol = screen(panel, names, periods_per_year=per_year)["Volatilidad"]
+    assert np.isclose(vol["BTC-USD"] / vol["AAPL"], np.sqrt(CALENDAR_DAYS / TRADING_DAYS))
+    assert np.isclose(screen(panel, names)["Volatilidad"]["BTC-USD"], vol["AAPL"])  # por defecto, 252
@@ -0,0 +1,89 @@
+"""
+Almacén local de series (src/store.py) y descarga de colas en
+finance._stored_fetch, con un proveedor falso en lugar de Yahoo/Stooq.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import finance, store
+from src.bench import _synthetic_daily
+
+OHLC = ["Open", "High", "Low", "Close"]
+
+
+def _daily(years: int = 3) -> pd.DataFrame:
+    df = _synthetic_daily(years)[OHLC + ["Volume"]]
+    df.attrs = {}
+    return df
+
+
+class FakeProvider:
+    """Sustituye a finance._fetch: sirve 'full' entero o desde 'start'."""
+
+    def __init__(self, full: pd.DataFrame):
+        self.full = full
+        self.calls: list = []
+
+    def __call__(self, source, ticker, start=None, on_late=None):
+        self.calls.append(start)
+        return self.full if start is None else self.full.loc[self.full.index >= start]
+
+
+@pytest.fixture
+def tmp_store(tmp_path, monkeypatch):
+    if not store.enabled():
+        pytest.skip("sin pyarrow no hay almacén en disco")
+    monkeypatch.setattr(store, "STORE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_merge_tail_wins_on_overlap():
+    full = _daily()
+    stored = full.iloc[:-5].copy()
+    stored.iloc[-1, stored.columns.get_loc("Close")] *= 1.01  # última barra a medias
+    out = store.merge(stored, full.iloc[-6:])
+    pd.testing.assert_frame_equal(out, full, check_freq=False)
+
+
+def test_restated_detects_split_but_not_a_moving_last_bar():
+    full = _daily()
+    stored = full.iloc[:-5].copy()
+    tail = full.loc[full.index >= store.tail_start(stored)].copy()
+    assert not store.restated(stored, tail)
+
+    moved = tail.copy()
+    moved.loc[stored.index[-1], "Close"] *= 1.03  # la última guardada puede cambiar
+    assert not store.restated(stored, moved)
+
+    split = tail.copy()
+    split[OHLC] = split[OHLC] / 4
+    assert store.restated(stored, split)
+
+
+def test_stored_fetch_appends_only_the_tail(tmp_store, monkeypatch):
+    full = _daily()
+    store.save("FAKE", "yahoo", "1d", full.iloc[:-5], full=True)
+    fake = FakeProvider(full)
+    monkeypatch.setattr(finance, "_fetch", fake)
+
+    out = finance._stored_fetch("yahoo", "FAKE", revalidate=True)
+    assert fake.calls == [full.index[-7]]  # penúltima guardada: una sola petición de cola
+    pd.testing.assert_frame_equal(out[OHLC], full[OHLC], check_freq=False)
+
+
+def test_stored_fetch_refetches_after_split(tmp_store, monkeypatch):
+    old = _daily()
+    store.save("FAKE", "yahoo", "1d", old.iloc[:-5], full=True)
+
+    # Split 4:1 en las barras nuevas: el proveedor ya devuelve todo reajustado
+    adjusted = old.copy()
+    adjusted[OHLC] = adjusted[OHLC] / 4
+    fake = FakeProvider(adjusted)
+    monkeypatch.setattr(finance, "_fetch", fake)
+
+    out = finance._stored_fetch("yahoo", "FAKE", revalidate=True)
+    assert fake.calls[-1] is None  # se pidió el histórico entero
+    pd.testing.assert_frame_equal(out[OHLC], adjusted[OHLC], check_freq=False)
+    assert np.nanmax(np.abs(out["Close"].pct_change().to_numpy())) < 0.2  # sin salto falso del −75 %
+    pd.testing.assert_frame_equal(store.load("FAKE", "yahoo", "1d")[OHLC], adjusted[OHLC], check_freq=False)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src import lazy
+
+# yfinance ≥0.2.55 exige sesiones curl_cffi; con versiones anteriores vale requests.
+# Se importa al crear la primera sesión de Yahoo, no al arrancar.
+_CFFI_MODULE = "curl_cffi.requests"
+
+
+# =========================
+# Limitador (token bucket)
+# =========================
+
+class TokenBucket:
+    """'rate' peticiones/segundo sostenidas con ráfagas de hasta 'burst'."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# =========================
+# Proveedores
+# =========================
+
+class Provider:
+    """
+    Transporte de un proveedor: una sesión keep-alive compartida, un máximo de
+    peticiones simultáneas, token bucket y reintentos con backoff exponencial
+    con jitter ("full jitter": espera aleatoria en [0, base·2^intento]).
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, concurrency: int,
+                 retries: int = 2, backoff_s: float = 0.3, backoff_max_s: float = 4.0,
+                 impersonate: bool = False):
+        self.name = name
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+        self.concurrency = concurrency
+        self.impersonate = impersonate
+        self._bucket = TokenBucket(rate, burst)
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def session(self):
+        """Sesión única por proveedor (yfinance guarda cookie/crumb ligados a ella)."""
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._new_session()
+            return self._session
+
+    def _new_session(self):
+        cffi = lazy.module(_CFFI_MODULE) if self.impersonate else None
+        if cffi is not None:
+            return cffi.Session(impersonate="chrome")
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.concurrency)
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        return s
+
+    @contextmanager
+    def slot(self):
+        """Ocupa un hueco de concurrencia y un token antes de tocar la red."""
+        with self._slots:
+            self._bucket.acquire()
+            yield
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_s * (2 ** attempt)))
+
+    def call(self, fn, *args, **kwargs):
+        """Ejecuta fn respetando límites; reintenta si lanza excepción y relanza la última."""
+        for attempt in range(self.retries + 1):
+            try:
+                with self.slot():
+                    return fn(*args, **kwargs)
+            except Exception:
+                if attempt >= self.retries:
+                    raise
+            time.sleep(self.backoff(attempt))
+
+
+PROVIDERS: dict[str, Provider] = {
+    "yahoo": Provider("yahoo", rate=4.0, burst=8, concurrency=6, impersonate=True),
+    "stooq": Provider("stooq", rate=2.0, burst=4, concurrency=3),
+}
+
+
+def session(provider: str):
+    return PROVIDERS[provider].session()
+
+
+def call(provider: str, fn, *args, **kwargs):
+    return PROVIDERS[provider].call(fn, *args, **kwargs)
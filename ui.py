@@ -28,4 +28,24 @@ def metric_card(title: str, value: str):
             <div class="metric-title">{title}</div>
             <div class="metric-value">{value}</div>
         </div>
-    ''', unsafe_allow_html=True)
\ No newline at end of file
+    ''', unsafe_allow_html=True)
+
+def deferred_download(label: str, render, file_name: str, mime: str, key: str) -> None:
+    """
+    Botón de descarga cuyo contenido se genera al pulsarlo ('render' sin
+    argumentos devuelve los bytes), no en cada rerun. Si esta versión de
+    Streamlit no admite datos diferidos, se pide en dos pasos: preparar y descargar.
+    """
+    try:
+        st.download_button(label, data=render, file_name=file_name, mime=mime, key=key, on_click="ignore")
+    except Exception:
+        if st.button(f"{label} · preparar", key=f"{key}_prep") or st.session_state.get(f"{key}_ready"):
+            st.session_state[f"{key}_ready"] = True
+            try:
+                st.download_button(label, data=render(), file_name=file_name, mime=mime, key=key)
+            except Exception as e:
+                st.caption(f"No se pudo generar la descarga: {e}")
+
+def streamlit_cache(fn, ttl=None, max_entries=None, hash_funcs=None):
+    """Backend de src.cache.memoize sobre st.cache_data: una caché compartida por todas las sesiones."""
+    return st.cache_data(show_spinner=False, ttl=ttl, max_entries=max_entries, hash_funcs=hash_funcs)(fn)
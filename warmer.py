@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+import time
+import threading
+import concurrent.futures as cf
+from datetime import datetime, time as dtime
+from zoneinfo import ZoneInfo
+
+from src.finance import warm_price, warm_fundamentals, price_history_many
+from src.watchlist import load_watchlist
+
+# Cadencias por debajo del TTL de cada caché (price_history: 300 s, fundamentales: 1200 s)
+EVERY_S = float(os.environ.get("FINANCE_DASHBOARD_WARM_EVERY_S", "240"))
+OFF_HOURS_EVERY_S = float(os.environ.get("FINANCE_DASHBOARD_WARM_OFF_HOURS_S", "1800"))
+FUNDAMENTALS_EVERY_S = float(os.environ.get("FINANCE_DASHBOARD_WARM_FUND_S", "1080"))
+CONCURRENCY = int(os.environ.get("FINANCE_DASHBOARD_WARM_WORKERS", "4"))
+ENABLED = os.environ.get("FINANCE_DASHBOARD_WARM", "on").strip().lower() not in ("", "0", "off")
+
+_NY = ZoneInfo("America/New_York")
+
+
+def market_open(now: datetime | None = None) -> bool:
+    """Horario regular de NYSE/Nasdaq (L–V 9:30–16:00 Nueva York; sin festivos)."""
+    now = (now or datetime.now(_NY)).astimezone(_NY)
+    return now.weekday() < 5 and dtime(9, 30) <= now.time() <= dtime(16, 0)
+
+
+def _is_crypto(ticker: str) -> bool:
+    return ticker.upper().endswith("-USD")
+
+
+class _Warmer:
+    """
+    Hilo único por proceso que refresca antes de que caduque el TTL:
+      - series de la lista de opciones, la watchlist y el resumen de mercado
+      - fundamentales de las acciones (no cripto)
+    Fuera de horario de mercado las acciones se refrescan cada
+    OFF_HOURS_EVERY_S (no cambian); las cripto siguen a EVERY_S.
+    """
+
+    def __init__(self, tickers: list[str], summary: list[str]):
+        self._lock = threading.Lock()
+        self._tickers = list(tickers)
+        self._summary = list(summary)
+        self._last: dict[tuple[str, str], float] = {}
+        self._stop = threading.Event()
+        self._pool = cf.ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="warm")
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def update(self, tickers: list[str], summary: list[str]) -> None:
+        with self._lock:
+            self._tickers = list(tickers)
+            self._summary = list(summary)
+
+    def _due(self, key: tuple[str, str], every_s: float, now: float) -> bool:
+        return now - self._last.get(key, 0.0) >= every_s
+
+    def _jobs(self, now: float) -> list[tuple[tuple[str, str], object]]:
+        with self._lock:
+            base = list(dict.fromkeys(self._tickers + load_watchlist()))
+            summary = list(self._summary)
+        is_open = market_open()
+        jobs = []
+        for tk in base:
+            every = EVERY_S if (is_open or _is_crypto(tk)) else OFF_HOURS_EVERY_S
+            if self._due((tk, "price"), every, now):
+                jobs.append(((tk, "price"), lambda tk=tk: warm_price(tk, period="5y", interval="1d", source="auto")))
+            if not _is_crypto(tk) and self._due((tk, "fund"), FUNDAMENTALS_EVERY_S, now):
+                jobs.append(((tk, "fund"), lambda tk=tk: warm_fundamentals(tk)))
+        if summary and self._due(("__summary__", "price"), EVERY_S, now):
+            def warm_summary():
+                for tk in summary:
+                    warm_price(tk, period="1y", interval="1d", source="auto")
+                price_history_many.clear(summary, period="1y", interval="1d", source="auto")
+                price_history_many(summary, period="1y", interval="1d", source="auto")
+            jobs.append((("__summary__", "price"), warm_summary))
+        return jobs
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            now = time.time()
+            jobs = self._jobs(now)
+            futs = {self._pool.submit(fn): key for key, fn in jobs}
+            for fut in cf.as_completed(futs):
+                try:
+                    fut.result()
+                except Exception:
+                    pass
+                self._last[futs[fut]] = now  # aunque falle: se reintenta en el siguiente ciclo
+            self._stop.wait(min(EVERY_S, 30.0))
+
+
+_WARMER: _Warmer | None = None
+_WARMER_LOCK = threading.Lock()
+
+
+def start_warmer(tickers: list[str], summary: list[str]) -> None:
+    """Arranca el precalentado una vez por proceso; llamadas posteriores solo actualizan las listas."""
+    global _WARMER
+    if not ENABLED:
+        return
+    with _WARMER_LOCK:
+        if _WARMER is None:
+            _WARMER = _Warmer(tickers, summary)
+            _WARMER.start()
+        else:
+            _WARMER.update(tickers, summary)